@@ -8,9 +8,14 @@
 #   monthly — long-form retrospective
 #
 # How it works:
-#   1. Pre-fetch structured data (OSINT feeds, podcast charts) using Python
-#   2. Build a self-contained prompt by inlining command + skills + template
-#   3. Pass the full prompt to `claude -p` (no plugin discovery needed)
+#   1. Pre-fetch structured data (OSINT feeds, AI news feeds/APIs, podcast charts) in one Python process
+#      (no network wait when the polling daemon, prefetch_daemon.py, is running)
+#   2. daily/weekly: scripts/briefing_tabs.py runs one `claude -p` job per tab
+#      concurrently (each with only its tab's skills, template and pre-fetch
+#      slice), merges the tabs locally, saves, pushes and emails the briefing
+#   3. monthly, or if every tab job failed: build one self-contained prompt by
+#      inlining command + skills + template (scripts/prompt_compiler.py, cached
+#      per cadence) and pipe it to `claude -p` on stdin (no plugin discovery needed)
 
 set -euo pipefail
 
@@ -18,6 +23,7 @@ set -euo pipefail
 BRIEFING_DIR="/Users/benjamingiordano/BPG_Tech-News"
 PLUGIN_DIR="/Users/benjamingiordano/bengio-marketplace/plugins/tech-news-briefing"
 LOG_DIR="$HOME/.config/tech-news-briefing/logs"
+export TECH_NEWS_BRIEFING_DIR="$BRIEFING_DIR"   # read by story_index.py, archive_index.py
 CADENCE="${1:-daily}"
 DATE=$(date +%Y-%m-%d)
 LOG_FILE="${LOG_DIR}/${DATE}-${CADENCE}.log"
@@ -43,156 +49,71 @@ echo "========================================"
 echo ""
 echo "--- Pre-fetch phase ---"
 
-# OSINT pre-fetch (for daily and weekly)
+# One process runs every collector the cadence needs concurrently
+# (daily: OSINT + news; weekly: OSINT + podcasts; monthly: none)
 if [[ "$CADENCE" == "daily" || "$CADENCE" == "weekly" ]]; then
-    echo "Running OSINT pre-fetch..."
-    python3 "${PLUGIN_DIR}/scripts/fetch-osint.py" --date "$DATE" || {
-        echo "WARN: OSINT pre-fetch failed (non-fatal), continuing..."
-    }
-fi
-
-# Podcast pre-fetch (for weekly only)
-if [[ "$CADENCE" == "weekly" ]]; then
-    echo "Running podcast pre-fetch..."
-    python3 "${PLUGIN_DIR}/scripts/fetch-podcasts.py" --date "$DATE" --days 7 || {
-        echo "WARN: Podcast pre-fetch failed (non-fatal), continuing..."
+    echo "Running pre-fetch collectors..."
+    python3 "${PLUGIN_DIR}/scripts/prefetch.py" --cadence "$CADENCE" --date "$DATE" --days 7 || {
+        echo "WARN: Pre-fetch failed (non-fatal), continuing..."
     }
 fi
 
 echo "--- Pre-fetch complete ---"
 echo ""
 
-# --- Build self-contained prompt ---
-# Instead of "Run /tech-news-briefing:briefing" (which claude -p can't resolve),
-# we inline the full command body + referenced skills + template into one prompt.
-echo "--- Building prompt ---"
-
-# Strip YAML frontmatter from a markdown file (everything before second ---)
-strip_frontmatter() {
-    awk 'BEGIN{fm=0} /^---$/{fm++; next} fm>=2{print}' "$1"
-}
+# --- Per-tab jobs (daily, weekly) ---
+# briefing_tabs.py prints each tab job's prompt size and outcome; it exits
+# non-zero only if no tab could be generated, leaving nothing written.
+cd "$BRIEFING_DIR"
+EXIT_CODE=1
 
-# Resolve ${CLAUDE_PLUGIN_ROOT} references to actual path
-resolve_plugin_root() {
-    sed "s|\${CLAUDE_PLUGIN_ROOT}|${PLUGIN_DIR}|g"
-}
+if [[ "$CADENCE" == "daily" || "$CADENCE" == "weekly" ]]; then
+    echo "--- Running per-tab jobs ---"
+    python3 "${PLUGIN_DIR}/scripts/briefing_tabs.py" \
+        --cadence "$CADENCE" --date "$DATE" --plugin-root "$PLUGIN_DIR" --publish \
+        && EXIT_CODE=0 \
+        || echo "WARN: Per-tab run failed; falling back to a single claude -p call"
+    echo ""
+fi
 
-PROMPT_FILE=$(mktemp)
-trap "rm -f $PROMPT_FILE" EXIT
-
-case "$CADENCE" in
-    daily)
-        {
-            echo "# INSTRUCTIONS"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/commands/briefing.md" | resolve_plugin_root
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Research Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/research/SKILL.md"
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Curation Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/curation/SKILL.md"
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Formatting Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/formatting/SKILL.md" | resolve_plugin_root
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Daily Template"
-            echo ""
-            cat "${PLUGIN_DIR}/templates/daily.md"
-        } > "$PROMPT_FILE"
-        ;;
-    weekly)
-        {
-            echo "# INSTRUCTIONS"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/commands/briefing-weekly.md" | resolve_plugin_root
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Synthesis Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/synthesis/SKILL.md"
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Podcasts Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/podcasts/SKILL.md"
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Formatting Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/formatting/SKILL.md" | resolve_plugin_root
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Weekly Template"
-            echo ""
-            cat "${PLUGIN_DIR}/templates/weekly.md"
-        } > "$PROMPT_FILE"
-        ;;
-    monthly)
-        {
-            echo "# INSTRUCTIONS"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/commands/briefing-monthly.md" | resolve_plugin_root
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Synthesis Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/synthesis/SKILL.md"
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Formatting Skill"
-            echo ""
-            strip_frontmatter "${PLUGIN_DIR}/skills/formatting/SKILL.md" | resolve_plugin_root
-            echo ""
-            echo "---"
-            echo ""
-            echo "# REFERENCE: Monthly Template"
-            echo ""
-            cat "${PLUGIN_DIR}/templates/monthly.md"
-        } > "$PROMPT_FILE"
-        ;;
-    *)
-        echo "ERROR: Unknown cadence '${CADENCE}'. Use: daily, weekly, or monthly."
+if [[ $EXIT_CODE -ne 0 ]]; then
+    # --- Build self-contained prompt ---
+    # Instead of "Run /tech-news-briefing:briefing" (which claude -p can't resolve),
+    # we inline the full command body + referenced skills + template into one prompt.
+    # prompt_compiler.py assembles it from config/prompts.json and caches it until
+    # a source file changes; it prints the prompt's path and a per-section token report.
+    echo "--- Building prompt ---"
+
+    PROMPT_FILE=$(python3 "${PLUGIN_DIR}/scripts/prompt_compiler.py" \
+        --cadence "$CADENCE" --plugin-root "$PLUGIN_DIR" --report) || {
+        echo "ERROR: Could not build the ${CADENCE} prompt. Use: daily, weekly, or monthly."
         exit 1
-        ;;
-esac
+    }
 
-PROMPT_LINES=$(wc -l < "$PROMPT_FILE")
-echo "Prompt built: ${PROMPT_LINES} lines"
-echo "--- Starting Claude ---"
-echo ""
+    PROMPT_LINES=$(wc -l < "$PROMPT_FILE")
+    echo "Prompt built: ${PROMPT_LINES} lines"
+    echo "--- Starting Claude ---"
+    echo ""
 
-# --- Run Claude ---
-cd "$BRIEFING_DIR"
+    # --- Run Claude ---
+    # Feed the prompt on stdin rather than as one huge argument.
+    claude -p \
+      --model sonnet \
+      --dangerously-skip-permissions \
+      --max-budget-usd 2.00 \
+      < "$PROMPT_FILE"
 
-# Read prompt from temp file and pass as argument.
-# $() inside double quotes preserves all special characters.
-claude -p \
-  --model sonnet \
-  --dangerously-skip-permissions \
-  --max-budget-usd 2.00 \
-  "$(cat "$PROMPT_FILE")"
+    EXIT_CODE=$?
 
-EXIT_CODE=$?
+    echo ""
+fi
 
-echo ""
+# --- Retry queued email (non-fatal) ---
+# send-email.py leaves anything it could not deliver in the outbox; give it
+# another chance now, after the rest of the run.
+python3 "${PLUGIN_DIR}/scripts/send-email.py" --flush || {
+    echo "WARN: Some email is still queued in the outbox (non-fatal)"
+}
 
 # --- Trigger Vercel rebuild (non-fatal) ---
 if [[ $EXIT_CODE -eq 0 ]]; then
@@ -0,0 +1,683 @@
+#!/usr/bin/env python3
+"""Full-text index of the briefing archive and precomputed recap digests.
+
+The weekly and monthly commands used to have the model list and read every
+daily briefing (and, monthly, every weekly recap) of the period before it
+could start synthesizing. This indexer parses the Markdown archive under
+BRIEFING_DIR into one row per story in a local SQLite database
+(~/.config/tech-news-briefing/prefetch/archive.db):
+
+  day, kind (daily | weekly | monthly), tab, section, title, url, source,
+  summary, CVE IDs and the scores a briefing carries: tier (Must-Read 3,
+  Worth Knowing 2, On the Radar 1), CVSS, CISA KEV mention, Apple chart
+  position
+
+Titles, summaries and sources are also in an FTS5 table (porter-stemmed)
+for `search`. Files are re-parsed only when their size or mtime changes;
+deleted files drop out.
+
+`digest` answers a whole retrospective in one query result:
+
+  top_stories  stories clustered across days by URL, single-CVE and
+               near-identical titles (the fingerprints of story_index.py),
+               ranked by days covered, weekly recaps that featured them,
+               best tier and CVSS, with each day's headline as the arc
+  themes       title words and word pairs that recur across stories and
+               days, with the average of the previous 4 periods for trend;
+               "fading" lists themes that were strong before and dropped
+  cves         CVE rollup: days mentioned, mentions, max CVSS, KEV, titles
+
+BRIEFING_DIR defaults to the archive the commands write to; override with
+TECH_NEWS_BRIEFING_DIR. Without FTS5 in the local SQLite, search falls
+back to LIKE and everything else works unchanged.
+
+Usage:
+    python3 archive_index.py digest --cadence weekly|monthly [--period 2026-W42|2026-09]
+    python3 archive_index.py search "ransomware hospital" [--since DAY] [--until DAY]
+    python3 archive_index.py sync [--archive DIR] [--rebuild]
+    python3 archive_index.py stats
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from payload import dumps, trim_text
+from story_index import (BRIEFING_DIR, CVE, LINK, PREFETCH_DIR, STOPWORDS, WORD,
+                         fingerprints, jaccard)
+
+DB_PATH = PREFETCH_DIR / "archive.db"
+PARSER_VERSION = "1"        # bump to re-parse every file after a parser change
+
+TOP_STORIES = 15
+TOP_THEMES = 12
+TOP_CVES = 25
+BASELINE_PERIODS = 4
+MIN_SIMILARITY = 0.6
+SUMMARY_TOKENS = 40
+GENERIC_SHARE = 0.3         # themes in more of the period's stories than this are noise
+
+TIERS = {"must-read": 3, "top stories": 3, "worth knowing": 2, "on the radar": 1}
+NAMES = {
+    "daily": re.compile(r"^(\d{4}-\d{2}-\d{2})\.md$"),
+    "weekly": re.compile(r"^week-(\d{2})-recap\.md$"),
+    "monthly": re.compile(r"^(\d{4}-\d{2})-recap\.md$"),
+}
+
+TAB = re.compile(r"<!--\s*tab:\s*(.+?)\s*-->")
+HEADING = re.compile(r"^##\s+(.+?)\s*#*\s*$")
+ITEM = re.compile(r"^\s{0,3}(?:[-*+]|\d+[.)])\s+(.*)$")
+SOURCE = re.compile(r"\bSource:\s*\**\s*([^*|\n]+?)\s*\**\s*$", re.I)
+SHOW = re.compile(r"\bShow:\s*\*([^*]+)\*")
+CVSS = re.compile(r"\bCVSS(?:\s*v?[234](?:\.\d)?)?(?:\s+(?:base\s+)?score)?[\s:=]*(10(?:\.0)?|\d\.\d)\b",
+                  re.I)
+KEV = re.compile(r"\bKEV\b")
+CHART = re.compile(r"#(\d{1,3})\s+(?:on\s+)?Apple", re.I)
+MARKUP = re.compile(r"[*_`]+")
+SEPARATOR = re.compile(r"^\s*[—–-]+\s*|\s*[—–-]+\s*$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    path    TEXT PRIMARY KEY,       -- relative to BRIEFING_DIR
+    kind    TEXT NOT NULL,          -- daily | weekly | monthly
+    day     TEXT NOT NULL,          -- daily: its date; weekly: the Sunday; monthly: the 1st
+    size    INTEGER,
+    mtime   REAL,
+    version TEXT
+);
+CREATE INDEX IF NOT EXISTS docs_kind_day ON docs (kind, day);
+
+CREATE TABLE IF NOT EXISTS stories (
+    id      INTEGER PRIMARY KEY,
+    doc     TEXT NOT NULL REFERENCES docs (path),
+    kind    TEXT NOT NULL,
+    day     TEXT NOT NULL,
+    tab     TEXT,
+    section TEXT,
+    tier    INTEGER,                -- 3 Must-Read .. 1 On the Radar; NULL if untiered
+    title   TEXT NOT NULL,
+    url     TEXT,
+    source  TEXT,
+    summary TEXT,
+    cves    TEXT,                   -- space-joined CVE IDs
+    cvss    REAL,                   -- highest CVSS named on the line
+    kev     INTEGER,                -- 1 if the line mentions CISA KEV
+    chart   INTEGER,                -- Apple chart position (podcasts)
+    keys    TEXT,                   -- story_index fingerprint keys
+    words   TEXT                    -- title word set
+);
+CREATE INDEX IF NOT EXISTS stories_kind_day ON stories (kind, day);
+CREATE INDEX IF NOT EXISTS stories_doc ON stories (doc);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS stories_fts USING fts5 (
+    title, summary, source, content='stories', content_rowid='id',
+    tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS stories_fts_insert AFTER INSERT ON stories BEGIN
+    INSERT INTO stories_fts (rowid, title, summary, source)
+    VALUES (new.id, new.title, new.summary, new.source);
+END;
+CREATE TRIGGER IF NOT EXISTS stories_fts_delete AFTER DELETE ON stories BEGIN
+    INSERT INTO stories_fts (stories_fts, rowid, title, summary, source)
+    VALUES ('delete', old.id, old.title, old.summary, old.source);
+END;
+"""
+
+
+# -- parsing -------------------------------------------------------------------
+
+def classify(path: Path) -> tuple[str, str] | None:
+    """(kind, day) for an archive file name, or None if it is not a briefing."""
+    for kind, pattern in NAMES.items():
+        match = pattern.match(path.name)
+        if not match:
+            continue
+        try:
+            if kind == "daily":
+                return kind, date.fromisoformat(match.group(1)).isoformat()
+            if kind == "monthly":
+                return kind, date.fromisoformat(f"{match.group(1)}-01").isoformat()
+            year = int(path.parent.parent.name)
+            return kind, date.fromisocalendar(year, int(match.group(1)), 7).isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+def _host(url: str) -> str:
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _plain(text: str) -> str:
+    return " ".join(MARKUP.sub("", LINK.sub(r"\1", text)).split())
+
+
+def parse_story(text: str) -> dict | None:
+    """One list item (continuation lines joined) -> story fields, or None."""
+    links = LINK.findall(text)
+    if not links:
+        return None
+    title, url = links[0]
+    title = _plain(title)
+    if not title or title.lower() == "source":
+        return None
+    rest = text[text.find(url) + len(url) + 1:]
+    rest = re.sub(r"^\**", "", rest)
+
+    source = ""
+    show = SHOW.search(rest)
+    match = SOURCE.search(rest)
+    if show:
+        source = show.group(1).strip()
+    elif match:
+        source = match.group(1).strip().rstrip(".,;")
+        rest = rest[:match.start()]
+    else:
+        for label, link in links[1:]:
+            if label.strip().lower() == "source":
+                source = _host(link)
+                rest = rest.replace(f"[{label}]({link})", "")
+    source = source or _host(url)
+
+    scores = [float(s) for s in CVSS.findall(text)]
+    chart = CHART.search(text)
+    return {
+        "title": title[:300],
+        "url": url,
+        "source": source[:100],
+        "summary": SEPARATOR.sub("", _plain(rest).strip()),
+        "cves": " ".join(sorted({c.upper() for c in CVE.findall(text)})),
+        "cvss": max(scores) if scores else None,
+        "kev": 1 if KEV.search(text) else 0,
+        "chart": int(chart.group(1)) if chart else None,
+    }
+
+
+def parse_briefing(text: str) -> list[dict]:
+    """Every linked story in a briefing, with the tab and H2 section it sits under."""
+    stories, tab, section = [], "", ""
+    item: list[str] | None = None
+    fenced = False
+
+    def flush():
+        if item:
+            story = parse_story(" ".join(item))
+            if story:
+                stories.append({"tab": tab, "section": section,
+                                "tier": TIERS.get(section.lower()), **story})
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            fenced = not fenced
+            continue
+        if fenced:
+            continue
+        marker = TAB.search(line)
+        heading = HEADING.match(line)
+        bullet = ITEM.match(line)
+        if marker or heading or bullet or not line.strip() or not line[:1].isspace():
+            flush()
+            item = None
+        if marker:
+            tab, section = marker.group(1), ""
+        elif heading:
+            section = _plain(heading.group(1))
+        elif bullet:
+            item = [bullet.group(1)]
+        elif item is not None:
+            item.append(line.strip())
+    flush()
+    return stories
+
+
+# -- clustering ----------------------------------------------------------------
+
+class _Title:
+    """A story's title words, split once for pairwise comparison."""
+    __slots__ = ("words", "cves", "numbers")
+
+    def __init__(self, story: dict):
+        self.words = set(story["words"].split())
+        self.cves = set(story["cves"].split())
+        self.numbers = {w for w in self.words if any(c.isdigit() for c in w)}
+
+    def same_story(self, other: _Title, min_similarity: float) -> bool:
+        """Similar titles, not told apart by different CVEs or numbers ("v4" vs "v5")."""
+        if self.cves and other.cves and not self.cves & other.cves:
+            return False
+        if self.numbers - other.words and other.numbers - self.words:
+            return False
+        return jaccard(self.words, other.words) >= min_similarity
+
+
+def cluster(stories: list[dict], min_similarity: float = MIN_SIMILARITY) -> list[list[dict]]:
+    """Group the same story across days: shared URL, sole CVE, or similar title."""
+    parent = list(range(len(stories)))
+    titles: dict[int, _Title] = {}
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    by_key: dict[str, list[int]] = defaultdict(list)
+    for i, story in enumerate(stories):
+        for key in story["keys"].split():
+            by_key[key].append(i)
+    for key, members in by_key.items():
+        if len(members) < 2:
+            continue
+        if key.startswith("c:"):
+            members = [i for i in members if len(stories[i]["cves"].split()) == 1]
+        if not key.startswith("b"):
+            for i, j in zip(members, members[1:]):
+                parent[find(j)] = find(i)
+            continue
+        # A story repeated day after day has the same title: compare each wording once
+        variants: dict[tuple[str, str], int] = {}
+        for i in members:
+            first = variants.setdefault((stories[i]["words"], stories[i]["cves"]), i)
+            parent[find(i)] = find(first)
+        distinct = list(variants.values())
+        for i in distinct:
+            if i not in titles:
+                titles[i] = _Title(stories[i])
+        for n, i in enumerate(distinct):
+            for j in distinct[n + 1:]:
+                if find(i) != find(j) and titles[i].same_story(titles[j], min_similarity):
+                    parent[find(j)] = find(i)
+    groups: dict[int, list[dict]] = defaultdict(list)
+    for i, story in enumerate(stories):
+        groups[find(i)].append(story)
+    return list(groups.values())
+
+
+def theme_terms(title: str) -> set[str]:
+    """Content words of a title and the pairs they form, in title order."""
+    words = [w for w in WORD.findall(CVE.sub(" ", title).lower())
+             if w not in STOPWORDS and len(w) > 2 and not w.isdigit()]
+    words = [w[:-1] if len(w) > 4 and w.endswith("s") and not w.endswith("ss") else w
+             for w in words]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:]) if a != b}
+
+
+def count_terms(groups: list[list[dict]]) -> dict[str, list[list[dict]]]:
+    """term -> the story clusters whose titles use it (once per cluster)."""
+    terms: dict[str, list[list[dict]]] = defaultdict(list)
+    for group in groups:
+        for term in set().union(*(theme_terms(s["title"]) for s in group)):
+            terms[term].append(group)
+    return terms
+
+
+# -- periods -------------------------------------------------------------------
+
+def period_bounds(cadence: str, label: str | None = None,
+                  today: date | None = None) -> tuple[str, date, date]:
+    """(label, first day, last day) of a week (2026-W42) or month (2026-09).
+
+    The default week is the ISO week containing today; the default month is
+    the previous one (the monthly recap runs on the 1st).
+    """
+    today = today or date.today()
+    if cadence == "weekly":
+        if label:
+            year, week = label.upper().split("-W")
+            start = date.fromisocalendar(int(year), int(week), 1)
+        else:
+            start = today - timedelta(days=today.weekday())
+        iso = start.isocalendar()
+        return f"{iso[0]}-W{iso[1]:02d}", start, start + timedelta(days=6)
+    if cadence == "monthly":
+        if label:
+            start = date.fromisoformat(f"{label}-01")
+        else:
+            start = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+        end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return start.strftime("%Y-%m"), start, end
+    raise ValueError(f"unknown cadence {cadence!r} (use weekly or monthly)")
+
+
+def previous_periods(cadence: str, start: date, count: int) -> list[tuple[date, date]]:
+    """The `count` periods before the one starting on `start`, latest first."""
+    periods = []
+    for _ in range(count):
+        previous = start - timedelta(days=1)
+        label = (f"{previous.isocalendar()[0]}-W{previous.isocalendar()[1]:02d}"
+                 if cadence == "weekly" else previous.strftime("%Y-%m"))
+        _, start, end = period_bounds(cadence, label)
+        periods.append((start, end))
+    return periods
+
+
+# -- store ---------------------------------------------------------------------
+
+def _story(row: sqlite3.Row | dict, summary_tokens: int = SUMMARY_TOKENS) -> dict:
+    out = {k: row[k] for k in ("day", "tab", "section", "title", "url", "source")}
+    if row["summary"]:
+        out["summary"] = trim_text(row["summary"], summary_tokens)
+    for key in ("cvss", "chart"):
+        if row[key] is not None:
+            out[key] = row[key]
+    if row["cves"]:
+        out["cves"] = row["cves"].split()
+    if row["kev"]:
+        out["kev"] = True
+    return out
+
+
+class ArchiveIndex:
+    """SQLite + FTS5 index of the briefing archive. One instance per thread."""
+
+    def __init__(self, path: Path = DB_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+
+    def __enter__(self) -> ArchiveIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    # -- sync --------------------------------------------------------------
+
+    def _forget(self, ref: str) -> None:
+        self.db.execute("DELETE FROM stories WHERE doc = ?", (ref,))
+        self.db.execute("DELETE FROM docs WHERE path = ?", (ref,))
+
+    def index_file(self, path: Path, ref: str, kind: str, day: str) -> int:
+        """(Re-)index one briefing; returns the number of stories."""
+        st = path.stat()
+        stories = parse_briefing(path.read_text(encoding="utf-8", errors="replace"))
+        self._forget(ref)
+        self.db.execute("INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?)",
+                        (ref, kind, day, st.st_size, st.st_mtime, PARSER_VERSION))
+        rows = []
+        for s in stories:
+            keys, words = fingerprints(s["title"], s["url"], s["cves"])
+            rows.append((ref, kind, day, s["tab"], s["section"], s["tier"], s["title"], s["url"],
+                         s["source"], s["summary"], s["cves"], s["cvss"], s["kev"], s["chart"],
+                         " ".join(keys), " ".join(sorted(words))))
+        self.db.executemany(
+            "INSERT INTO stories (doc, kind, day, tab, section, tier, title, url, source, "
+            "summary, cves, cvss, kev, chart, keys, words) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def sync(self, archive: Path = BRIEFING_DIR) -> dict[str, int]:
+        """Index new or changed briefings and recaps; drop deleted ones."""
+        counts = {"files": 0, "stories": 0, "removed": 0}
+        known = {r["path"]: r for r in self.db.execute("SELECT * FROM docs")}
+        seen = set()
+        if archive.is_dir():
+            for path in sorted(archive.glob("[0-9][0-9][0-9][0-9]/**/*.md")):
+                kind_day = classify(path)
+                if not kind_day:
+                    continue
+                ref = str(path.relative_to(archive))
+                seen.add(ref)
+                st = path.stat()
+                row = known.get(ref)
+                if (row and row["size"] == st.st_size and row["mtime"] == st.st_mtime
+                        and row["version"] == PARSER_VERSION):
+                    continue
+                counts["stories"] += self.index_file(path, ref, *kind_day)
+                counts["files"] += 1
+        for ref in known.keys() - seen:
+            self._forget(ref)
+            counts["removed"] += 1
+        self.db.commit()
+        return counts
+
+    # -- queries -----------------------------------------------------------
+
+    def stories(self, kind: str, since: date, until: date) -> list[sqlite3.Row]:
+        return self.db.execute(
+            "SELECT * FROM stories WHERE kind = ? AND day BETWEEN ? AND ? ORDER BY day, id",
+            (kind, since.isoformat(), until.isoformat())).fetchall()
+
+    def search(self, query: str, since: str | None = None, until: str | None = None,
+               limit: int = 20) -> list[dict]:
+        """Stories matching an FTS5 query (plain words are ANDed), best first."""
+        bounds = (since or "0000-01-01", until or "9999-12-31")
+        if self.fts:
+            sql = ("SELECT s.* FROM stories_fts JOIN stories s ON s.id = stories_fts.rowid "
+                   "WHERE stories_fts MATCH ? AND s.day BETWEEN ? AND ? "
+                   "ORDER BY bm25(stories_fts, 5.0, 1.0, 2.0), s.day DESC LIMIT ?")
+            try:
+                rows = self.db.execute(sql, (query, *bounds, limit)).fetchall()
+            except sqlite3.OperationalError:
+                # Not valid FTS5 syntax (stray quote, colon, ...): match the words literally
+                quoted = " ".join('"' + w.replace('"', '""') + '"' for w in query.split())
+                rows = self.db.execute(sql, (quoted, *bounds, limit)).fetchall()
+        else:
+            words = query.split() or [""]
+            where = " AND ".join("(title || ' ' || summary) LIKE ?" for _ in words)
+            rows = self.db.execute(
+                f"SELECT * FROM stories WHERE {where} AND day BETWEEN ? AND ? "
+                f"ORDER BY day DESC LIMIT ?",
+                (*(f"%{w}%" for w in words), *bounds, limit)).fetchall()
+        return [{"kind": r["kind"], **_story(r)} for r in rows]
+
+    def digest(self, cadence: str, label: str | None = None, top: int = TOP_STORIES,
+               today: date | None = None) -> dict:
+        """Everything a weekly or monthly recap starts from, in one document."""
+        label, since, until = period_bounds(cadence, label, today)
+        dailies = [dict(r) for r in self.stories("daily", since, until)]
+        # A weekly recap belongs to the period if any day of its week does
+        recaps = ([dict(r) for r in self.stories("weekly", since, until + timedelta(days=6))]
+                  if cadence == "monthly" else [])
+        groups = cluster(dailies + recaps)
+
+        ranked = []
+        for group in groups:
+            daily = [s for s in group if s["kind"] == "daily"]
+            if not daily:
+                continue
+            days = sorted({s["day"] for s in daily})
+            weeks = sorted({date.fromisoformat(d).isocalendar()[1] for d in days})
+            featured = sorted({s["doc"] for s in group if s["kind"] == "weekly"})
+            lead = max(daily, key=lambda s: (s["tier"] or 2, s["cvss"] or 0, s["day"]))
+            cvss = max((s["cvss"] or 0 for s in group), default=0)
+            kev = any(s["kev"] for s in group)
+            score = (10 * len(days) + 5 * (len(weeks) - 1) + 8 * len(featured)
+                     + 4 * max(s["tier"] or 2 for s in daily) + cvss + (5 if kev else 0))
+            entry = {"score": round(score), "days": len(days), "first": days[0],
+                     "last": days[-1], **{k: v for k, v in _story(lead).items() if k != "day"}}
+            entry["cves"] = sorted({c for s in group for c in s["cves"].split()})
+            if not entry["cves"]:
+                del entry["cves"]
+            if cvss:
+                entry["cvss"] = cvss
+            if kev:
+                entry["kev"] = True
+            if featured:
+                entry["in_weekly"] = featured
+            if len(days) > 1:
+                headlines = {}
+                for s in daily:
+                    headlines.setdefault(s["day"], s["title"])
+                entry["arc"] = [[d, t] for d, t in sorted(headlines.items())]
+            ranked.append(entry)
+        ranked.sort(key=lambda e: (-e["score"], e["first"], e["title"]))
+
+        by_day = sorted({s["day"] for s in dailies})
+        return {
+            "cadence": cadence,
+            "period": label,
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "dailies": by_day,
+            "weekly_recaps": sorted({s["doc"] for s in recaps}),
+            "counts": {
+                "stories": len(dailies),
+                "distinct": len(ranked),
+                "recurring": sum(1 for e in ranked if e["days"] > 1),
+                "by_tab": dict(Counter(s["tab"] or "(none)" for s in dailies).most_common()),
+                "cves": len({c for s in dailies for c in s["cves"].split()}),
+            },
+            "top_stories": ranked[:top],
+            **self._themes(cadence, since, [g for g in groups
+                                            if any(s["kind"] == "daily" for s in g)]),
+            "cves": cve_rollup(dailies)[:TOP_CVES],
+            "sources": dict(Counter(s["source"] for s in dailies if s["source"])
+                            .most_common(10)),
+        }
+
+    def _themes(self, cadence: str, since: date, groups: list[list[dict]]) -> dict:
+        current = count_terms(groups)
+        baseline: Counter = Counter()
+        periods = 0
+        for start, end in previous_periods(cadence, since, BASELINE_PERIODS):
+            past = cluster([dict(r) for r in self.stories("daily", start, end)])
+            if past:
+                periods += 1
+                baseline.update({t: len(g) for t, g in count_terms(past).items()})
+        periods = periods or 1
+
+        limit = max(3, GENERIC_SHARE * len(groups))
+        candidates = {}
+        for term, hits in current.items():
+            days = {s["day"] for g in hits for s in g}
+            if len(hits) < 2 or len(days) < 2 or len(hits) > limit:
+                continue
+            candidates[term] = (hits, days)
+        # A word is only worth listing on its own if its pairs do not cover it
+        for term in [t for t in candidates if " " not in t]:
+            pairs = [len(candidates[p][0]) for p in candidates
+                     if " " in p and term in p.split()]
+            if pairs and max(pairs) >= 0.8 * len(candidates[term][0]):
+                del candidates[term]
+
+        themes = []
+        for term, (hits, days) in candidates.items():
+            before = baseline[term] / periods
+            trend = ("new" if not before else "up" if len(hits) >= 1.5 * before
+                     else "down" if len(hits) <= 0.67 * before else "steady")
+            themes.append({"term": term, "stories": len(hits), "days": len(days),
+                           "baseline": round(before, 1), "trend": trend,
+                           "examples": sorted({g[0]["title"] for g in hits})[:3]})
+        themes.sort(key=lambda t: (-t["stories"], -t["days"], t["term"]))
+        fading = sorted(({"term": t, "stories": len(current.get(t, ())),
+                          "baseline": round(n / periods, 1)}
+                         for t, n in baseline.items()
+                         if n / periods >= 3 and len(current.get(t, ())) <= 0.5 * n / periods),
+                        key=lambda t: (t["stories"] - t["baseline"], t["term"]))
+        return {"themes": themes[:TOP_THEMES], "fading": fading[:5]}
+
+    def stats(self) -> dict:
+        q = self.db.execute
+        return {
+            "docs": {r["kind"]: r["n"] for r in q(
+                "SELECT kind, COUNT(*) AS n FROM docs GROUP BY kind")},
+            "stories": q("SELECT COUNT(*) FROM stories").fetchone()[0],
+            "days": dict(q("SELECT MIN(day) AS first, MAX(day) AS last FROM docs "
+                           "WHERE kind = 'daily'").fetchone()),
+            "fts5": self.fts,
+        }
+
+
+def cve_rollup(stories: list[dict]) -> list[dict]:
+    """Per CVE: days and lines that named it, highest CVSS, KEV mention, headlines."""
+    by_cve: dict[str, list[dict]] = defaultdict(list)
+    for s in stories:
+        for cve in s["cves"].split():
+            by_cve[cve].append(s)
+    rollup = []
+    for cve, hits in by_cve.items():
+        days = sorted({s["day"] for s in hits})
+        entry = {"cve_id": cve, "days": len(days), "mentions": len(hits),
+                 "first": days[0], "last": days[-1]}
+        cvss = max((s["cvss"] or 0 for s in hits), default=0)
+        if cvss:
+            entry["cvss"] = cvss
+        if any(s["kev"] for s in hits):
+            entry["kev"] = True
+        entry["titles"] = list(dict.fromkeys(s["title"] for s in hits))[:3]
+        rollup.append(entry)
+    rollup.sort(key=lambda e: (-e["days"], -e.get("cvss", 0), e["cve_id"]))
+    return rollup
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Full-text index of the briefing archive")
+    parser.add_argument("--db", help="Index path", type=Path, default=DB_PATH)
+    parser.add_argument("--archive", type=Path, default=BRIEFING_DIR, help="Briefing archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    digest = sub.add_parser("digest", help="Precomputed weekly or monthly digest")
+    digest.add_argument("--cadence", required=True, choices=("weekly", "monthly"))
+    digest.add_argument("--period", help="2026-W42 (weekly) or 2026-09 (monthly); "
+                                         "default this week / last month")
+    digest.add_argument("--top", type=int, default=TOP_STORIES, help="Top stories to list")
+    search = sub.add_parser("search", help="Full-text search (FTS5 query syntax)")
+    search.add_argument("query")
+    search.add_argument("--since", help="First day (YYYY-MM-DD)")
+    search.add_argument("--until", help="Last day (YYYY-MM-DD)")
+    search.add_argument("--limit", type=int, default=20)
+    sync = sub.add_parser("sync", help="Index new or changed archive files")
+    sync.add_argument("--rebuild", action="store_true", help="Drop the index and start over")
+    sub.add_parser("stats", help="Index size")
+    args = parser.parse_args()
+
+    if args.command == "sync" and args.rebuild:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{args.db}{suffix}").unlink(missing_ok=True)
+    if not args.archive.is_dir():
+        print(f"  WARN: No briefing archive at {args.archive}", file=sys.stderr)
+
+    started = time.perf_counter()
+    with ArchiveIndex(args.db) as index:
+        synced = index.sync(args.archive)
+        if synced["files"] or synced["removed"]:
+            print(f"Indexed {synced['stories']} stories from {synced['files']} files"
+                  f" ({synced['removed']} removed)", file=sys.stderr)
+        if args.command == "digest":
+            try:
+                result = index.digest(args.cadence, args.period, args.top)
+            except ValueError:
+                print(f"ERROR: Bad period '{args.period}' for {args.cadence} "
+                      f"(use 2026-W42 or 2026-09)", file=sys.stderr)
+                sys.exit(1)
+            if len(result["dailies"]) < 3:
+                print(f"  WARN: Only {len(result['dailies'])} daily briefings in "
+                      f"{result['period']}", file=sys.stderr)
+            print(dumps(result))
+        elif args.command == "search":
+            print(dumps(index.search(args.query, args.since, args.until, args.limit)))
+        elif args.command == "stats":
+            print(json.dumps(index.stats(), indent=2))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{args.command} took {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
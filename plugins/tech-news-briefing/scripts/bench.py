@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""Offline benchmark for the pre-fetch and email scripts.
+
+Runs fetch-osint.py, fetch-news.py, fetch-podcasts.py and send-email.py
+unmodified against local stand-ins (replay_server.py) instead of CISA, NVD,
+the RSS feeds, the news APIs, Spotify, Apple and Gmail, and reports per run:
+
+  wall time · peak RSS · requests made · bytes transferred · exit status
+
+Each script runs in a fresh child process with its own temporary HOME, so
+state, caches and stores start empty. Every configuration runs cold (empty
+state) and then warm (state from the cold run: 304s, incremental syncs,
+cached tokens). Fetch scripts run in both fetch modes on identical inputs:
+
+  serial      — one source / show at a time (registry limits 1/1, --workers 1)
+  concurrent  — the configured defaults
+
+The email run sends to --recipients addresses (one message each above
+outbox.GROUP_MAX); --error-rate also makes the SMTP stand-in answer that
+fraction of messages with a transient 451.
+
+--baseline compares against an earlier --json report and exits 1 if any
+run's wall time, peak RSS or bytes grew by more than --tolerance.
+
+--record DIR snapshots the live static payloads (KEV catalog, feeds, Apple
+Charts) into DIR for use with --fixtures DIR; this is the only option that
+touches the network.
+
+Usage:
+    python3 bench.py [--scripts osint,news,podcasts,email] [--modes serial,concurrent]
+                     [--latency 0.05] [--error-rate 0.0] [--scale 1.0] [--recipients 1]
+                     [--fixtures DIR] [--json report.json]
+                     [--baseline report.json] [--tolerance 0.2]
+    python3 bench.py --record DIR
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from fetch_engine import REGISTRY_PATH
+from http_pool import REPLAY_ENV, format_bytes
+from replay_server import APPLE_HOST, FEEDS, KEV_HOST, KEV_PATH, ReplayServer, SMTPStandIn
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+FETCH_SCRIPTS = ("osint", "news", "podcasts")
+NEWS_REGISTRY_PATH = SCRIPTS_DIR.parent / "config" / "news-sources.json"
+APPLE_CHARTS_PATH = "/api/v2/us/podcasts/top/25/podcasts.json"
+
+
+def sample_briefing() -> str:
+    """A daily briefing of typical length for the email benchmark."""
+    lines = ["# BPG Tech News", "", "**2026-01-01 | Daily | 30 stories**", ""]
+    for tab in ("AI News", "Breakthroughs", "Cyber Intel"):
+        lines += [f"<!-- tab: {tab} -->", f"## {tab}", ""]
+        for i in range(10):
+            lines.append(
+                f"- **[{tab} story {i}: a headline of ordinary length](https://example.org/{i})** "
+                f"— *Source {i}*. Two sentences of summary describing what happened and why "
+                f"it matters to readers of the briefing. **Impact:** moderate.")
+        lines += ["", "---", ""]
+    lines.append("*Generated by BPG Tech News*")
+    return "\n".join(lines)
+
+
+def peak_rss_bytes(rusage) -> int:
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+
+
+def watch_hwm(pid: int, peak: list[int]) -> None:
+    """Track /proc VmHWM (Linux) — unlike ru_maxrss it excludes the forking parent."""
+    status = Path(f"/proc/{pid}/status")
+    while True:
+        try:
+            for line in status.read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    peak[0] = max(peak[0], int(line.split()[1]) * 1024)
+        except (OSError, ValueError):
+            return
+        time.sleep(0.02)
+
+
+def run_child(cmd: list[str], env: dict, log_path: Path) -> tuple[float, int, int]:
+    """Run cmd to completion; return (wall seconds, peak RSS bytes, exit code)."""
+    peak = [0]
+    with open(log_path, "ab") as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, env=env, stdout=log, stderr=log)
+        watcher = threading.Thread(target=watch_hwm, args=(proc.pid, peak), daemon=True)
+        watcher.start()
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - started
+    watcher.join()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return wall, peak[0] or peak_rss_bytes(rusage), proc.returncode
+
+
+def build_command(script: str, mode: str, work: Path, date: str) -> list[str]:
+    py = sys.executable
+    if script in ("osint", "news"):
+        source = REGISTRY_PATH if script == "osint" else NEWS_REGISTRY_PATH
+        registry = json.loads(source.read_text(encoding="utf-8"))
+        if mode == "serial":
+            registry["limits"] = {"max_workers": 1, "per_host": 1}
+        path = work / source.name
+        path.write_text(json.dumps(registry), encoding="utf-8")
+        return [py, str(SCRIPTS_DIR / f"fetch-{script}.py"), "--date", date, "--sources", str(path)]
+    if script == "podcasts":
+        cmd = [py, str(SCRIPTS_DIR / "fetch-podcasts.py"), "--date", date, "--days", "7"]
+        return cmd + (["--workers", "1"] if mode == "serial" else [])
+    briefing = work / f"{date}.md"
+    briefing.write_text(sample_briefing(), encoding="utf-8")
+    return [py, str(SCRIPTS_DIR / "send-email.py"), str(briefing)]
+
+
+def serve(conn, latency: float, error_rate: float, scale: float, fixtures: Path | None) -> None:
+    """Stand-in process: run both servers and answer reset/stats/stop over conn."""
+    server = ReplayServer(latency=latency, error_rate=error_rate, scale=scale,
+                          fixtures_dir=fixtures).start()
+    smtp = SMTPStandIn(latency=latency, error_rate=error_rate).start()
+    conn.send((server.url, smtp.address))
+    while True:
+        command = conn.recv()
+        if command == "reset":
+            server.reset()
+            smtp.reset()
+            conn.send(None)
+        elif command == "stats":
+            conn.send((server.stats(), smtp.stats()))
+        else:
+            server.stop()
+            smtp.stop()
+            conn.send(None)
+            return
+
+
+class StandIns:
+    """Replay HTTP + SMTP servers in their own process.
+
+    Keeping the fixtures out of this process matters: children are forked
+    from it, and on Linux a child's peak RSS includes its parent's memory at
+    fork time.
+    """
+
+    def __init__(self, args):
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self._proc = ctx.Process(target=serve, daemon=True, args=(
+            child, args.latency, args.error_rate, args.scale, args.fixtures))
+        self._proc.start()
+        self.url, self.smtp_address = self._conn.recv()
+
+    def call(self, command: str):
+        self._conn.send(command)
+        return self._conn.recv()
+
+    def stop(self) -> None:
+        self.call("stop")
+        self._proc.join()
+
+
+def benchmark(args) -> list[dict]:
+    stand_ins = StandIns(args)
+    date = datetime.now().strftime("%Y-%m-%d")
+    results = []
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="tnb-bench-") as tmp:
+            for script in args.scripts:
+                modes = args.modes if script in FETCH_SCRIPTS else ["-"]
+                for mode in modes:
+                    work = Path(tmp) / f"{script}-{mode.strip('-') or 'default'}"
+                    work.mkdir()
+                    env = {
+                        **os.environ,
+                        "HOME": str(work),
+                        REPLAY_ENV: stand_ins.url,
+                        "TECH_NEWS_BRIEFING_SMTP": stand_ins.smtp_address,
+                        "TECH_NEWS_BRIEFING_TO": ",".join(
+                            f"reader{n}@localhost" for n in range(args.recipients)),
+                        "NVD_API_KEY": "replay",
+                        "SPOTIFY_CLIENT_ID": "replay",
+                        "SPOTIFY_CLIENT_SECRET": "replay",
+                    }
+                    cmd = build_command(script, mode, work, date)
+                    for phase in ("cold", "warm"):
+                        stand_ins.call("reset")
+                        wall, rss, code = run_child(cmd, env, work / "run.log")
+                        http, mail = stand_ins.call("stats")
+                        results.append({
+                            "script": script,
+                            "mode": mode,
+                            "phase": phase,
+                            "wall_s": round(wall, 3),
+                            "peak_rss": rss,
+                            "requests": http["requests"] + mail["messages"],
+                            "bytes": http["bytes"] + mail["bytes"],
+                            "errors_injected": http["errors"] + mail["errors"],
+                            "exit": code,
+                        })
+                        if code != 0:
+                            print(f"  WARN: {script} ({mode}, {phase}) exited {code}; "
+                                  f"log: {work / 'run.log'}", file=sys.stderr)
+                            sys.stderr.write((work / "run.log").read_text(errors="replace")[-2000:])
+                    if args.keep_logs:
+                        args.keep_logs.mkdir(parents=True, exist_ok=True)
+                        (args.keep_logs / f"{work.name}.log").write_bytes((work / "run.log").read_bytes())
+    finally:
+        stand_ins.stop()
+    return results
+
+
+def print_report(results: list[dict]) -> None:
+    header = f"{'script':<10} {'mode':<11} {'phase':<5} {'wall':>8} {'peak RSS':>10} {'requests':>9} {'bytes':>10}  exit"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['script']:<10} {r['mode']:<11} {r['phase']:<5} {r['wall_s']:>7.2f}s "
+              f"{format_bytes(r['peak_rss']):>10} {r['requests']:>9} {format_bytes(r['bytes']):>10}  "
+              f"{r['exit']}")
+
+
+def compare(results: list[dict], baseline_path: Path, tolerance: float) -> list[str]:
+    """Return a line per metric that regressed beyond tolerance."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {(r["script"], r["mode"], r["phase"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r["script"], r["mode"], r["phase"]))
+        if not old:
+            continue
+        for metric in ("wall_s", "peak_rss", "bytes"):
+            if old[metric] and r[metric] > old[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{r['script']} {r['mode']} {r['phase']}: {metric} "
+                    f"{old[metric]} -> {r[metric]} (+{(r[metric] / old[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def record(target: Path) -> None:
+    """Snapshot the live static upstream payloads as replay fixtures."""
+    from http_pool import shared_pool
+    urls = [f"https://{KEV_HOST}{KEV_PATH}", f"https://{APPLE_HOST}{APPLE_CHARTS_PATH}?genre=1318"]
+    urls += [f"https://{host}{path}" for host, path in FEEDS]
+    pool = shared_pool()
+    for url in urls:
+        host, _, rest = url.split("://", 1)[1].partition("/")
+        path = target / host / rest.split("?", 1)[0]
+        if rest.endswith("/"):
+            path = path / "index"
+        try:
+            with pool.request("GET", url, timeout=60) as resp:
+                body = resp.content()
+        except OSError as e:
+            print(f"  WARN: Failed to record {url}: {e}", file=sys.stderr)
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+        print(f"  {url} -> {path} ({format_bytes(len(body))})", file=sys.stderr)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the pre-fetch and email scripts offline")
+    parser.add_argument("--scripts", default="osint,news,podcasts,email",
+                        help="Comma-separated: osint, news, podcasts, email")
+    parser.add_argument("--modes", default="serial,concurrent",
+                        help="Comma-separated fetch modes: serial, concurrent")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of HTTP requests answered with 503 "
+                             "(and of emails with SMTP 451)")
+    parser.add_argument("--recipients", type=int, default=1,
+                        help="Subscribers the email run delivers to")
+    parser.add_argument("--scale", type=float, default=1.0, help="Payload size multiplier")
+    parser.add_argument("--fixtures", type=Path, help="Directory of recorded payloads")
+    parser.add_argument("--json", type=Path, help="Write the report as JSON")
+    parser.add_argument("--baseline", type=Path, help="Earlier --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed growth over baseline (0.2 = 20%%)")
+    parser.add_argument("--keep-logs", type=Path, help="Copy each run's output here")
+    parser.add_argument("--record", type=Path, help="Record live static payloads into DIR and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        return
+
+    args.scripts = [s.strip() for s in args.scripts.split(",") if s.strip()]
+    args.modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(args.scripts) - {"osint", "news", "podcasts", "email"} | set(args.modes) - {"serial", "concurrent"}
+    if unknown:
+        parser.error(f"unknown script/mode: {', '.join(sorted(unknown))}")
+
+    results = benchmark(args)
+    print_report(results)
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "settings": {"latency": args.latency, "error_rate": args.error_rate,
+                         "recipients": args.recipients,
+                         "scale": args.scale, "fixtures": str(args.fixtures or "")},
+            "results": results,
+        }, indent=2), encoding="utf-8")
+
+    failed = [r for r in results if r["exit"] != 0]
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
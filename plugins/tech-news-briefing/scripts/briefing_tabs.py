@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""Generate a daily or weekly briefing as one `claude -p` job per tab, merged locally.
+
+A single claude -p call researches, curates and formats every tab in turn,
+so it takes as long as all of them together, in one ever-growing context.
+This runs one job per tab instead, all at once. Each job gets only its
+tab's prompt ("tabs" in config/prompts.json: the trimmed skills and the
+template's tab, compiled and cached by prompt_compiler.py) plus a JOB
+section with the date, the tab's scope, its slice of today's pre-fetch
+files and, weekly, the week's archive digest (computed once here). Each job
+has its own --max-budget-usd and timeout, so the run takes as long as the
+slowest tab.
+
+A job prints its tab, from the <!-- tab: --> marker, and two trailer lines,
+<!-- sources: ... --> and <!-- unreachable: ... -->. The merge is local and
+deterministic:
+
+  - Tabs go in template order. The header and footer placeholders are
+    filled here (date, story count, timestamp, every tab's sources), with
+    a note for unreachable sources and for tabs whose job failed.
+  - A story in more than one tab (same URL, sole CVE or similar title, as
+    archive_index.cluster() groups stories across days) stays in the first
+    tab only.
+  - Sections and tabs left empty are dropped.
+
+Before the merge, every link is checked (url_check.py) and rewritten to its
+canonical URL, and stories whose link is a homepage, a section page or
+answers 404/410 are removed, so send-email.py never ships one.
+
+The briefing is written to BRIEFING_DIR/YYYY/week-WW/ (YYYY-MM-DD.md, or
+week-WW-recap.md); --publish then commits and pushes it and emails it with
+send-email.py. If every job fails nothing is written and the exit status
+is 1, so run-briefing.sh can fall back to the single-call prompt.
+
+Usage:
+    python3 briefing_tabs.py --cadence daily [--date YYYY-MM-DD] [--publish]
+    python3 briefing_tabs.py --cadence weekly --dry-run     # prompt sizes only
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+
+from archive_index import HEADING, ITEM, TAB, ArchiveIndex, cluster, parse_story
+from payload import dumps
+from prompt_compiler import (PLUGIN_ROOT, RULE, compile_prompt, estimate_tokens, load_manifest,
+                             split_template)
+from story_index import BRIEFING_DIR, fingerprints
+from url_check import DEAD_CODES, LINK, shared_checker
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+CLAUDE = "claude"
+MODEL = "sonnet"
+CADENCES = ("daily", "weekly")
+TEMPLATES = {"daily": "templates/daily.md", "weekly": "templates/weekly.md"}
+PAYLOAD_META = ("format", "date", "fetched_at", "fetch_stats", "full")
+
+TRAILER = re.compile(r"^\s*<!--\s*(sources|unreachable):\s*(.*?)\s*-->\s*$", re.I)
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+FENCE = re.compile(r"^\s*```\w*\s*$")
+GENERATED_BY = "*Generated by"
+EMPTY_BRIEFING = "*No significant tech news stories found for today.*"
+
+
+@dataclass
+class TabResult:
+    """One tab job's outcome: the tab's markdown and its trailer lines."""
+    name: str
+    text: str = ""
+    sources: list[str] = field(default_factory=list)
+    unreachable: list[str] = field(default_factory=list)
+    error: str | None = None
+    seconds: float = 0.0
+
+
+# -- job prompts -----------------------------------------------------------------
+
+def prefetch_slice(spec: dict[str, list[str]], target_date: str,
+                   prefetch_dir: Path = PREFETCH_DIR) -> str:
+    """The JOB section's pre-fetch part: the listed sections of each payload file."""
+    parts = []
+    for name, sections in spec.items():
+        path = prefetch_dir / f"{name}-{target_date}.json"
+        try:
+            doc = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            parts.append(f"## Pre-fetch: {path}\n\nNot available this run — research the "
+                         f"tab's sources directly.")
+            continue
+        kept = {k: v for k, v in doc.items() if k in PAYLOAD_META or k in sections}
+        parts.append(f"## Pre-fetch: {path} ({', '.join(sections)})\n\n"
+                     f"```json\n{dumps(kept)}\n```")
+    return "\n\n".join(parts)
+
+
+def week_digest(target: date, archive: Path = BRIEFING_DIR) -> dict | None:
+    """archive_index.py digest --cadence weekly for target's week, or None."""
+    try:
+        with ArchiveIndex() as index:
+            index.sync(archive)
+            return index.digest("weekly", today=target)
+    except (sqlite3.Error, OSError) as e:
+        print(f"  WARN: Week digest unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def job_section(tab: dict, cadence: str, target: date, plugin_root: Path,
+                digest: dict | None) -> str:
+    """The per-run tail of a tab's prompt (the static part is cached)."""
+    year, week, _ = target.isocalendar()
+    scope = tab.get("scope", "").replace("${CLAUDE_PLUGIN_ROOT}", str(plugin_root))
+    parts = [
+        "# JOB",
+        f"- **Tab:** {tab['name']} (marker `<!-- tab: {tab['name']} -->`)\n"
+        f"- **Cadence:** {cadence}\n"
+        f"- **Date:** {target:%A}, {target:%B} {target.day}, {target.year} "
+        f"({target.isoformat()}, ISO week {year}-W{week:02d})\n"
+        f"- **Scope:** {scope}",
+    ]
+    if tab.get("prefetch"):
+        parts.append(prefetch_slice(tab["prefetch"], target.isoformat()))
+    if tab.get("digest"):
+        parts.append("## Week digest\n\n" + (f"```json\n{dumps(digest)}\n```" if digest else
+                                            "Not available this run — read the week's "
+                                            "daily briefings directly."))
+    return "\n\n".join(parts) + "\n"
+
+
+def tab_prompts(cadence: str, target: date, plugin_root: Path = PLUGIN_ROOT,
+                digest: dict | None = None) -> list[tuple[dict, str, dict]]:
+    """(tab config, full prompt, compile metadata) per tab, in manifest order."""
+    config = load_manifest(plugin_root / "config" / "prompts.json")["cadences"][cadence]
+    prompts = []
+    for tab in config.get("tabs", []):
+        path, meta = compile_prompt(cadence, plugin_root, tab=tab["name"])
+        static = path.read_text(encoding="utf-8")
+        prompt = f"{static}\n---\n\n{job_section(tab, cadence, target, plugin_root, digest)}"
+        prompts.append((tab, prompt, meta))
+    return prompts
+
+
+# -- jobs ------------------------------------------------------------------------
+
+def parse_tab(output: str, name: str) -> TabResult:
+    """A job's stdout -> its tab: from the marker to the next one, trailers removed."""
+    result = TabResult(name)
+    lines = output.splitlines()
+    start = next((i for i, line in enumerate(lines)
+                  if (m := TAB.search(line)) and m.group(1) == name), None)
+    if start is None:
+        result.error = f"no <!-- tab: {name} --> marker in its output"
+        return result
+    body = [lines[start]]
+    for line in lines[start + 1:]:
+        if TAB.search(line):
+            break
+        trailer = TRAILER.match(line)
+        if trailer:
+            names = [s.strip() for s in trailer.group(2).split(",") if s.strip()]
+            getattr(result, trailer.group(1).lower()).extend(names)
+        else:
+            body.append(line)
+    while body and (not body[-1].strip() or RULE.match(body[-1]) or FENCE.match(body[-1])):
+        body.pop()
+    result.text = "\n".join(body)
+    return result
+
+
+def run_job(tab: dict, prompt: str, claude: str = CLAUDE, model: str = MODEL,
+            cwd: Path | None = None) -> TabResult:
+    """Run one tab's claude -p job to completion or its timeout."""
+    cmd = [claude, "-p", "--model", model, "--dangerously-skip-permissions",
+           "--max-budget-usd", f"{tab.get('max_budget_usd', 1.0):.2f}"]
+    started = time.monotonic()
+    try:
+        proc = subprocess.run(cmd, input=prompt, capture_output=True, text=True,
+                              timeout=tab.get("timeout"), cwd=cwd)
+    except subprocess.TimeoutExpired:
+        result = TabResult(tab["name"], error=f"timed out after {tab.get('timeout')}s")
+    except OSError as e:
+        result = TabResult(tab["name"], error=str(e))
+    else:
+        if proc.returncode != 0:
+            last = (proc.stderr.strip() or proc.stdout.strip()).splitlines()[-1:]
+            detail = f": {last[0][:200]}" if last else ""
+            result = TabResult(tab["name"], error=f"exit {proc.returncode}{detail}")
+        else:
+            result = parse_tab(proc.stdout, tab["name"])
+    result.seconds = time.monotonic() - started
+    return result
+
+
+def run_jobs(prompts: list[tuple[dict, str, dict]], claude: str = CLAUDE,
+             model: str = MODEL, cwd: Path | None = None) -> dict[str, TabResult]:
+    """Every tab's job at once; returns results by tab name."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(prompts))) as pool:
+        futures = {pool.submit(run_job, tab, prompt, claude, model, cwd): tab["name"]
+                   for tab, prompt, _ in prompts}
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.name] = result
+            if result.error:
+                print(f"  WARN: {result.name} failed after {result.seconds:.0f}s: "
+                      f"{result.error}", file=sys.stderr)
+            else:
+                print(f"  {result.name}: done in {result.seconds:.0f}s", file=sys.stderr)
+    return results
+
+
+# -- merge -----------------------------------------------------------------------
+
+def item_spans(lines: list[str]) -> list[tuple[int, int]]:
+    """[start, end) line ranges of the list items, as archive_index.parse_briefing reads them."""
+    spans, start, fenced = [], None, False
+    for i, line in enumerate(lines):
+        fence = line.lstrip().startswith("```")
+        if fence:
+            fenced = not fenced
+        bullet = None if fence or fenced else ITEM.match(line)
+        if fence or fenced or bullet or not line.strip() or not line[:1].isspace():
+            if start is not None:
+                spans.append((start, i))
+            start = None
+        if bullet:
+            start = i
+    if start is not None:
+        spans.append((start, len(lines)))
+    return spans
+
+
+def _story(lines: list[str], span: tuple[int, int]) -> dict | None:
+    first = ITEM.match(lines[span[0]]).group(1)
+    return parse_story(" ".join([first] + [line.strip() for line in lines[span[0] + 1:span[1]]]))
+
+
+def dedup(tabs: list[TabResult]) -> int:
+    """Remove stories repeated in a later tab; returns how many were removed."""
+    entries = []
+    for n, tab in enumerate(tabs):
+        lines = tab.text.splitlines()
+        for span in item_spans(lines):
+            story = _story(lines, span)
+            if story is None:
+                continue
+            keys, words = fingerprints(story["title"], story["url"], story["cves"])
+            entries.append({"keys": " ".join(keys), "words": " ".join(sorted(words)),
+                            "cves": story["cves"], "tab": n, "span": span})
+    drop: dict[int, list[tuple[int, int]]] = {}
+    for group in cluster(entries):
+        for entry in group:
+            if entry["tab"] != group[0]["tab"]:
+                drop.setdefault(entry["tab"], []).append(entry["span"])
+    for n, spans in drop.items():
+        lines = tabs[n].text.splitlines()
+        for start, end in sorted(spans, reverse=True):
+            del lines[start:end]
+        tabs[n].text = "\n".join(lines)
+    return sum(len(spans) for spans in drop.values())
+
+
+def check_links(tabs: list[TabResult], offline: bool = False) -> int:
+    """Canonicalize every tab's links and remove stories whose link is bad (url_check.py).
+
+    Only evidence a network outage cannot fake removes a story: a homepage
+    or section link, or an HTTP 404/410. Links that could not be checked
+    (DNS, timeouts) stay. Returns how many stories were removed.
+    """
+    checker = shared_checker()
+    parsed = []
+    for tab in tabs:
+        lines = tab.text.splitlines()
+        stories = [(span, _story(lines, span)) for span in item_spans(lines)]
+        parsed.append((lines, [(span, story) for span, story in stories if story]))
+    verdicts = checker.check([url for tab in tabs for _, url in LINK.findall(tab.text)],
+                             offline=offline)
+    removed = 0
+    for tab, (lines, stories) in zip(tabs, parsed):
+        bad = [span for span, story in stories
+               if (v := verdicts.get(story["url"])) is not None
+               and (v.kind != "article" or v.code in DEAD_CODES)]
+        for start, end in sorted(bad, reverse=True):
+            del lines[start:end]
+        removed += len(bad)
+        canonical = lambda m: (f"[{m.group(1)}]({verdicts[m.group(2)].canonical})"
+                               if m.group(2) in verdicts else m.group(0))
+        tab.text = LINK.sub(canonical, "\n".join(lines))
+    checker.save()
+    return removed
+
+
+def prune(text: str) -> str:
+    """Drop empty H2 sections and stray --- rules; "" if the tab has no content left."""
+    blocks: list[list[str]] = [[]]
+    for line in text.splitlines():
+        if HEADING.match(line):
+            blocks.append([])
+        blocks[-1].append(line)
+    content = lambda line: line.strip() and not RULE.match(line)
+    kept = blocks[:1] + [b for b in blocks[1:] if any(content(line) for line in b[1:])]
+    if len(kept) == 1 and not any(content(line) and not TAB.search(line) for line in kept[0]):
+        return ""
+
+    lines: list[str] = []
+    last = ""                                    # last non-blank line kept
+    for line in (line for block in kept for line in block):
+        if not line.strip():
+            if lines and lines[-1].strip():
+                lines.append(line)
+            continue
+        if RULE.match(line) and (not last or RULE.match(last) or TAB.search(last)):
+            continue
+        lines.append(line)
+        last = line
+    while lines and (not lines[-1].strip() or RULE.match(lines[-1])):
+        lines.pop()
+    return "\n".join(lines)
+
+
+def count_stories(text: str) -> int:
+    lines = text.splitlines()
+    return sum(1 for span in item_spans(lines) if _story(lines, span) is not None)
+
+
+def _unique(names: list[str]) -> list[str]:
+    seen: dict[str, str] = {}
+    for name in names:
+        seen.setdefault(name.lower(), name)
+    return list(seen.values())
+
+
+def timestamp(now: datetime | None = None) -> str:
+    """"6:00 AM MST"."""
+    now = (now or datetime.now()).astimezone()
+    return now.strftime("%I:%M %p %Z").lstrip("0")
+
+
+def merge(template: str, results: dict[str, TabResult], target: date,
+          digest: dict | None = None, now: datetime | None = None) -> str:
+    """The final briefing: the template's header, tabs and footer, filled from the jobs."""
+    header, template_tabs, footer = split_template(template)
+    tabs = [results[name] for name, _ in template_tabs
+            if name in results and not results[name].error]
+    removed = dedup(tabs)
+    if removed:
+        print(f"  Cross-tab dedup removed {removed} repeated stories", file=sys.stderr)
+    for tab in tabs:
+        tab.text = prune(tab.text)
+    bodies = [tab.text for tab in tabs if tab.text]
+    # Weekly templates end every tab with a --- rule; daily ones only the last
+    ruled = any(RULE.match(body.splitlines()[-1]) for _, body in template_tabs if body)
+    separator = "\n\n---\n\n" if ruled else "\n\n"
+
+    sources = _unique([s for tab in tabs for s in tab.sources])
+    unreachable = _unique([s for tab in tabs for s in tab.unreachable])
+    failed = [name for name, _ in template_tabs
+              if name not in results or results[name].error]
+    values = {
+        "DATE_FULL": f"{target:%B} {target.day}, {target.year}",
+        "DAY_OF_WEEK": f"{target:%A}",
+        "WEEK": f"{target.isocalendar()[1]:02d}",
+        "STORY_COUNT": str(sum(count_stories(body) for body in bodies)),
+        "TIMESTAMP": timestamp(now),
+        "SOURCES_LIST": ", ".join(sources),
+        "DAILY_DATES": str(len(digest["dailies"])) if digest else "0",
+    }
+    footer_lines = [line for line in footer.splitlines()
+                    if sources or "{{SOURCES_LIST}}" not in line]
+    notes = []
+    if unreachable:
+        notes.append(f"*Note: The following sources were unreachable during this run: "
+                     f"{', '.join(unreachable)}*")
+    if failed:
+        notes.append(f"*Note: These tabs could not be generated this run: {', '.join(failed)}*")
+    at = next((i for i, line in enumerate(footer_lines) if line.startswith(GENERATED_BY)),
+              len(footer_lines))
+    footer_lines[at:at] = notes
+
+    fill = lambda text: PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), text)
+    body = separator.join(bodies) if bodies else EMPTY_BRIEFING
+    footer = "\n".join(footer_lines)
+    return f"{fill(header)}\n\n{body}\n\n---\n\n{fill(footer)}\n"
+
+
+# -- output ----------------------------------------------------------------------
+
+def output_path(cadence: str, target: date, archive: Path = BRIEFING_DIR) -> Path:
+    year, week, _ = target.isocalendar()
+    name = f"{target.isoformat()}.md" if cadence == "daily" else f"week-{week:02d}-recap.md"
+    return archive / str(year) / f"week-{week:02d}" / name
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def publish(path: Path, cadence: str, target: date, archive: Path = BRIEFING_DIR) -> None:
+    """git add/commit/push the briefing, then email it; failures are logged, not fatal."""
+    week = target.isocalendar()[1]
+    message = (f"briefing: {target.isoformat()}" if cadence == "daily"
+               else f"weekly: week-{week:02d} recap")
+    for args in (["add", str(path.relative_to(archive))], ["commit", "-m", message],
+                 ["push", "origin", "main"]):
+        proc = subprocess.run(["git", "-C", str(archive), *args], capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"  WARN: git {args[0]} failed: {(proc.stderr or proc.stdout).strip()}",
+                  file=sys.stderr)
+            break
+    else:
+        print(f"Pushed {path.name}", file=sys.stderr)
+    proc = subprocess.run([sys.executable, str(SCRIPTS_DIR / "send-email.py"), str(path)])
+    if proc.returncode != 0:
+        print("  WARN: Email not sent (left in the outbox for send-email.py --flush)",
+              file=sys.stderr)
+
+
+def run(cadence: str, target: date, plugin_root: Path = PLUGIN_ROOT, claude: str = CLAUDE,
+        model: str = MODEL, publish_result: bool = False, dry_run: bool = False) -> Path | None:
+    """Run every tab's job and write the merged briefing; None if nothing was written."""
+    digest = week_digest(target) if cadence == "weekly" else None
+    prompts = tab_prompts(cadence, target, plugin_root, digest)
+    for tab, prompt, meta in prompts:
+        tokens = estimate_tokens(prompt)
+        print(f"  {tab['name']}: ~{tokens:,} tokens (~{meta['tokens']:,} cached"
+              f"{', compiled' if not meta['cached'] else ''}), "
+              f"${tab.get('max_budget_usd', 1.0):.2f} / {tab.get('timeout')}s", file=sys.stderr)
+        budget = meta.get("token_budget") or 0
+        if budget and meta["tokens"] > budget:
+            print(f"  WARN: {tab['name']} prompt is ~{meta['tokens']:,} tokens, "
+                  f"over its budget of {budget:,}", file=sys.stderr)
+    if dry_run:
+        return None
+
+    print(f"Running {len(prompts)} tab jobs...", file=sys.stderr)
+    started = time.monotonic()
+    results = run_jobs(prompts, claude, model, BRIEFING_DIR if BRIEFING_DIR.is_dir() else None)
+    if not any(not r.error for r in results.values()):
+        print("ERROR: Every tab job failed; nothing written", file=sys.stderr)
+        return None
+
+    removed = check_links([r for r in results.values() if not r.error])
+    if removed:
+        print(f"  Link check removed {removed} stories with a homepage, section or 404 link",
+              file=sys.stderr)
+    template = (plugin_root / TEMPLATES[cadence]).read_text(encoding="utf-8")
+    doc = merge(template, results, target, digest)
+    path = output_path(cadence, target)
+    _write_atomic(path, doc)
+    print(f"Wrote {path} in {time.monotonic() - started:.0f}s", file=sys.stderr)
+    if publish_result:
+        publish(path, cadence, target)
+    return path
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate a briefing as parallel per-tab jobs")
+    parser.add_argument("--cadence", required=True, choices=CADENCES)
+    parser.add_argument("--date", help="Briefing date (YYYY-MM-DD), default today")
+    parser.add_argument("--plugin-root", type=Path, default=PLUGIN_ROOT,
+                        help="Plugin directory (replaces ${CLAUDE_PLUGIN_ROOT})")
+    parser.add_argument("--claude", default=CLAUDE, help="claude executable")
+    parser.add_argument("--model", default=MODEL, help="Model for every tab job")
+    parser.add_argument("--publish", action="store_true",
+                        help="git commit/push and email the briefing after writing it")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Build every tab's prompt and report its size; run nothing")
+    args = parser.parse_args()
+
+    target = date.fromisoformat(args.date) if args.date else date.today()
+    try:
+        path = run(args.cadence, target, args.plugin_root.resolve(), args.claude, args.model,
+                   args.publish, args.dry_run)
+    except (KeyError, OSError, ValueError) as e:
+        print(f"ERROR: Cannot build the {args.cadence} tab prompts: {e}", file=sys.stderr)
+        sys.exit(1)
+    if path is None and not args.dry_run:
+        sys.exit(1)
+    if path is not None:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Where the polling daemon keeps its state, and whether it is running.
+
+prefetch_daemon.py writes prefetch/daemon/state.json (pid, heartbeat and
+each source's schedule) and holds prefetch/daemon/daemon.lock while it
+runs. prefetch.py only needs to know whether it is running, so this lives
+apart from the daemon and its imports of the collector scripts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+DAEMON_DIR = PREFETCH_DIR / "daemon"
+STATE_PATH = DAEMON_DIR / "state.json"
+LOCK_PATH = DAEMON_DIR / "daemon.lock"
+
+HEARTBEAT_STALE = 180.0    # a heartbeat older than this means the daemon is gone
+
+
+def read_state(state_path: Path = STATE_PATH) -> dict | None:
+    try:
+        return json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def running(state_path: Path = STATE_PATH) -> dict | None:
+    """The daemon's state if it is running (live pid, recent heartbeat), else None."""
+    state = read_state(state_path)
+    if not state or state.get("stopped"):
+        return None
+    try:
+        heartbeat = datetime.fromisoformat(state["heartbeat"])
+        age = (datetime.now(timezone.utc) - heartbeat).total_seconds()
+        os.kill(int(state["pid"]), 0)
+    except PermissionError:
+        pass
+    except (KeyError, ValueError, ProcessLookupError):
+        return None
+    return state if age <= HEARTBEAT_STALE else None
@@ -0,0 +1,490 @@
+"""Article full-text extraction for the top-ranked pre-fetched stories.
+
+Feeds and APIs give a story's title and a description of a few hundred
+characters, so the research skill used to WebFetch each article it wanted
+to write up, one round trip at a time inside the LLM run. This stage
+fetches those pages up front, concurrently, strips them to the main
+article text and adds it to the record as `extract` (cut to `max_chars`;
+payload.py trims it further in the compact file).
+
+Which records: the top `top_n` of every table (per source), ranked the
+way payload.py ranks them for the compact file, so the extracts land on
+rows that are inline. Each URL is fetched once per run however many
+records share it.
+
+Politeness: pages are grouped by host into at most `per_host` lanes; a
+lane fetches one page at a time, `delay` seconds apart, and up to
+`max_workers` lanes run at once. Under a run-wide deadline no page is
+started once it has passed (see resilience.py); those records simply
+have no extract. --warm runs (and so the polling daemon's snapshots) use
+cached extracts only.
+
+Boilerplate: script, style, navigation, header, footer, aside, form and
+similar elements, and elements whose class or id looks like comments,
+share buttons, newsletters, related links or ads, are dropped. If the page
+has an <article> or <main> with enough text, only that counts. Of the
+remaining paragraphs, headings, list items and quotes, short and mostly
+linked blocks are dropped. Pages with no usable text fall back to their
+meta description.
+
+Cache: prefetch/extracts/ holds one objects/<sha256>.txt per distinct
+extract, named by the hash of its text, and index.json mapping each URL
+(url_check.normalize_url) to its object and fetch time. A URL extracted
+within `ttl_days` is not fetched again, across days and cadences; a failed
+URL is retried after `retry_hours`. Identical text reached from several
+URLs is stored once, and objects no index entry refers to are deleted on
+save().
+
+Settings come from the registry's "extract" block:
+
+  {"enabled": true, "top_n": 3, "max_chars": 2000, "ttl_days": 7,
+   "retry_hours": 24, "per_host": 2, "delay": 1.0, "max_workers": 16,
+   "timeout": 15}
+
+Usage (the collectors call add_extracts() themselves):
+    python3 extract.py URL [URL ...]      # print each page's extract
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterable
+from urllib.error import URLError
+from urllib.parse import urlsplit
+
+from fetch_engine import host_lanes
+from http_pool import USER_AGENT, BodyDecoder, shared_pool
+from payload import Section, ranked
+from resilience import DeadlineExceeded
+from url_check import normalize_url
+import resilience
+import telemetry
+
+EXTRACT_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch" / "extracts"
+DEFAULT_TOP_N = 3
+DEFAULT_MAX_CHARS = 2000
+DEFAULT_TTL_DAYS = 7
+DEFAULT_RETRY_HOURS = 24
+DEFAULT_PER_HOST = 2
+DEFAULT_DELAY = 1.0            # seconds between pages in one host lane
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TIMEOUT = 15
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+MAX_TEXT_CHARS = 20000         # stored per page; records get max_chars of it
+MIN_BLOCK_CHARS = 40
+MIN_MAIN_CHARS = 200
+MAX_LINK_DENSITY = 0.5
+
+SKIP_TAGS = {"title", "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+             "nav", "header", "footer", "aside", "form", "button", "select", "figure",
+             "dialog"}
+BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "pre", "blockquote", "td",
+              "dd", "dt", "div", "section", "article", "main", "tr", "ul", "ol"}
+# Skipped for a boilerplate class or id; all of them always have an end tag
+CONTAINER_TAGS = {"div", "section", "ul", "ol", "span", "table"}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+MAIN_TAGS = {"article", "main"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+             "source", "track", "wbr"}
+BOILERPLATE = re.compile(
+    r"(?:^|[\s_-])(?:comments?|share|sharing|social|related|promo|newsletter|subscribe|"
+    r"cookies?|consent|banner|sidebar|menu|breadcrumbs?|advert\w*|ads?|sponsored|"
+    r"popup|modal|footer|navbar|nav)(?:$|[\s_-])", re.IGNORECASE)
+# ...unless it also names the content itself (e.g. "post-content has-sidebar")
+CONTENT = re.compile(r"article|body|content|main|post|entry|story|text", re.IGNORECASE)
+CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+# -- boilerplate stripping ------------------------------------------------------
+
+class MainText(HTMLParser):
+    """Collect a page's text blocks, skipping boilerplate elements."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: list[tuple[str, str, bool, int]] = []  # (tag, text, in_main, link chars)
+        self.description = ""
+        self._skip: tuple[str, int] | None = None            # (tag, nesting depth)
+        self._main = 0
+        self._link = 0
+        self._tag = "p"
+        self._parts: list[str] = []
+        self._link_chars = 0
+
+    def _flush(self) -> None:
+        text = WHITESPACE.sub(" ", "".join(self._parts)).strip()
+        if text:
+            self.blocks.append((self._tag, text, self._main > 0, self._link_chars))
+        self._parts, self._link_chars = [], 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self._skip:
+            if tag == self._skip[0]:
+                self._skip = (tag, self._skip[1] + 1)
+            return
+        attr = dict(attrs)
+        if tag == "meta":
+            name = (attr.get("name") or attr.get("property") or "").lower()
+            if name in ("description", "og:description") and not self.description:
+                self.description = WHITESPACE.sub(" ", attr.get("content") or "").strip()
+            return
+        if tag == "br":
+            self._parts.append(" ")
+        if tag in VOID_TAGS:
+            return
+        marker = f"{attr.get('class') or ''} {attr.get('id') or ''} {attr.get('role') or ''}"
+        if tag in SKIP_TAGS or (tag in CONTAINER_TAGS and BOILERPLATE.search(marker)
+                                and not CONTENT.search(marker)):
+            self._flush()
+            self._skip = (tag, 1)
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._tag = tag
+        if tag in MAIN_TAGS:
+            self._main += 1
+        elif tag == "a":
+            self._link += 1
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # <br/>, <meta .../> count; a self-closed <svg/> or <a/> has no content to skip or link
+        if tag in VOID_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skip:
+            if tag == self._skip[0]:
+                depth = self._skip[1] - 1
+                self._skip = (tag, depth) if depth else None
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._tag = "p"
+        if tag in MAIN_TAGS:
+            self._main = max(0, self._main - 1)
+        elif tag == "a":
+            self._link = max(0, self._link - 1)
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+        self._parts.append(data)
+        if self._link:
+            self._link_chars += len(data.strip())
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+
+def extract_text(html: str) -> str:
+    """The main text of an HTML page, one block per line ("" if none)."""
+    parser = MainText()
+    parser.feed(html)
+    parser.close()
+    blocks = parser.blocks
+    main = [b for b in blocks if b[2]]
+    if sum(len(text) for _, text, _, _ in main) >= MIN_MAIN_CHARS:
+        blocks = main
+    kept: list[str] = []
+    for tag, text, _, link_chars in blocks:
+        if link_chars > MAX_LINK_DENSITY * len(text):
+            continue
+        if len(text) < MIN_BLOCK_CHARS and tag not in HEADINGS:
+            continue
+        if not kept or kept[-1] != text:
+            kept.append(text)
+    # A heading with nothing under it is page furniture, not article structure
+    while kept and len(kept[-1]) < MIN_BLOCK_CHARS:
+        kept.pop()
+    return "\n".join(kept) or parser.description
+
+
+def clip(text: str, max_chars: int) -> str:
+    """Cut text to at most max_chars at a word boundary, ending with an ellipsis."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > max_chars // 2 else cut).rstrip(",.;:") + "…"
+
+
+def fetch_page(url: str, timeout: float = DEFAULT_TIMEOUT,
+               max_bytes: int = MAX_PAGE_BYTES) -> str:
+    """GET an HTML page and return it as text, decoded, cut to max_bytes.
+
+    Raises URLError/HTTPError/TimeoutError like urlopen, ValueError for a
+    response that is not HTML.
+    """
+    headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"}
+    with shared_pool().request("GET", url, headers=headers, timeout=timeout) as resp:
+        ctype = resp.headers.get("Content-Type", "")
+        if "html" not in ctype.lower():
+            raise ValueError(f"not an HTML page ({ctype or 'no content type'})")
+        decoder = BodyDecoder(resp.headers.get("Content-Encoding"))
+        body = bytearray()
+        while len(body) < max_bytes and (chunk := resp.read(64 * 1024)):
+            body += decoder.decompress(chunk)
+        body += decoder.flush()
+    with telemetry.parsing():
+        charset = resp.headers.get_content_charset()
+        if not charset and (match := CHARSET.search(bytes(body[:4096]))):
+            charset = match.group(1).decode("ascii")
+        try:
+            return bytes(body[:max_bytes]).decode(charset or "utf-8", errors="replace")
+        except LookupError:
+            return bytes(body[:max_bytes]).decode("utf-8", errors="replace")
+
+
+# -- content-addressed cache ----------------------------------------------------
+
+_shared: dict[Path, "ExtractCache"] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_extract_cache(root: Path = EXTRACT_DIR) -> ExtractCache:
+    """Process-wide cache for a directory (the collectors in prefetch.py share one)."""
+    with _shared_lock:
+        if root not in _shared:
+            _shared[root] = ExtractCache(root)
+        return _shared[root]
+
+
+class ExtractCache:
+    """Extracted page text, stored by content hash and indexed by URL."""
+
+    def __init__(self, root: Path = EXTRACT_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] = {}
+        self._loaded = False
+        # Entries older than this are dropped on save(); set by extract_records()
+        self.ttl_days = DEFAULT_TTL_DAYS
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.json"
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self._index = {}
+
+    def count(self, hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def object_path(self, sha: str) -> Path:
+        return self.root / "objects" / f"{sha}.txt"
+
+    def get(self, url: str, ttl_days: float = DEFAULT_TTL_DAYS,
+            retry_hours: float = DEFAULT_RETRY_HOURS) -> tuple[bool, str | None]:
+        """(fresh, text) for url. text is None for a cached failure or a miss.
+
+        An entry is fresh for ttl_days after a successful extraction and
+        retry_hours after a failed one.
+        """
+        with self._lock:
+            self._load()
+            entry = self._index.get(normalize_url(url) or url)
+        if not entry:
+            return False, None
+        age = time.time() - entry.get("fetched", 0)
+        if entry.get("sha") is None:
+            return age < retry_hours * 3600, None
+        if age >= ttl_days * 86400:
+            return False, None
+        try:
+            return True, self.object_path(entry["sha"]).read_text(encoding="utf-8")
+        except OSError:
+            return False, None
+
+    def put(self, url: str, text: str | None, error: str | None = None) -> None:
+        """Store url's extract (or, with text None, that extracting it failed)."""
+        entry: dict = {"url": url, "fetched": time.time()}
+        if text is not None:
+            sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            path = self.object_path(sha)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+                tmp.write_text(text, encoding="utf-8")
+                os.replace(tmp, path)
+            entry["sha"] = sha
+        else:
+            entry["error"] = error or "no text"
+        with self._lock:
+            self._load()
+            self._index[normalize_url(url) or url] = entry
+
+    def save(self) -> None:
+        """Drop entries past ttl_days, write the index, delete unreferenced objects."""
+        with self._lock:
+            if not self._loaded:
+                return
+            cutoff = time.time() - self.ttl_days * 86400
+            self._index = {k: e for k, e in self._index.items() if e.get("fetched", 0) >= cutoff}
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._index), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+            live = {e["sha"] for e in self._index.values() if e.get("sha")}
+        for path in (self.root / "objects").glob("*.txt"):
+            if path.stem not in live:
+                path.unlink(missing_ok=True)
+
+    def report(self, label: str = "Article extracts") -> None:
+        """Print cached/fetched counters to stderr."""
+        print(f"{label}: {self.hits} cached, {self.misses} fetched", file=sys.stderr)
+
+
+# -- extraction stage -----------------------------------------------------------
+
+def extract_records(records: Iterable[dict], settings: dict | None = None,
+                    offline: bool = False, cache: ExtractCache | None = None) -> int:
+    """Add `extract` to each record with a "url", fetching pages not in the cache.
+
+    offline=True (warm mode) only uses the cache. Returns the number of
+    records that got an extract.
+    """
+    settings = settings or {}
+    cache = cache or shared_extract_cache()
+    ttl_days = float(settings.get("ttl_days", DEFAULT_TTL_DAYS))
+    cache.ttl_days = ttl_days
+    retry_hours = float(settings.get("retry_hours", DEFAULT_RETRY_HOURS))
+    max_chars = int(settings.get("max_chars", DEFAULT_MAX_CHARS))
+    timeout = float(settings.get("timeout", DEFAULT_TIMEOUT))
+    delay = float(settings.get("delay", DEFAULT_DELAY))
+
+    by_url: dict[str, list[dict]] = defaultdict(list)
+    for record in records:
+        url = (record.get("url") or "").strip()
+        if url.startswith(("http://", "https://")):
+            by_url[url].append(record)
+
+    texts: dict[str, str] = {}
+    missing = []
+    for url in by_url:
+        fresh, text = cache.get(url, ttl_days, retry_hours)
+        if text is not None:
+            texts[url] = text
+        elif not fresh and not offline:
+            missing.append(url)
+    cache.count(hits=len(by_url) - len(missing), misses=len(missing))
+
+    def run_lane(lane: list[str]) -> None:
+        for i, url in enumerate(lane):
+            if resilience.expired():
+                return
+            try:
+                if i:
+                    resilience.sleep(delay)
+                html = fetch_page(url, timeout)
+                with telemetry.parsing():
+                    text = clip(extract_text(html), MAX_TEXT_CHARS)
+            except DeadlineExceeded:
+                return
+            except (URLError, TimeoutError, ValueError, OSError) as e:
+                print(f"  WARN: No extract for {url}: {e}", file=sys.stderr)
+                cache.put(url, None, str(e))
+                continue
+            cache.put(url, text or None, None if text else "no article text")
+            if text:
+                texts[url] = text
+
+    if missing:
+        print(f"Extracting {len(missing)} articles "
+              f"({len(by_url) - len(missing)} cached)...", file=sys.stderr)
+        lanes = host_lanes(missing, int(settings.get("per_host", DEFAULT_PER_HOST)),
+                           host=lambda url: urlsplit(url).netloc.lower())
+        workers = min(int(settings.get("max_workers", DEFAULT_MAX_WORKERS)), len(lanes))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [telemetry.submit(pool, run_lane, lane) for lane in lanes]:
+                future.result()
+
+    count = 0
+    for url, text in texts.items():
+        for record in by_url[url]:
+            record["extract"] = clip(text, max_chars)
+            count += 1
+    return count
+
+
+def top_records(result: dict, sections: dict[str, Section], top_n: int,
+                now: datetime | None = None) -> list[dict]:
+    """The top_n records of every story table (sections keyed by url) in result,
+    as payload.py ranks them."""
+    now = now or datetime.now(timezone.utc)
+    tables = []
+    for key, section in sections.items():
+        if section.key != "url":
+            continue
+        value = result.get(key)
+        if isinstance(value, dict):
+            tables.extend((section, items) for items in value.values())
+        elif isinstance(value, list):
+            tables.append((section, value))
+    return [record for section, items in tables
+            for _, record in ranked(items, section, now)[:min(top_n, section.top_n)]]
+
+
+def add_extracts(result: dict, sections: dict[str, Section], settings: dict | None = None,
+                 offline: bool = False) -> int:
+    """The collectors' extraction stage: extracts for result's top-ranked records.
+
+    Returns the number of records that got one. Call
+    shared_extract_cache().save() once the run is done.
+    """
+    return add_extracts_days([result], sections, settings, offline)
+
+
+def add_extracts_days(results: list[dict], sections: dict[str, Section],
+                      settings: dict | None = None, offline: bool = False) -> int:
+    """add_extracts() for several results at once (backfill): a URL that is a
+    top story on several days is fetched once."""
+    settings = settings or {}
+    if not settings.get("enabled", True):
+        return 0
+    top_n = int(settings.get("top_n", DEFAULT_TOP_N))
+    records = [record for result in results
+               for record in top_records(result, sections, top_n)]
+    count = extract_records(records, settings, offline)
+    print(f"  {count} of {len(records)} top stories have an article extract", file=sys.stderr)
+    return count
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Print the main text of article pages")
+    parser.add_argument("urls", nargs="+", help="Page URLs")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS)
+    args = parser.parse_args()
+
+    records = [{"url": url} for url in args.urls]
+    extract_records(records, {"max_chars": args.max_chars})
+    shared_extract_cache().save()
+    for record in records:
+        print(f"== {record['url']}\n{record.get('extract', '(no extract)')}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""Pre-fetch AI News and Breakthroughs stories from public APIs and feeds.
+
+Gathers the stories the research skill used to find with one WebSearch or
+WebFetch call per source — zero LLM tokens. Writes JSON to
+~/.config/tech-news-briefing/prefetch/news-YYYY-MM-DD.json
+
+Sources (config/news-sources.json), by type:
+  - rss     publisher RSS/Atom feeds (OpenAI, DeepMind, Microsoft AI, Ars
+            Technica, The Verge, TechCrunch, Hugging Face)
+  - hn      Hacker News stories via the Algolia search API, one query per
+            keyword, above a points threshold
+  - arxiv   newest cs.AI/cs.LG/cs.CL submissions from the arXiv Atom API
+  - reddit  a subreddit's top listing (.json), above a score threshold
+  - devto   Dev.to's top articles for a tag (public articles API)
+  - github  repositories created in the window, by stars (search API)
+
+Every source yields the same story record:
+
+  {"title", "url", "source", "summary", "date", "category",
+   "points"?, "comments"?, "discussion"?, "also"?}
+
+category is "ai-news" or "breakthroughs" (the research skill's tags) and
+selects the output section, ai_news or breakthroughs, keyed by source name.
+A URL found by several sources is kept once, under the first source in
+registry order; the others are listed in "also", and their points and
+discussion link are merged in. Each source only keeps stories from its
+window (window_hours, 48 by default).
+
+Fetching, deadline, circuit breakers and last-good fallback
+(fetch_engine.py, resilience.py), telemetry (telemetry.py), link checks
+(url_check.py), repeat marking (story_index.py), article extracts
+(extract.py), --warm and the compact output format (payload.py) work as in
+fetch-osint.py.
+
+Usage: python3 fetch-news.py [--date YYYY-MM-DD] [--sources PATH] [--budget SECONDS]
+                             [--format compact|json] [--warm]
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.error import URLError
+from urllib.parse import urlencode
+
+from extract import add_extracts, shared_extract_cache
+from fetch_engine import Source, load_registry, run_sources, serve_warm
+from feeds import DESCRIPTION_CHARS, read_feed
+from http_cache import shared_cache
+from http_pool import shared_pool
+from payload import NEWS_SECTIONS, write_payload
+from resilience import DEFAULT_BUDGET, HEDGE_AFTER, shared_guard
+from story_index import mark_repeats
+from url_check import check_links, normalize_url, shared_checker
+import resilience
+import telemetry
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+REGISTRY_PATH = Path(__file__).resolve().parent.parent / "config" / "news-sources.json"
+HN_ITEM_URL = "https://news.ycombinator.com/item?id="
+REDDIT_URL = "https://www.reddit.com"
+CATEGORIES = {"ai-news": "ai_news", "breakthroughs": "breakthroughs"}
+
+HTTP_CACHE = shared_cache(PREFETCH_DIR / "http-cache")
+WHITESPACE = re.compile(r"\s+")
+TAGS = re.compile(r"<[^>]+>")
+
+
+def fetch_json(url: str, timeout: int = 30) -> dict | list | None:
+    """Fetch JSON from a URL. Returns None on failure."""
+    try:
+        body = HTTP_CACHE.get(url, timeout=timeout)
+        with telemetry.parsing():
+            return json.loads(body.decode("utf-8"))
+    except (URLError, json.JSONDecodeError, TimeoutError) as e:
+        print(f"  WARN: Failed to fetch {url}: {e}", file=sys.stderr)
+        return None
+
+
+def clean(text: str | None, limit: int = DESCRIPTION_CHARS) -> str:
+    """Plain single-line text: markup stripped, whitespace collapsed, cut to limit."""
+    return WHITESPACE.sub(" ", TAGS.sub(" ", text or "")).strip()[:limit]
+
+
+def story(src: Source, title: str, url: str, summary: str, when: datetime | str | None,
+          **extra) -> dict:
+    """One story record in the shape every source produces."""
+    if isinstance(when, datetime):
+        when = when.astimezone(timezone.utc).isoformat()
+    record = {
+        "title": clean(title, 300),
+        "url": url.strip(),
+        "source": src.name,
+        "summary": clean(summary),
+        "date": when or "",
+        "category": src.options.get("category", "ai-news"),
+    }
+    record.update({k: v for k, v in extra.items() if v not in (None, "", 0)})
+    return record
+
+
+def _from_timestamp(value) -> datetime | None:
+    try:
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _parse_iso(value: str | None) -> datetime | None:
+    try:
+        return datetime.fromisoformat((value or "").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+# -- source types --------------------------------------------------------------
+
+def fetch_feed(src: Source, cutoff: datetime) -> list[dict]:
+    """Publisher RSS/Atom feed, or the arXiv Atom API (same format)."""
+    print(f"Fetching {src.type}: {src.name}...", file=sys.stderr)
+    max_items = int(src.options.get("max_items", 10))
+    try:
+        items = read_feed(HTTP_CACHE, src.url, src.name, cutoff, max_items, src.timeout)
+    except (URLError, TimeoutError) as e:
+        print(f"  WARN: Failed to fetch {src.url}: {e}", file=sys.stderr)
+        return []
+    except ET.ParseError as e:
+        print(f"  WARN: Failed to parse feed from {src.name}: {e}", file=sys.stderr)
+        return []
+    results = [story(src, i["title"], i["url"], i["description"], i["pub_date"]) for i in items]
+    print(f"  Found {len(results)} stories from {src.name}", file=sys.stderr)
+    return results
+
+
+def fetch_hn(src: Source, cutoff: datetime) -> list[dict]:
+    """Hacker News stories since cutoff matching any of the source's queries.
+
+    One Algolia request per query (the API has no OR across words); the
+    cutoff is rounded down to the hour so reruns within the hour hit the
+    HTTP cache.
+    """
+    print(f"Fetching Hacker News: {src.name}...", file=sys.stderr)
+    since = int(cutoff.replace(minute=0, second=0, microsecond=0).timestamp())
+    min_points = int(src.options.get("min_points", 50))
+    hits: dict[str, dict] = {}
+    for query in src.options.get("queries", ["AI"]):
+        params = {"query": query, "tags": "story", "hitsPerPage": 50,
+                  "numericFilters": f"created_at_i>{since},points>={min_points}"}
+        doc = fetch_json(f"{src.url}?{urlencode(params)}", src.timeout)
+        for hit in (doc or {}).get("hits", []):
+            if hit.get("objectID") and hit.get("title"):
+                hits.setdefault(hit["objectID"], hit)
+    ranked = sorted(hits.values(), key=lambda h: (-(h.get("points") or 0), h["objectID"]))
+    results = []
+    for hit in ranked[:int(src.options.get("max_items", 10))]:
+        thread = f"{HN_ITEM_URL}{hit['objectID']}"
+        points, comments = hit.get("points") or 0, hit.get("num_comments") or 0
+        results.append(story(
+            src, hit["title"], hit.get("url") or thread,
+            f"{points} points, {comments} comments on Hacker News",
+            _from_timestamp(hit.get("created_at_i")) or hit.get("created_at"),
+            points=points, comments=comments, discussion=thread))
+    print(f"  Found {len(results)} stories from {src.name}", file=sys.stderr)
+    return results
+
+
+def fetch_reddit(src: Source, cutoff: datetime) -> list[dict]:
+    """A subreddit listing (.json): posts since cutoff above min_score, by score."""
+    print(f"Fetching Reddit: {src.name}...", file=sys.stderr)
+    doc = fetch_json(src.url, src.timeout)
+    min_score = int(src.options.get("min_score", 50))
+    posts = []
+    for child in ((doc or {}).get("data") or {}).get("children", []):
+        post = child.get("data") or {}
+        created = _from_timestamp(post.get("created_utc"))
+        if (post.get("stickied") or post.get("over_18") or not post.get("title")
+                or (post.get("score") or 0) < min_score or (created and created < cutoff)):
+            continue
+        posts.append((post, created))
+    posts.sort(key=lambda p: -(p[0].get("score") or 0))
+    results = []
+    for post, created in posts[:int(src.options.get("max_items", 10))]:
+        thread = f"{REDDIT_URL}{post.get('permalink', '')}"
+        link = thread if post.get("is_self") else post.get("url_overridden_by_dest") or post.get("url") or thread
+        summary = post.get("selftext") or (f"{post.get('score', 0)} upvotes, "
+                                           f"{post.get('num_comments', 0)} comments")
+        results.append(story(src, post["title"], link, summary, created,
+                             points=post.get("score"), comments=post.get("num_comments"),
+                             discussion=thread if link != thread else None))
+    print(f"  Found {len(results)} stories from {src.name}", file=sys.stderr)
+    return results
+
+
+def fetch_devto(src: Source, cutoff: datetime) -> list[dict]:
+    """Dev.to top articles for a tag, since cutoff, above min_reactions."""
+    print(f"Fetching Dev.to: {src.name}...", file=sys.stderr)
+    doc = fetch_json(src.url, src.timeout)
+    min_reactions = int(src.options.get("min_reactions", 20))
+    articles = [a for a in (doc if isinstance(doc, list) else [])
+                if a.get("title") and a.get("url")
+                and (a.get("positive_reactions_count") or 0) >= min_reactions
+                and (_parse_iso(a.get("published_at")) or cutoff) >= cutoff]
+    articles.sort(key=lambda a: -(a.get("positive_reactions_count") or 0))
+    results = [story(src, a["title"], a["url"], a.get("description", ""), a.get("published_at"),
+                     points=a.get("positive_reactions_count"), comments=a.get("comments_count"))
+               for a in articles[:int(src.options.get("max_items", 10))]]
+    print(f"  Found {len(results)} stories from {src.name}", file=sys.stderr)
+    return results
+
+
+def fetch_github(src: Source, cutoff: datetime) -> list[dict]:
+    """Repositories created since cutoff with min_stars or more, by stars."""
+    print(f"Fetching GitHub: {src.name}...", file=sys.stderr)
+    query = f"{src.options.get('query', 'topic:llm')} created:>={cutoff.date().isoformat()} " \
+            f"stars:>={int(src.options.get('min_stars', 100))}"
+    params = {"q": query, "sort": "stars", "order": "desc",
+              "per_page": int(src.options.get("max_items", 10))}
+    doc = fetch_json(f"{src.url}?{urlencode(params)}", src.timeout)
+    results = []
+    for repo in (doc or {}).get("items", []):
+        if not repo.get("html_url"):
+            continue
+        language = f" ({repo['language']})" if repo.get("language") else ""
+        results.append(story(
+            src, f"{repo.get('full_name', '')}{language}", repo["html_url"],
+            repo.get("description") or "", repo.get("created_at"),
+            points=repo.get("stargazers_count")))
+    print(f"  Found {len(results)} stories from {src.name}", file=sys.stderr)
+    return results
+
+
+def source_handlers(now: datetime) -> dict:
+    """Map registry source types to fetch functions; each source has its own window."""
+    def window(fetch):
+        return lambda src: fetch(src, now - timedelta(hours=float(src.options.get("window_hours", 48))))
+
+    return {
+        "rss": window(fetch_feed),
+        "arxiv": window(fetch_feed),
+        "hn": window(fetch_hn),
+        "reddit": window(fetch_reddit),
+        "devto": window(fetch_devto),
+        "github": window(fetch_github),
+    }
+
+
+def collect(sources: list[Source], results: dict) -> dict:
+    """Arrange per-source stories into sections by category, one copy per URL."""
+    out: dict[str, dict[str, list[dict]]] = {section: {} for section in CATEGORIES.values()}
+    first: dict[str, dict] = {}
+    for src in sources:
+        section = CATEGORIES.get(src.options.get("category", "ai-news"), "ai_news")
+        kept = out[section].setdefault(src.name, [])
+        for record in results.get(src.id) or []:
+            key = normalize_url(record.get("url", "")) or record.get("url")
+            earlier = first.get(key)
+            if earlier is None:
+                first[key] = record
+                kept.append(record)
+                continue
+            if record["source"] not in earlier.get("also", []) and record["source"] != earlier["source"]:
+                earlier.setdefault("also", []).append(record["source"])
+            for field in ("points", "comments", "discussion"):
+                if field in record and field not in earlier:
+                    earlier[field] = record[field]
+    return out
+
+
+def run(target_date: str, sources_path: Path = REGISTRY_PATH, report: bool = True,
+        budget: float | None = None, fmt: str | None = None, warm: bool = False) -> Path:
+    """Fetch every registry source and write news-<target_date>.json. Returns its path.
+
+    budget, fmt and warm work as in fetch-osint.run().
+    """
+    now = datetime.now(timezone.utc)
+    PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
+    output_path = PREFETCH_DIR / f"news-{target_date}.json"
+
+    print(f"News pre-fetch for {target_date}", file=sys.stderr)
+
+    registry = load_registry(sources_path)
+    deadline = registry.settings.get("deadline", {})
+    if budget is None and resilience.active() is None and not warm:
+        budget = float(deadline.get("budget_seconds", DEFAULT_BUDGET))
+    if budget:
+        resilience.start(budget, float(deadline.get("hedge_after", HEDGE_AFTER)))
+    guard = shared_guard(PREFETCH_DIR)
+    recorder = telemetry.Recorder("news")
+    if warm:
+        print(f"Serving {len(registry.sources)} sources from the polling daemon's data...",
+              file=sys.stderr)
+        results = serve_warm(registry.sources, source_handlers(now), guard, recorder)
+    else:
+        print(f"Fetching {len(registry.sources)} sources concurrently...", file=sys.stderr)
+        results = run_sources(
+            registry.sources,
+            source_handlers(now),
+            max_workers=registry.max_workers,
+            per_host=registry.per_host,
+            recorder=recorder,
+            guard=guard,
+        )
+
+    result = {
+        "date": target_date,
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        **collect(registry.sources, results),
+    }
+    links = registry.settings.get("links", {})
+    with recorder.source("link-check") as stats:
+        stats.items = check_links(result, NEWS_SECTIONS, links, offline=warm)
+    mark_repeats(result, target_date, registry.settings.get("dedup", {}), PREFETCH_DIR)
+    extract = registry.settings.get("extract", {})
+    with recorder.source("article-extracts") as stats:
+        stats.items = add_extracts(result, NEWS_SECTIONS, extract, offline=warm)
+    result["fetch_stats"] = recorder.snapshot()
+
+    total = sum(len(items) for section in CATEGORIES.values()
+                for items in result[section].values())
+    payload = registry.settings.get("payload", {})
+    write_payload(result, output_path, NEWS_SECTIONS, fmt or payload.get("format", "compact"),
+                  payload)
+    print(f"\nWrote {total} stories to {output_path}", file=sys.stderr)
+    recorder.export(target_date, PREFETCH_DIR / "metrics")
+    if not warm:
+        guard.save()
+    HTTP_CACHE.save()
+    shared_extract_cache().save()
+    shared_checker().save(links)
+    if report:
+        HTTP_CACHE.report()
+        shared_extract_cache().report()
+        shared_checker().report()
+        shared_pool().report()
+    return output_path
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Pre-fetch AI news and breakthrough stories")
+    parser.add_argument("--date", help="Target date (YYYY-MM-DD)", default=None)
+    parser.add_argument("--sources", help="Source registry JSON", type=Path, default=REGISTRY_PATH)
+    parser.add_argument("--budget", help="Deadline in seconds (0 = none; default from registry)",
+                        type=float, default=None)
+    parser.add_argument("--format", help="Output format (json = indented, for debugging)",
+                        choices=("compact", "json"), default=None)
+    parser.add_argument("--warm", action="store_true",
+                        help="Write from the polling daemon's data without fetching")
+    args = parser.parse_args()
+
+    target_date = args.date or datetime.now().strftime("%Y-%m-%d")
+    run(target_date, args.sources, budget=args.budget, fmt=args.format, warm=args.warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,224 +5,362 @@ Gathers structured data from public APIs and RSS feeds — zero LLM tokens.
 Writes JSON to ~/.config/tech-news-briefing/prefetch/osint-YYYY-MM-DD.json
 
 Sources:
-  - CISA Known Exploited Vulnerabilities (KEV) catalog — last 48 hours
+  - CISA Known Exploited Vulnerabilities (KEV) catalog — new/changed since last run
   - NVD (National Vulnerability Database) — CVSS >= 8.0, last 48 hours
   - RSS feeds: SANS ISC, Schneier on Security, Risky Business
 
-Usage: python3 fetch-osint.py [--date YYYY-MM-DD]
+Sources are listed in config/osint-sources.json and fetched concurrently
+under a run deadline, each behind a circuit breaker with a last-good
+fallback (fetch_engine.py, resilience.py); KEV and NVD are synced into a
+local store and queried from it (vuln_store.py). Story links are then
+checked (url_check.py), repeats marked (story_index.py) and the top feed
+items given article extracts (extract.py), and the output is written in
+the compact format of payload.py, with per-source telemetry in
+`fetch_stats`. --warm writes it without requests, from what the polling
+daemon (prefetch_daemon.py) keeps current; --from/--to backfills a range of
+days (see backfill()).
+
+Usage: python3 fetch-osint.py [--date YYYY-MM-DD] [--sources PATH] [--budget SECONDS]
+                              [--format compact|json] [--warm]
+       python3 fetch-osint.py --from YYYY-MM-DD [--to YYYY-MM-DD] [--workers 8]
 """
 
 from __future__ import annotations
 
 import json
 import sys
-import xml.etree.ElementTree as ET
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional
-from urllib.request import urlopen, Request
 from urllib.error import URLError
 
+from fetch_engine import (REGISTRY_PATH, Source, backfill_windows, load_registry, run_sources,
+                          serve_warm)
+from extract import add_extracts, add_extracts_days, shared_extract_cache
+from feeds import read_feed
+from http_cache import shared_cache
+from http_pool import shared_pool
+from nvd import MAX_PAGE_SIZE, NVD_URL, NVDClient, get_nvd_api_key
+from payload import OSINT_SECTIONS, write_payload
+from resilience import DEFAULT_BUDGET, HEDGE_AFTER, shared_guard
+from story_index import mark_repeats, mark_repeats_days
+from url_check import check_links, check_links_days, shared_checker
+from vuln_store import BULK_THRESHOLD, DETAIL_TTL_DAYS, VulnStore
+import resilience
+import telemetry
+
 PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
-USER_AGENT = "BPG-Tech-News/2.0 (prefetch)"
+KEV_URL = "https://www.cisa.gov/sites/default/files/feeds/known_exploited_vulnerabilities.json"
+WINDOW = timedelta(hours=48)
+BACKFILL_FEED_ITEMS = 500     # per feed: read everything it still carries
+BACKFILL_WORKERS = 8
+
+HTTP_CACHE = shared_cache(PREFETCH_DIR / "http-cache")
 
 
 def fetch_json(url: str, timeout: int = 30) -> dict | list | None:
     """Fetch JSON from a URL. Returns None on failure."""
     try:
-        req = Request(url, headers={"User-Agent": USER_AGENT})
-        with urlopen(req, timeout=timeout) as resp:
-            return json.loads(resp.read().decode("utf-8"))
+        body = HTTP_CACHE.get(url, timeout=timeout)
+        with telemetry.parsing():
+            return json.loads(body.decode("utf-8"))
     except (URLError, json.JSONDecodeError, TimeoutError) as e:
         print(f"  WARN: Failed to fetch {url}: {e}", file=sys.stderr)
         return None
 
 
-def fetch_text(url: str, timeout: int = 30) -> str | None:
-    """Fetch text/XML from a URL. Returns None on failure."""
-    try:
-        req = Request(url, headers={"User-Agent": USER_AGENT})
-        with urlopen(req, timeout=timeout) as resp:
-            return resp.read().decode("utf-8")
-    except (URLError, TimeoutError) as e:
-        print(f"  WARN: Failed to fetch {url}: {e}", file=sys.stderr)
-        return None
-
-
-def fetch_cisa_kev(cutoff: datetime) -> list[dict]:
-    """Fetch CISA KEV entries added after cutoff."""
-    print("Fetching CISA KEV catalog...", file=sys.stderr)
-    url = "https://www.cisa.gov/sites/default/files/feeds/known_exploited_vulnerabilities.json"
-    data = fetch_json(url, timeout=60)
-    if not data or "vulnerabilities" not in data:
-        return []
-
-    results = []
-    for vuln in data["vulnerabilities"]:
-        added = vuln.get("dateAdded", "")
-        try:
-            added_dt = datetime.strptime(added, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        except ValueError:
-            continue
-        if added_dt < cutoff:
-            continue
-
-        results.append({
-            "source": "CISA KEV",
-            "cve_id": vuln.get("cveID", ""),
-            "vendor": vuln.get("vendorProject", ""),
-            "product": vuln.get("product", ""),
-            "name": vuln.get("vulnerabilityName", ""),
-            "description": vuln.get("shortDescription", ""),
-            "date_added": added,
-            "due_date": vuln.get("dueDate", ""),
-            "known_ransomware": vuln.get("knownRansomwareCampaignUse", "Unknown"),
-        })
-
-    print(f"  Found {len(results)} KEV entries since {cutoff.date()}", file=sys.stderr)
+def fetch_cisa_kev(cutoff: datetime, url: str = KEV_URL, timeout: int = 60,
+                   incremental: bool = True, sync: bool = True,
+                   day: str | None = None) -> list[dict]:
+    """Sync the CISA KEV catalog into the vulnerability store and query it.
+
+    The catalog is streamed from the HTTP cache one entry at a time and
+    skipped after its header when unchanged. In incremental mode only
+    entries that are new or changed since cutoff are returned (tagged
+    "change": "new"/"updated"), or, for a pre-fetch `day`, since the
+    previous day's run (VulnStore.kev_delta_start); otherwise entries added
+    since cutoff. If the download fails, the store still answers from the
+    last sync; with sync=False it answers from the store without
+    downloading.
+    """
+    print("Fetching CISA KEV catalog..." if sync else "Reading stored CISA KEV catalog...",
+          file=sys.stderr)
+    with VulnStore(PREFETCH_DIR / "vulns.db") as store:
+        if sync:
+            try:
+                body_path, modified = HTTP_CACHE.get_file(url, timeout=timeout)
+                with telemetry.parsing():
+                    changed = store.sync_kev(body_path)
+                state = "changed" if modified else "unchanged"
+                print(f"  Catalog {state} (released {store.get_state('kev_date_released')}, "
+                      f"{changed} entries new or updated)", file=sys.stderr)
+            except (URLError, TimeoutError) as e:
+                print(f"  WARN: Failed to fetch {url}, using stored catalog: {e}",
+                      file=sys.stderr)
+            except (ValueError, UnicodeDecodeError) as e:
+                print(f"  WARN: Failed to parse KEV catalog, using stored catalog: {e}",
+                      file=sys.stderr)
+        if incremental and day:
+            cutoff = store.kev_delta_start(day, cutoff)
+        results = store.kev_delta(cutoff) if incremental else store.kev_added_since(cutoff)
+
+    print(f"  Found {len(results)} KEV entries since {cutoff:%Y-%m-%d %H:%M}", file=sys.stderr)
     return results
 
 
-def fetch_nvd(cutoff: datetime) -> list[dict]:
-    """Fetch NVD CVEs with CVSS >= 8.0 published after cutoff."""
-    print("Fetching NVD high-severity CVEs...", file=sys.stderr)
-    # NVD API 2.0 — public, no key required (rate limited to 5 req/30s)
-    start = cutoff.strftime("%Y-%m-%dT%H:%M:%S.000")
-    end = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000")
-    url = (
-        f"https://services.nvd.nist.gov/rest/json/cves/2.0"
-        f"?pubStartDate={start}&pubEndDate={end}"
-        f"&cvssV3Severity=HIGH&cvssV3Severity=CRITICAL"
-        f"&resultsPerPage=50"
-    )
-    data = fetch_json(url, timeout=60)
-    if not data or "vulnerabilities" not in data:
-        return []
-
-    results = []
-    for item in data["vulnerabilities"]:
-        cve = item.get("cve", {})
-        cve_id = cve.get("id", "")
-        descriptions = cve.get("descriptions", [])
-        desc_en = next((d["value"] for d in descriptions if d.get("lang") == "en"), "")
-
-        # Extract CVSS score
-        metrics = cve.get("metrics", {})
-        cvss_score = None
-        cvss_vector = None
-        for key in ["cvssMetricV31", "cvssMetricV30"]:
-            if key in metrics and metrics[key]:
-                cvss_data = metrics[key][0].get("cvssData", {})
-                cvss_score = cvss_data.get("baseScore")
-                cvss_vector = cvss_data.get("baseSeverity", "")
-                break
-
-        if cvss_score is not None and cvss_score < 8.0:
-            continue
-
-        results.append({
-            "source": "NVD",
-            "cve_id": cve_id,
-            "description": desc_en[:300],
-            "cvss_score": cvss_score,
-            "cvss_severity": cvss_vector,
-            "published": cve.get("published", ""),
-        })
+def fetch_nvd(cutoff: datetime, url: str = NVD_URL, timeout: int = 60,
+              min_cvss: float = 8.0, page_size: int = MAX_PAGE_SIZE,
+              bootstrap_days: int = 30, sync: bool = True) -> list[dict]:
+    """Sync NVD into the vulnerability store and query CVSS >= min_cvss since cutoff.
+
+    The sync pulls every CVE modified since the previous run via lastMod
+    windows, paging through all results within the NVD rate limit — 5
+    req/30s public, 50 req/30s with an API key — and resuming from
+    checkpoints if a previous run was interrupted. sync=False only queries
+    the store.
+    """
+    print("Fetching NVD high-severity CVEs..." if sync else "Reading stored NVD CVEs...",
+          file=sys.stderr)
+    with VulnStore(PREFETCH_DIR / "vulns.db") as store:
+        if sync:
+            client = NVDClient(
+                api_key=get_nvd_api_key(),
+                base_url=url,
+                page_size=page_size,
+                timeout=timeout,
+                checkpoint_dir=PREFETCH_DIR / "nvd-checkpoints",
+            )
+            try:
+                synced = store.sync_nvd(client, bootstrap_days=bootstrap_days)
+                print(f"  Synced {synced} modified CVEs ({client.requests} NVD requests)",
+                      file=sys.stderr)
+            except (URLError, TimeoutError, json.JSONDecodeError) as e:
+                print(f"  WARN: NVD sync failed (checkpoint kept for resume), "
+                      f"using stored data: {e}", file=sys.stderr)
+        results = store.nvd_since(cutoff, min_cvss)
 
     print(f"  Found {len(results)} high-severity CVEs since {cutoff.date()}", file=sys.stderr)
     return results
 
 
-def fetch_rss(url: str, name: str, cutoff: datetime) -> list[dict]:
-    """Fetch items from an RSS/Atom feed published after cutoff."""
-    print(f"Fetching RSS: {name}...", file=sys.stderr)
-    xml_text = fetch_text(url)
-    if not xml_text:
-        return []
+def fetch_rss(url: str, name: str, cutoff: datetime, timeout: int = 30,
+              max_items: int = 10, whole: bool = False) -> list[dict]:
+    """Fetch up to max_items RSS/Atom items published at or after cutoff.
 
-    results = []
+    The feed is parsed as it streams in; reading stops as soon as enough
+    in-window items are collected, so large feeds cost bounded time and
+    memory. whole=True reads past a cached prefix (feeds.read_feed()).
+    """
+    print(f"Fetching RSS: {name}...", file=sys.stderr)
     try:
-        root = ET.fromstring(xml_text)
+        results = read_feed(HTTP_CACHE, url, name, cutoff, max_items, timeout, whole)
+    except (URLError, TimeoutError) as e:
+        print(f"  WARN: Failed to fetch {url}: {e}", file=sys.stderr)
+        return []
     except ET.ParseError as e:
         print(f"  WARN: Failed to parse RSS from {name}: {e}", file=sys.stderr)
         return []
 
-    # Handle both RSS 2.0 and Atom
-    ns = {"atom": "http://www.w3.org/2005/Atom"}
-
-    # Try RSS 2.0 items
-    for item in root.iter("item"):
-        title = (item.findtext("title") or "").strip()
-        link = (item.findtext("link") or "").strip()
-        pub_date = (item.findtext("pubDate") or "").strip()
-        description = (item.findtext("description") or "").strip()
-
-        if title and link:
-            results.append({
-                "source": name,
-                "title": title,
-                "url": link,
-                "description": description[:300],
-                "pub_date": pub_date,
-            })
-
-    # Try Atom entries if no RSS items found
-    if not results:
-        for entry in root.findall("atom:entry", ns):
-            title = (entry.findtext("atom:title", namespaces=ns) or "").strip()
-            link_el = entry.find("atom:link", ns)
-            link = link_el.get("href", "") if link_el is not None else ""
-            summary = (entry.findtext("atom:summary", namespaces=ns) or "").strip()
-
-            if title and link:
-                results.append({
-                    "source": name,
-                    "title": title,
-                    "url": link,
-                    "description": summary[:300],
-                })
-
-    # Limit to most recent items (RSS feeds may not support date filtering well)
-    results = results[:10]
     print(f"  Found {len(results)} items from {name}", file=sys.stderr)
     return results
 
 
-def main():
-    import argparse
-    parser = argparse.ArgumentParser(description="Pre-fetch OSINT data")
-    parser.add_argument("--date", help="Target date (YYYY-MM-DD)", default=None)
-    args = parser.parse_args()
+def enrich(result: dict, registry, settings: dict, refresh: bool = True) -> None:
+    """Join KEV entries with NVD CVSS/CWE/CPE data (and NVD CVEs with KEV status).
+
+    Refreshes the store's per-CVE detail cache for KEV CVEs that are new or
+    past their TTL (unless refresh=False), then merges the output records in
+    place, so curation gets exploitation status and severity on one record
+    instead of cross-referencing two lists.
+    """
+    if not settings.get("enabled", True):
+        return
+    if refresh:
+        refresh_details(registry, settings)
+    with VulnStore(PREFETCH_DIR / "vulns.db") as store:
+        store.merge(result["cisa_kev"], result["nvd_cves"])
+
+
+def refresh_details(registry, settings: dict) -> None:
+    """Refresh the store's NVD details for KEV CVEs that are new or past their TTL."""
+    print("Enriching KEV entries with NVD details...", file=sys.stderr)
+    nvd_source = next((s for s in registry.sources if s.type == "nvd"), None)
+    client = NVDClient(
+        api_key=get_nvd_api_key(),
+        base_url=nvd_source.url if nvd_source else NVD_URL,
+        timeout=nvd_source.timeout if nvd_source else 60,
+        checkpoint_dir=PREFETCH_DIR / "nvd-checkpoints",
+    )
+    with VulnStore(PREFETCH_DIR / "vulns.db") as store:
+        try:
+            due = store.enrich_kev(
+                client,
+                ttl_days=int(settings.get("ttl_days", DETAIL_TTL_DAYS)),
+                bulk_threshold=int(settings.get("bulk_threshold", BULK_THRESHOLD)),
+            )
+            print(f"  Refreshed {due} CVE details ({client.requests} NVD requests)",
+                  file=sys.stderr)
+        except (URLError, TimeoutError, json.JSONDecodeError) as e:
+            print(f"  WARN: NVD enrichment failed, using cached details: {e}", file=sys.stderr)
+
+
+def source_handlers(cutoff: datetime, sync: bool = True, day: str | None = None) -> dict:
+    """Map registry source types to fetch functions bound to cutoff.
+
+    sync=False makes the KEV and NVD handlers read the store only. `day` is
+    the pre-fetch file's date: the KEV delta then runs from the previous
+    day's run instead of cutoff (the polling daemon passes none).
+    """
+    return {
+        "kev": lambda src: fetch_cisa_kev(
+            cutoff, src.url, src.timeout, bool(src.options.get("incremental", True)), sync,
+            day,
+        ),
+        "nvd": lambda src: fetch_nvd(
+            cutoff, src.url, src.timeout, float(src.options.get("min_cvss", 8.0)),
+            int(src.options.get("page_size", MAX_PAGE_SIZE)),
+            int(src.options.get("bootstrap_days", 30)), sync,
+        ),
+        "rss": lambda src: fetch_rss(
+            src.url, src.name, cutoff, src.timeout, int(src.options.get("max_items", 10))
+        ),
+    }
 
-    if args.date:
-        target_date = args.date
-    else:
-        target_date = datetime.now().strftime("%Y-%m-%d")
 
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=48)
+def backfill_nvd(since: datetime, until: datetime, url: str = NVD_URL, timeout: int = 60,
+                 min_cvss: float = 8.0, page_size: int = MAX_PAGE_SIZE) -> list[dict]:
+    """Page every CVE published in [since, until] into the store; query CVSS >= min_cvss."""
+    print(f"Fetching NVD CVEs published {since.date()} to {until.date()}...", file=sys.stderr)
+    client = NVDClient(
+        api_key=get_nvd_api_key(),
+        base_url=url,
+        page_size=page_size,
+        timeout=timeout,
+        checkpoint_dir=PREFETCH_DIR / "nvd-checkpoints",
+    )
+    with VulnStore(PREFETCH_DIR / "vulns.db") as store:
+        synced = store.backfill_nvd(client, since, until)
+        print(f"  Stored {synced} CVEs ({client.requests} NVD requests)", file=sys.stderr)
+        return store.nvd_since(since, min_cvss, until)
+
+
+def backfill_handlers(since: datetime, until: datetime) -> dict:
+    """Handlers that fetch each source once for a whole backfill range.
+
+    KEV and NVD fill the store (each day is then a query over it); feeds
+    return every item since `since`.
+    """
+    return {
+        "kev": lambda src: fetch_cisa_kev(since, src.url, src.timeout, incremental=False),
+        "nvd": lambda src: backfill_nvd(
+            since, until, src.url, src.timeout, float(src.options.get("min_cvss", 8.0)),
+            int(src.options.get("page_size", MAX_PAGE_SIZE)),
+        ),
+        # A normal run caches only the prefix it read; the range needs every item
+        "rss": lambda src: fetch_rss(src.url, src.name, since, src.timeout, BACKFILL_FEED_ITEMS,
+                                     whole=True),
+    }
+
+
+def day_slice(sources: list[Source], fetched: dict, start: datetime, end: datetime) -> dict:
+    """One backfill day's sections: store queries and feed items within [start, end)."""
+    results = {}
+    with VulnStore(PREFETCH_DIR / "vulns.db") as store:
+        for src in sources:
+            if src.type == "kev":
+                results[src.id] = [{**r, "change": "new"}
+                                   for r in store.kev_added_since(start, end)]
+            elif src.type == "nvd":
+                results[src.id] = store.nvd_since(start, float(src.options.get("min_cvss", 8.0)),
+                                                  end)
+            elif src.type == "rss":
+                # Undated items cannot be placed on a day
+                window = [item for item in fetched.get(src.id) or []
+                          if item.get("pub_date")
+                          and start <= datetime.fromisoformat(item["pub_date"]) < end]
+                results[src.id] = window[:int(src.options.get("max_items", 10))]
+    return collect(sources, results)
+
+
+def collect(sources: list[Source], results: dict) -> dict:
+    """Arrange per-source results into the osint-*.json sections."""
+    out = {"cisa_kev": [], "nvd_cves": [], "rss_feeds": {}}
+    for src in sources:
+        items = results.get(src.id) or []
+        if src.type == "kev":
+            out["cisa_kev"].extend(items)
+        elif src.type == "nvd":
+            out["nvd_cves"].extend(items)
+        elif src.type == "rss":
+            out["rss_feeds"][src.name] = items
+    return out
+
+
+def run(target_date: str, sources_path: Path = REGISTRY_PATH, report: bool = True,
+        budget: float | None = None, fmt: str | None = None, warm: bool = False) -> Path:
+    """Fetch every registry source and write osint-<target_date>.json. Returns its path.
+
+    budget (seconds) starts a fresh run-wide deadline; by default the one
+    prefetch.py started is used, or the registry's if there is none.
+    0 disables the deadline. fmt is a payload.py format ("compact" or
+    "json"); by default the registry's, else compact. warm=True makes no
+    requests: every source is served from what the polling daemon stored
+    (fetch_engine.serve_warm).
+    """
+    cutoff = datetime.now(timezone.utc) - WINDOW
     PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
     output_path = PREFETCH_DIR / f"osint-{target_date}.json"
 
     print(f"OSINT pre-fetch for {target_date}", file=sys.stderr)
     print(f"Cutoff: {cutoff.isoformat()}", file=sys.stderr)
 
+    registry = load_registry(sources_path)
+    deadline = registry.settings.get("deadline", {})
+    if budget is None and resilience.active() is None and not warm:
+        budget = float(deadline.get("budget_seconds", DEFAULT_BUDGET))
+    if budget:
+        resilience.start(budget, float(deadline.get("hedge_after", HEDGE_AFTER)))
+    guard = shared_guard(PREFETCH_DIR)
+    recorder = telemetry.Recorder("osint")
+    if warm:
+        print(f"Serving {len(registry.sources)} sources from the polling daemon's data...",
+              file=sys.stderr)
+        results = serve_warm(registry.sources, source_handlers(cutoff, sync=False, day=target_date),
+                             guard,
+                             recorder)
+    else:
+        print(f"Fetching {len(registry.sources)} sources concurrently...", file=sys.stderr)
+        results = run_sources(
+            registry.sources,
+            source_handlers(cutoff, day=target_date),
+            max_workers=registry.max_workers,
+            per_host=registry.per_host,
+            recorder=recorder,
+            guard=guard,
+        )
+
     result = {
         "date": target_date,
         "fetched_at": datetime.now(timezone.utc).isoformat(),
-        "cisa_kev": fetch_cisa_kev(cutoff),
-        "nvd_cves": fetch_nvd(cutoff),
-        "rss_feeds": {},
+        **collect(registry.sources, results),
     }
-
-    # RSS feeds
-    rss_sources = [
-        ("https://isc.sans.edu/rssfeed.xml", "SANS ISC"),
-        ("https://www.schneier.com/feed/atom/", "Schneier on Security"),
-        ("https://risky.biz/feeds/risky-business/", "Risky Business"),
-    ]
-    for url, name in rss_sources:
-        items = fetch_rss(url, name, cutoff)
-        result["rss_feeds"][name] = items
+    enrichment = registry.settings.get("enrichment", {})
+    if warm:
+        enrich(result, registry, enrichment, refresh=False)
+    else:
+        with recorder.source("nvd-enrichment") as stats:
+            # Cached details are the fallback, so there is no last-good copy to keep
+            guard.run("nvd-enrichment", lambda: enrich(result, registry, enrichment),
+                      stats, last_good=False)
+    links = registry.settings.get("links", {})
+    with recorder.source("link-check") as stats:
+        stats.items = check_links(result, OSINT_SECTIONS, links, offline=warm)
+    mark_repeats(result, target_date, registry.settings.get("dedup", {}), PREFETCH_DIR)
+    with recorder.source("article-extracts") as stats:
+        stats.items = add_extracts(result, OSINT_SECTIONS, registry.settings.get("extract", {}),
+                                   offline=warm)
+    result["fetch_stats"] = recorder.snapshot()
 
     # Summary
     total = (
@@ -231,8 +369,145 @@ def main():
         + sum(len(v) for v in result["rss_feeds"].values())
     )
 
-    output_path.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    payload = registry.settings.get("payload", {})
+    write_payload(result, output_path, OSINT_SECTIONS, fmt or payload.get("format", "compact"),
+                  payload)
     print(f"\nWrote {total} items to {output_path}", file=sys.stderr)
+    recorder.export(target_date, PREFETCH_DIR / "metrics")
+    if not warm:
+        guard.save()
+    HTTP_CACHE.save()
+    shared_extract_cache().save()
+    shared_checker().save(links)
+    if report:
+        HTTP_CACHE.report()
+        shared_extract_cache().report()
+        shared_checker().report()
+        shared_pool().report()
+    return output_path
+
+
+def backfill(first: date, last: date, sources_path: Path = REGISTRY_PATH, report: bool = True,
+             budget: float | None = None, fmt: str | None = None,
+             workers: int = BACKFILL_WORKERS) -> list[Path]:
+    """Write osint-<day>.json for every day from first to last. Returns their paths.
+
+    Every source is fetched once for the whole range (backfill_handlers)
+    without a guard, so breakers and last good results stay as they were:
+    the KEV catalog is downloaded once, NVD is paged once by publication
+    date and each feed is read whole. Each day then gets the 48 hours up to
+    its end (UTC), sliced from the store and the feeds, and the days are
+    written concurrently on `workers` threads. KEV records are those added
+    in the window (all "change": "new": the catalog keeps no history of
+    updates), and feeds only reach back as far as their current items. No
+    deadline applies unless `budget` is given.
+    """
+    windows = backfill_windows(first, last, WINDOW)
+    since, until = windows[0][1], windows[-1][2]
+    PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"OSINT backfill {first} to {last} ({len(windows)} days)", file=sys.stderr)
+
+    registry = load_registry(sources_path)
+    if budget:
+        deadline = registry.settings.get("deadline", {})
+        resilience.start(budget, float(deadline.get("hedge_after", HEDGE_AFTER)))
+    recorder = telemetry.Recorder("osint")
+    print(f"Fetching {len(registry.sources)} sources once for the range...", file=sys.stderr)
+    fetched = run_sources(
+        registry.sources,
+        backfill_handlers(since, until),
+        max_workers=registry.max_workers,
+        per_host=registry.per_host,
+        recorder=recorder,
+    )
+    enrichment = registry.settings.get("enrichment", {})
+    if enrichment.get("enabled", True):
+        with recorder.source("nvd-enrichment"):
+            refresh_details(registry, enrichment)
+    fetch_stats = recorder.snapshot()
+    fetched_at = datetime.now(timezone.utc).isoformat()
+
+    def build(window: tuple[date, datetime, datetime]) -> dict:
+        day, start, end = window
+        result = {"date": day.isoformat(), "fetched_at": fetched_at,
+                  **day_slice(registry.sources, fetched, start, end)}
+        enrich(result, registry, enrichment, refresh=False)
+        result["fetch_stats"] = fetch_stats
+        return result
+
+    payload = registry.settings.get("payload", {})
+    links = registry.settings.get("links", {})
+    fmt = fmt or payload.get("format", "compact")
+
+    def write(result: dict) -> Path:
+        path = PREFETCH_DIR / f"osint-{result['date']}.json"
+        return write_payload(result, path, OSINT_SECTIONS, fmt, payload)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(build, windows))
+        with recorder.source("link-check") as stats:
+            stats.items = check_links_days(results, OSINT_SECTIONS, links)
+        # Marked in day order, so each day sees the ones before it
+        mark_repeats_days({r["date"]: r for r in results}, registry.settings.get("dedup", {}),
+                          PREFETCH_DIR, name="osint")
+        with recorder.source("article-extracts") as stats:
+            stats.items = add_extracts_days(results, OSINT_SECTIONS,
+                                            registry.settings.get("extract", {}))
+        paths = list(pool.map(write, results))
+
+    total = sum(len(r["cisa_kev"]) + len(r["nvd_cves"])
+                + sum(len(v) for v in r["rss_feeds"].values()) for r in results)
+    print(f"\nWrote {total} items to {len(paths)} files "
+          f"(osint-{first}.json to osint-{last}.json)", file=sys.stderr)
+    recorder.export(last.isoformat(), PREFETCH_DIR / "metrics")
+    HTTP_CACHE.save()
+    shared_extract_cache().save()
+    shared_checker().save(links)
+    if report:
+        HTTP_CACHE.report()
+        shared_extract_cache().report()
+        shared_checker().report()
+        shared_pool().report()
+    return paths
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Pre-fetch OSINT data")
+    parser.add_argument("--date", help="Target date (YYYY-MM-DD)", default=None)
+    parser.add_argument("--sources", help="Source registry JSON", type=Path, default=REGISTRY_PATH)
+    parser.add_argument("--budget", help="Deadline in seconds (0 = none; default from registry)",
+                        type=float, default=None)
+    parser.add_argument("--format", help="Output format (json = indented, for debugging)",
+                        choices=("compact", "json"), default=None)
+    parser.add_argument("--warm", action="store_true",
+                        help="Write from the polling daemon's data without fetching")
+    parser.add_argument("--from", dest="first", type=date.fromisoformat, default=None,
+                        help="Backfill one file per day from this date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="last", type=date.fromisoformat, default=None,
+                        help="Last backfill date (default today)")
+    parser.add_argument("--workers", help="Days sliced and written concurrently (backfill)",
+                        type=int, default=BACKFILL_WORKERS)
+    args = parser.parse_args()
+
+    if args.last and not args.first:
+        parser.error("--to needs --from")
+    if args.first:
+        if args.date or args.warm:
+            parser.error("--from/--to cannot be combined with --date or --warm")
+        last = args.last or date.today()
+        if last < args.first:
+            parser.error(f"--to {last} is before --from {args.first}")
+        backfill(args.first, last, args.sources, budget=args.budget, fmt=args.format,
+                 workers=args.workers)
+        return
+
+    if args.date:
+        target_date = args.date
+    else:
+        target_date = datetime.now().strftime("%Y-%m-%d")
+
+    run(target_date, args.sources, budget=args.budget, fmt=args.format, warm=args.warm)
 
 
 if __name__ == "__main__":
@@ -4,26 +4,64 @@
 Gathers episode metadata from Spotify API and Apple Podcasts Charts — zero LLM tokens.
 Writes JSON to ~/.config/tech-news-briefing/prefetch/podcasts-YYYY-MM-DD.json
 
-Spotify credentials: macOS Keychain service "tech-news-briefing-spotify"
+Spotify shows are fetched concurrently, paged until the --days window is
+covered, and incrementally from per-show high-water marks; the access token
+is cached on disk until it expires (see spotify.py).
+
+GET requests go through the conditional-GET cache in http_cache.py; every
+request reuses keep-alive connections from http_pool.py. The run has a
+deadline (45s by default, or the one prefetch.py started) and per-source
+circuit breakers; Apple Charts falls back to its last good result and
+Spotify to its stored episodes, marked stale (see resilience.py). Per-source
+telemetry is written to the output's `fetch_stats` block and to
+prefetch/metrics/ (see telemetry.py).
+
+The output is written in the compact format of payload.py (ranked, trimmed
+tables; everything in podcasts-YYYY-MM-DD.full.json); --format json writes
+the full indented document instead, for debugging. --warm makes no requests
+and writes from the polling daemon's data (stored Spotify episodes, the
+charts' last good result), as fetch-osint.py --warm does.
+
+--from/--to backfills one file per day: Spotify is paged once, back to
+--days before the first day, and each day gets the episodes released in
+the --days up to its end; the files are written in parallel. Apple Charts
+keep no history, so only today's file, if the range includes it, has them.
+
+Spotify credentials: SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET environment
+variables, or macOS Keychain service "tech-news-briefing-spotify"
   account = client_id, password = client_secret
 
-Usage: python3 fetch-podcasts.py [--date YYYY-MM-DD] [--days 7]
+Usage: python3 fetch-podcasts.py [--date YYYY-MM-DD] [--days 7] [--workers 8] [--budget 45]
+                                 [--format compact|json] [--warm]
+       python3 fetch-podcasts.py --from YYYY-MM-DD [--to YYYY-MM-DD] [--days 7]
 """
 
 from __future__ import annotations
 
 import json
+import os
 import subprocess
 import sys
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from urllib.request import urlopen, Request
 from urllib.error import URLError
-from urllib.parse import urlencode
-from base64 import b64encode
+
+from fetch_engine import WARM_STALE_POLLS, backfill_windows
+from http_cache import shared_cache
+from http_pool import shared_pool
+from payload import PODCAST_SECTIONS, write_payload
+from resilience import shared_guard
+from spotify import MAX_WORKERS, SpotifyClient, parse_release, stored_episodes
+import resilience
+import telemetry
 
 PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
-USER_AGENT = "BPG-Tech-News/2.0 (prefetch)"
+
+HTTP_CACHE = shared_cache(PREFETCH_DIR / "http-cache")
+
+# How often the polling daemon (prefetch_daemon.py) refreshes each source, in seconds
+POLL_SECONDS = {"spotify": 3600, "apple-charts": 6 * 3600}
 
 # Tracked shows — Spotify show IDs
 # To find a show ID: open in Spotify, copy link, extract ID from URL
@@ -53,7 +91,11 @@ TRACKED_SHOWS = {
 
 
 def get_spotify_credentials() -> tuple[str, str] | None:
-    """Read Spotify client credentials from macOS Keychain."""
+    """Read Spotify client credentials from the environment or macOS Keychain."""
+    env_id = os.environ.get("SPOTIFY_CLIENT_ID", "").strip()
+    env_secret = os.environ.get("SPOTIFY_CLIENT_SECRET", "").strip()
+    if env_id and env_secret:
+        return env_id, env_secret
     try:
         # Get client_id (stored as account name)
         result = subprocess.run(
@@ -89,62 +131,30 @@ def get_spotify_credentials() -> tuple[str, str] | None:
         return None
 
 
-def get_spotify_token(client_id: str, client_secret: str) -> str | None:
-    """Get Spotify access token using client_credentials flow."""
-    auth = b64encode(f"{client_id}:{client_secret}".encode()).decode()
-    data = urlencode({"grant_type": "client_credentials"}).encode()
-    req = Request(
-        "https://accounts.spotify.com/api/token",
-        data=data,
-        headers={
-            "Authorization": f"Basic {auth}",
-            "Content-Type": "application/x-www-form-urlencoded",
-        },
-    )
-    try:
-        with urlopen(req, timeout=15) as resp:
-            body = json.loads(resp.read().decode("utf-8"))
-            return body.get("access_token")
-    except (URLError, json.JSONDecodeError) as e:
-        print(f"  WARN: Spotify auth failed: {e}", file=sys.stderr)
-        return None
-
+def fetch_spotify_episodes(client_id: str, client_secret: str, since: datetime,
+                           workers: int = MAX_WORKERS) -> list[dict]:
+    """Fetch episodes released since `since` from every tracked show.
 
-def fetch_spotify_episodes(token: str, show_id: str, show_name: str, since: datetime) -> list[dict]:
-    """Fetch recent episodes from a Spotify show."""
-    url = f"https://api.spotify.com/v1/shows/{show_id}/episodes?limit=10&market=US"
-    req = Request(url, headers={
-        "Authorization": f"Bearer {token}",
-        "User-Agent": USER_AGENT,
-    })
+    Shows are fetched concurrently and incrementally (see spotify.py).
+    Returns [] if Spotify authentication fails.
+    """
+    client = SpotifyClient(client_id, client_secret, max_workers=workers, cache=HTTP_CACHE)
     try:
-        with urlopen(req, timeout=15) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
-    except (URLError, json.JSONDecodeError) as e:
-        print(f"  WARN: Failed to fetch episodes for {show_name}: {e}", file=sys.stderr)
+        client.token()
+    except (URLError, KeyError, json.JSONDecodeError) as e:
+        print(f"  WARN: Spotify auth failed: {e}", file=sys.stderr)
         return []
 
-    results = []
-    for ep in data.get("items", []):
-        release = ep.get("release_date", "")
-        try:
-            release_dt = datetime.strptime(release, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        except ValueError:
-            continue
-        if release_dt < since:
-            continue
+    print(f"Fetching episodes from {len(TRACKED_SHOWS)} shows...", file=sys.stderr)
+    by_show = client.collect(TRACKED_SHOWS, since)
+    print(f"  {client.requests} Spotify API requests", file=sys.stderr)
+    return [ep for show_id in TRACKED_SHOWS for ep in by_show.get(show_id, [])]
 
-        results.append({
-            "show": show_name,
-            "show_id": show_id,
-            "title": ep.get("name", ""),
-            "description": (ep.get("description") or "")[:300],
-            "url": ep.get("external_urls", {}).get("spotify", ""),
-            "release_date": release,
-            "duration_ms": ep.get("duration_ms", 0),
-        })
 
-    return results
+def stored_spotify_episodes(since: datetime) -> list[dict]:
+    """Episodes released since `since` from the stored show state, without requests."""
+    by_show = stored_episodes(TRACKED_SHOWS, since)
+    return [ep for show_id in TRACKED_SHOWS for ep in by_show.get(show_id, [])]
 
 
 def fetch_apple_charts() -> list[dict]:
@@ -152,10 +162,10 @@ def fetch_apple_charts() -> list[dict]:
     print("Fetching Apple Podcasts Technology Charts...", file=sys.stderr)
     # Apple RSS generator for top podcasts in Technology category (id=1318)
     url = "https://rss.applemarketingtools.com/api/v2/us/podcasts/top/25/podcasts.json?genre=1318"
-    req = Request(url, headers={"User-Agent": USER_AGENT})
     try:
-        with urlopen(req, timeout=15) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+        body = HTTP_CACHE.get(url, timeout=15)
+        with telemetry.parsing():
+            data = json.loads(body.decode("utf-8"))
     except (URLError, json.JSONDecodeError) as e:
         print(f"  WARN: Failed to fetch Apple Charts: {e}", file=sys.stderr)
         return []
@@ -174,20 +184,22 @@ def fetch_apple_charts() -> list[dict]:
     return results
 
 
-def main():
-    import argparse
-    parser = argparse.ArgumentParser(description="Pre-fetch podcast data")
-    parser.add_argument("--date", help="Target date (YYYY-MM-DD)", default=None)
-    parser.add_argument("--days", help="Look back N days for episodes", type=int, default=7)
-    args = parser.parse_args()
+def run(target_date: str, days: int = 7, report: bool = True,
+        workers: int = MAX_WORKERS, budget: float | None = None,
+        fmt: str = "compact", warm: bool = False) -> Path:
+    """Fetch Spotify episodes and Apple Charts into podcasts-<target_date>.json.
 
-    target_date = args.date or datetime.now().strftime("%Y-%m-%d")
-    since = datetime.now(timezone.utc) - timedelta(days=args.days)
+    budget (seconds) starts a fresh run-wide deadline; by default the one
+    prefetch.py started is used, or resilience.DEFAULT_BUDGET. 0 disables it.
+    fmt is a payload.py format ("compact" or "json"). warm=True serves both
+    sources from disk without requests (see fetch-osint.run()).
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=days)
     PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
     output_path = PREFETCH_DIR / f"podcasts-{target_date}.json"
 
     print(f"Podcast pre-fetch for {target_date}", file=sys.stderr)
-    print(f"Looking back {args.days} days to {since.date()}", file=sys.stderr)
+    print(f"Looking back {days} days to {since.date()}", file=sys.stderr)
 
     result = {
         "date": target_date,
@@ -196,30 +208,151 @@ def main():
         "apple_charts": [],
     }
 
-    # Spotify episodes
+    if budget is None and resilience.active() is None and not warm:
+        budget = resilience.DEFAULT_BUDGET
+    if budget:
+        resilience.start(budget)
+    guard = shared_guard(PREFETCH_DIR)
+    recorder = telemetry.Recorder("podcasts")
+
+    # Spotify episodes (the client keeps per-show episodes, so no last-good copy)
     creds = get_spotify_credentials()
     if creds:
-        client_id, client_secret = creds
-        token = get_spotify_token(client_id, client_secret)
-        if token:
-            print(f"Fetching episodes from {len(TRACKED_SHOWS)} shows...", file=sys.stderr)
-            for show_id, show_name in TRACKED_SHOWS.items():
-                episodes = fetch_spotify_episodes(token, show_id, show_name, since)
-                if episodes:
-                    print(f"  {show_name}: {len(episodes)} new episodes", file=sys.stderr)
-                result["spotify_episodes"].extend(episodes)
-        else:
-            print("  Skipping Spotify (auth failed)", file=sys.stderr)
+        with recorder.source("spotify") as stats:
+            if warm:
+                result["spotify_episodes"] = guard.warm(
+                    "spotify", lambda: stored_spotify_episodes(since), stats, last_good=False,
+                    max_age=POLL_SECONDS["spotify"] * WARM_STALE_POLLS) or []
+            else:
+                result["spotify_episodes"] = guard.run(
+                    "spotify", lambda: fetch_spotify_episodes(*creds, since, workers), stats,
+                    last_good=False) or []
+            stats.items = len(result["spotify_episodes"])
     else:
         print("  Skipping Spotify (no credentials)", file=sys.stderr)
 
     # Apple Charts
-    result["apple_charts"] = fetch_apple_charts()
+    with recorder.source("apple-charts") as stats:
+        if warm:
+            result["apple_charts"] = guard.warm(
+                "apple-charts", stats=stats,
+                max_age=POLL_SECONDS["apple-charts"] * WARM_STALE_POLLS) or []
+        else:
+            result["apple_charts"] = guard.run("apple-charts", fetch_apple_charts, stats) or []
+        stats.items = len(result["apple_charts"])
+    result["fetch_stats"] = recorder.snapshot()
 
     # Summary
     total = len(result["spotify_episodes"]) + len(result["apple_charts"])
-    output_path.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    write_payload(result, output_path, PODCAST_SECTIONS, fmt)
     print(f"\nWrote {total} items to {output_path}", file=sys.stderr)
+    recorder.export(target_date, PREFETCH_DIR / "metrics")
+    if not warm:
+        guard.save()
+    HTTP_CACHE.save()
+    if report:
+        HTTP_CACHE.report()
+        shared_pool().report()
+    return output_path
+
+
+def backfill(first: date, last: date, days: int = 7, report: bool = True,
+             workers: int = MAX_WORKERS, budget: float | None = None,
+             fmt: str = "compact") -> list[Path]:
+    """Write podcasts-<day>.json for every day from first to last. Returns their paths.
+
+    Each source is fetched once for the whole range, without the guard
+    (breakers and last good results stay as they were) and without a
+    deadline unless budget is given.
+    """
+    windows = backfill_windows(first, last, timedelta(days=days))
+    PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"Podcast backfill {first} to {last} ({len(windows)} days)", file=sys.stderr)
+    if budget:
+        resilience.start(budget)
+    recorder = telemetry.Recorder("podcasts")
+
+    episodes: list[dict] = []
+    creds = get_spotify_credentials()
+    if creds:
+        with recorder.source("spotify") as stats:
+            episodes = fetch_spotify_episodes(*creds, windows[0][1], workers)
+            stats.items = len(episodes)
+    else:
+        print("  Skipping Spotify (no credentials)", file=sys.stderr)
+
+    today = date.today()
+    charts: list[dict] = []
+    if first <= today <= last:
+        with recorder.source("apple-charts") as stats:
+            charts = fetch_apple_charts()
+            stats.items = len(charts)
+    else:
+        print("  Skipping Apple Charts (no history for past days)", file=sys.stderr)
+    fetch_stats = recorder.snapshot()
+    fetched_at = datetime.now(timezone.utc).isoformat()
+
+    def write(window: tuple[date, datetime, datetime]) -> tuple[Path, int]:
+        day, start, end = window
+        result = {
+            "date": day.isoformat(),
+            "fetched_at": fetched_at,
+            "spotify_episodes": [ep for ep in episodes
+                                 if start <= (parse_release(ep) or end) < end],
+            "apple_charts": charts if day == today else [],
+            "fetch_stats": fetch_stats,
+        }
+        path = write_payload(result, PREFETCH_DIR / f"podcasts-{day}.json", PODCAST_SECTIONS,
+                             fmt)
+        return path, len(result["spotify_episodes"]) + len(result["apple_charts"])
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        written = list(pool.map(write, windows))
+
+    print(f"\nWrote {sum(n for _, n in written)} items to {len(written)} files "
+          f"(podcasts-{first}.json to podcasts-{last}.json)", file=sys.stderr)
+    recorder.export(last.isoformat(), PREFETCH_DIR / "metrics")
+    HTTP_CACHE.save()
+    if report:
+        HTTP_CACHE.report()
+        shared_pool().report()
+    return [path for path, _ in written]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Pre-fetch podcast data")
+    parser.add_argument("--date", help="Target date (YYYY-MM-DD)", default=None)
+    parser.add_argument("--days", help="Look back N days for episodes", type=int, default=7)
+    parser.add_argument("--workers", help="Concurrent Spotify show fetches", type=int,
+                        default=MAX_WORKERS)
+    parser.add_argument("--budget", help="Deadline in seconds (0 = none)", type=float,
+                        default=None)
+    parser.add_argument("--format", help="Output format (json = indented, for debugging)",
+                        choices=("compact", "json"), default="compact")
+    parser.add_argument("--warm", action="store_true",
+                        help="Write from the polling daemon's data without fetching")
+    parser.add_argument("--from", dest="first", type=date.fromisoformat, default=None,
+                        help="Backfill one file per day from this date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="last", type=date.fromisoformat, default=None,
+                        help="Last backfill date (default today)")
+    args = parser.parse_args()
+
+    if args.last and not args.first:
+        parser.error("--to needs --from")
+    if args.first:
+        if args.date or args.warm:
+            parser.error("--from/--to cannot be combined with --date or --warm")
+        last = args.last or date.today()
+        if last < args.first:
+            parser.error(f"--to {last} is before --from {args.first}")
+        backfill(args.first, last, args.days, workers=args.workers, budget=args.budget,
+                 fmt=args.format)
+        return
+
+    target_date = args.date or datetime.now().strftime("%Y-%m-%d")
+    run(target_date, args.days, workers=args.workers, budget=args.budget, fmt=args.format,
+        warm=args.warm)
 
 
 if __name__ == "__main__":
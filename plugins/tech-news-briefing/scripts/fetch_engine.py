@@ -0,0 +1,269 @@
+"""Registry-driven concurrent fetch engine for the pre-fetch scripts.
+
+Sources are listed in config/osint-sources.json rather than hardcoded. Each
+source has a `type` that maps to a handler function supplied by the caller
+(e.g. "rss" -> fetch_rss). Sources run concurrently on a thread pool with a
+per-host concurrency cap, so total wall time tracks the slowest host rather
+than the sum of all sources.
+
+With a telemetry.Recorder, each source's handler runs under
+recorder.source(source.id), so its requests, timings and item count land in
+the run's fetch stats.
+
+With a resilience.Guard, each handler also runs behind its source's circuit
+breaker, and a source that fails (or is skipped) yields its last good result
+marked stale; set `"last_good": false` on sources whose handler already
+falls back to local data. Under a run-wide deadline, run_sources() stops
+waiting once the budget is spent: sources still running are abandoned and
+served stale, so one hung host cannot hold up the briefing.
+
+serve_warm() is the no-network counterpart used for snapshots of what the
+polling daemon (prefetch_daemon.py) has collected: every source is served
+from its store or last good result, stale once its last success is older
+than WARM_STALE_POLLS of its `poll_seconds`.
+
+backfill_windows() splits a --from/--to range into per-day windows for the
+pre-fetch scripts' backfill mode, which downloads each source once for the
+whole range and then slices it per day.
+
+Scheduling: sources are grouped by host, and each host's sources are split
+into at most `per_host` lanes. A lane runs its sources one after another, so
+no more than `per_host` requests ever hit the same host at once — and no
+pool worker sits idle waiting on another host's slot.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import urlparse
+
+import resilience
+from resilience import Guard
+from telemetry import Recorder
+
+REGISTRY_PATH = Path(__file__).resolve().parent.parent / "config" / "osint-sources.json"
+
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_PER_HOST = 2
+# Extra seconds past the deadline to let in-flight sources hand back results
+DEADLINE_GRACE = 1.0
+DEFAULT_POLL_SECONDS = 1800
+# A warm source is stale once this many of its poll intervals pass without a success
+WARM_STALE_POLLS = 4
+
+
+@dataclass
+class Source:
+    """One entry from the source registry."""
+
+    id: str
+    type: str
+    name: str
+    url: str
+    timeout: int = 30
+    options: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def host(self) -> str:
+        return urlparse(self.url).netloc.lower()
+
+    @property
+    def poll_seconds(self) -> float:
+        return float(self.options.get("poll_seconds", DEFAULT_POLL_SECONDS))
+
+
+@dataclass
+class Registry:
+    """Parsed source registry: sources, engine limits and stage settings."""
+
+    sources: list[Source]
+    max_workers: int = DEFAULT_MAX_WORKERS
+    per_host: int = DEFAULT_PER_HOST
+    # Any other top-level registry keys (e.g. "enrichment"), for post-fetch stages
+    settings: dict[str, Any] = field(default_factory=dict)
+
+
+def load_registry(path: Path = REGISTRY_PATH) -> Registry:
+    """Load the source registry from JSON.
+
+    Entries with `"enabled": false` are skipped. Per-source keys other than
+    id/type/name/url/timeout are passed through to the handler as `options`,
+    layered over the registry-wide `defaults`.
+    """
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    defaults = raw.get("defaults", {})
+    limits = raw.get("limits", {})
+
+    sources = []
+    for entry in raw.get("sources", []):
+        if not entry.get("enabled", True):
+            continue
+        merged = {**defaults, **entry}
+        sources.append(Source(
+            id=merged.pop("id"),
+            type=merged.pop("type"),
+            name=merged.pop("name"),
+            url=merged.pop("url"),
+            timeout=int(merged.pop("timeout", 30)),
+            options={k: v for k, v in merged.items() if k != "enabled"},
+        ))
+
+    return Registry(
+        sources=sources,
+        max_workers=int(limits.get("max_workers", DEFAULT_MAX_WORKERS)),
+        per_host=int(limits.get("per_host", DEFAULT_PER_HOST)),
+        settings={k: v for k, v in raw.items() if k not in ("sources", "defaults", "limits")},
+    )
+
+
+def host_lanes(items: list, per_host: int,
+               host: Callable[[Any], str] = lambda src: src.host) -> list[list]:
+    """Split items (sources, or URLs with host=) into lanes: at most `per_host` lanes per host."""
+    by_host: dict[str, list] = defaultdict(list)
+    for item in items:
+        by_host[host(item)].append(item)
+
+    lanes = []
+    for host_items in by_host.values():
+        n = max(1, min(per_host, len(host_items)))
+        for i in range(n):
+            lanes.append(host_items[i::n])
+    # Longest lanes first so the slowest hosts start immediately
+    lanes.sort(key=len, reverse=True)
+    return lanes
+
+
+def run_sources(
+    sources: list[Source],
+    handlers: dict[str, Callable[[Source], Any]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    per_host: int = DEFAULT_PER_HOST,
+    recorder: Recorder | None = None,
+    guard: Guard | None = None,
+) -> dict[str, Any]:
+    """Run every source through its type's handler concurrently.
+
+    Returns {source.id: handler result}. A handler that raises, or a source
+    whose type has no handler, yields None and a WARN on stderr — one bad
+    source never stops the others. With a guard, failed sources yield their
+    last good result instead (see resilience.Guard).
+    """
+    results: dict[str, Any] = {}
+    started: set[str] = set()
+    results_lock = threading.Lock()
+    abandoned = False
+
+    def fetch(src: Source, handler: Callable[[Source], Any]) -> Any:
+        with recorder.source(src.id) if recorder else nullcontext() as stats:
+            if guard is None:
+                value = handler(src)
+            else:
+                value = guard.run(src.id, lambda: handler(src), stats,
+                                  last_good=bool(src.options.get("last_good", True)))
+            if stats is not None and isinstance(value, list):
+                stats.items = len(value)
+        return value
+
+    def run_lane(lane: list[Source]) -> None:
+        for src in lane:
+            with results_lock:
+                if abandoned:
+                    return
+                started.add(src.id)
+            handler = handlers.get(src.type)
+            if handler is None:
+                print(f"  WARN: No handler for source type '{src.type}' ({src.id})", file=sys.stderr)
+                value = None
+            else:
+                try:
+                    value = fetch(src, handler)
+                except Exception as e:
+                    print(f"  WARN: Source {src.id} failed: {e}", file=sys.stderr)
+                    value = None
+            with results_lock:
+                if abandoned:
+                    return
+                results[src.id] = value
+
+    lanes = host_lanes(sources, per_host)
+    if not lanes:
+        return results
+
+    left = resilience.remaining()
+    timeout = None if left is None else max(0.0, left) + DEADLINE_GRACE
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(lanes)))
+    try:
+        futures = [pool.submit(run_lane, lane) for lane in lanes]
+        for future in as_completed(futures, timeout=timeout):
+            future.result()
+    except FuturesTimeout:
+        # Deadline spent: stop waiting and serve the unfinished sources stale
+        with results_lock:
+            abandoned = True
+            missing = [src for src in sources if src.id not in results]
+        for src in missing:
+            handler = handlers.get(src.type)
+            if guard is None or handler is None:
+                print(f"  WARN: Source {src.id} missed the deadline", file=sys.stderr)
+                results[src.id] = None
+                continue
+            stats = recorder.stats(src.id) if recorder else None
+            value = guard.abandon(src.id, lambda: handler(src), stats,
+                                  last_good=bool(src.options.get("last_good", True)),
+                                  started=src.id in started)
+            if stats is not None and isinstance(value, list):
+                stats.items = len(value)
+            results[src.id] = value
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def serve_warm(
+    sources: list[Source],
+    handlers: dict[str, Callable[[Source], Any]],
+    guard: Guard,
+    recorder: Recorder | None = None,
+) -> dict[str, Any]:
+    """Serve every source from local data, without the network.
+
+    Returns {source.id: result} like run_sources(). Sources with
+    `"last_good": false` run their handler, which must only read the
+    source's local store; the rest get their last good result (see
+    resilience.Guard.warm).
+    """
+    results: dict[str, Any] = {}
+    for src in sources:
+        handler = handlers.get(src.type)
+        with recorder.source(src.id) if recorder else nullcontext() as stats:
+            value = guard.warm(src.id, (lambda h=handler, s=src: h(s)) if handler else None,
+                               stats, last_good=bool(src.options.get("last_good", True)),
+                               max_age=src.poll_seconds * WARM_STALE_POLLS)
+            if stats is not None and isinstance(value, list):
+                stats.items = len(value)
+        results[src.id] = value
+    return results
+
+
+def backfill_windows(first: date, last: date,
+                     window: timedelta) -> list[tuple[date, datetime, datetime]]:
+    """(day, start, end) for each day from first to last inclusive.
+
+    end is the following UTC midnight and start is `window` before it, so
+    each day gets what a run at the close of that day would have fetched.
+    """
+    if last < first:
+        raise ValueError(f"--to {last} is before --from {first}")
+    days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+    ends = [datetime.combine(day + timedelta(days=1), time.min, timezone.utc) for day in days]
+    return [(day, end - window, end) for day, end in zip(days, ends)]
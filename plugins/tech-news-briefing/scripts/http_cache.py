@@ -0,0 +1,246 @@
+"""Persistent conditional-GET HTTP cache shared by the pre-fetch scripts.
+
+Bodies live under ~/.config/tech-news-briefing/prefetch/http-cache/, one file
+per URL, with an index.json holding each entry's ETag / Last-Modified
+validators, size and last-access time. A request for a cached URL is sent
+with If-None-Match / If-Modified-Since; a 304 is served from disk, so an
+unchanged upstream costs a few hundred bytes instead of the full payload.
+
+Requests go over the keep-alive connection pool in http_pool.py, ask for
+gzip/deflate and are decoded transparently. Bodies are streamed to disk
+decoded, chunk by chunk, so a multi-MB payload never has to sit in memory;
+callers that want to parse incrementally use get_file() or stream(). When
+the cache grows past max_bytes, least-recently-used entries are evicted on
+save().
+
+Usage:
+    cache = HTTPCache()
+    body = cache.get(url, timeout=30)   # bytes; raises URLError on failure
+    path, modified = cache.get_file(url)  # decoded body on disk
+    with cache.stream(url) as (chunks, modified):  # decoded chunks, stop any time
+        ...
+    cache.save()
+    cache.report()                      # hit/miss/bytes-saved on stderr
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from urllib.error import HTTPError
+
+from http_pool import USER_AGENT, BodyDecoder, HTTPPool, format_bytes, shared_pool
+
+CACHE_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch" / "http-cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+_shared: dict[Path, "HTTPCache"] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache(root: Path = CACHE_DIR) -> HTTPCache:
+    """Process-wide cache for a directory.
+
+    Scripts loaded into one process (see prefetch.py) must share a single
+    instance: separate instances would each rewrite index.json and drop the
+    other's entries.
+    """
+    with _shared_lock:
+        if root not in _shared:
+            _shared[root] = HTTPCache(root)
+        return _shared[root]
+
+
+class HTTPCache:
+    """On-disk HTTP cache with ETag/Last-Modified revalidation and LRU eviction."""
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 pool: HTTPPool | None = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.pool = pool or shared_pool()
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_transferred = 0
+
+    # -- index -------------------------------------------------------------
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.json"
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self._index = {}
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def body_path(self, url: str) -> Path:
+        return self.root / f"{self.key(url)}.body"
+
+    def save(self) -> None:
+        """Evict down to max_bytes (least recently used first) and write the index."""
+        with self._lock:
+            if not self._loaded:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            total = sum(e.get("size", 0) for e in self._index.values())
+            if total > self.max_bytes:
+                for k, entry in sorted(self._index.items(), key=lambda kv: kv[1].get("accessed", 0)):
+                    if total <= self.max_bytes:
+                        break
+                    (self.root / f"{k}.body").unlink(missing_ok=True)
+                    total -= entry.get("size", 0)
+                    del self._index[k]
+            tmp = self.index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._index), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+
+    # -- requests ----------------------------------------------------------
+
+    def get(self, url: str, headers: dict | None = None, timeout: float = 30,
+            retries: int | None = None) -> bytes:
+        """GET url, revalidating any cached copy. Returns the decoded body.
+
+        Raises URLError/HTTPError/TimeoutError on failure, like urlopen.
+        retries overrides the pool's retry count (0 = caller retries itself).
+        """
+        path, _ = self.get_file(url, headers=headers, timeout=timeout, retries=retries)
+        return path.read_bytes()
+
+    def partial(self, url: str) -> bool:
+        """Whether url's cached body is a prefix: a stream() that stopped early."""
+        with self._lock:
+            self._load()
+            return bool((self._index.get(self.key(url)) or {}).get("partial"))
+
+    def get_file(self, url: str, headers: dict | None = None, timeout: float = 30,
+                 retries: int | None = None) -> tuple[Path, bool]:
+        """GET url into the cache and return (decoded body path, modified).
+
+        modified is False when the server answered 304 and the cached copy was
+        reused. The response is streamed to disk, never held whole in memory.
+        """
+        with self.stream(url, headers=headers, timeout=timeout,
+                         retries=retries) as (chunks, modified):
+            for _ in chunks:
+                pass
+        return self.body_path(url), modified
+
+    @contextmanager
+    def stream(self, url: str, headers: dict | None = None, timeout: float = 30,
+               allow_partial: bool = False,
+               retries: int | None = None) -> Iterator[tuple[Iterator[bytes], bool]]:
+        """GET url and yield (decoded chunk iterator, modified) for incremental parsing.
+
+        A fully read response is committed to the cache. A caller that stops
+        early (e.g. a feed parser that has enough items) closes the
+        connection without reading the rest; with allow_partial the prefix
+        read so far is cached with the validators and flagged partial, so the
+        next revalidation of an unchanged feed replays the same prefix. Only
+        allow_partial callers are ever served a partial entry, and they must
+        take its end as the end of the document (see partial()).
+        """
+        with self._lock:
+            self._load()
+            entry = dict(self._index.get(self.key(url)) or {})
+
+        body_path = self.body_path(url)
+        if entry and (not body_path.exists() or (entry.get("partial") and not allow_partial)):
+            entry = {}
+
+        req_headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+        req_headers.update(headers or {})
+        if entry.get("etag"):
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            resp = self.pool.request("GET", url, headers=req_headers, timeout=timeout,
+                                     retries=retries)
+        except HTTPError as e:
+            if e.code != 304 or not entry:
+                raise
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += entry.get("wire_size", entry.get("size", 0))
+                self._index[self.key(url)] = {**entry, "accessed": time.time()}
+            with open(body_path, "rb") as fp:
+                yield iter(lambda: fp.read(CHUNK_SIZE), b""), False
+            return
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = body_path.with_suffix(f".{threading.get_ident()}.tmp")
+        state = {"wire_size": 0, "size": 0, "complete": False}
+
+        def chunks() -> Iterator[bytes]:
+            decoder = BodyDecoder(resp.headers.get("Content-Encoding"))
+            with open(tmp, "wb") as out:
+                while chunk := resp.read(CHUNK_SIZE):
+                    state["wire_size"] += len(chunk)
+                    data = decoder.decompress(chunk)
+                    state["size"] += len(data)
+                    out.write(data)
+                    yield data
+                data = decoder.flush()
+                state["size"] += len(data)
+                out.write(data)
+                yield data
+            state["complete"] = True
+
+        body = chunks()
+        try:
+            with resp:
+                yield body, True
+        except BaseException:
+            body.close()
+            tmp.unlink(missing_ok=True)
+            raise
+        body.close()
+
+        with self._lock:
+            self.misses += 1
+            self.bytes_transferred += state["wire_size"]
+            if not (state["complete"] or (allow_partial and state["size"])):
+                tmp.unlink(missing_ok=True)
+                return
+            os.replace(tmp, body_path)
+            self._index[self.key(url)] = {
+                "url": url,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "size": state["size"],
+                "wire_size": state["wire_size"],
+                "partial": not state["complete"],
+                "accessed": time.time(),
+            }
+
+    def report(self, label: str = "HTTP cache") -> None:
+        """Print hit/miss/bytes-saved counters to stderr."""
+        print(
+            f"{label}: {self.hits} hits, {self.misses} misses, "
+            f"{format_bytes(self.bytes_saved)} saved, "
+            f"{format_bytes(self.bytes_transferred)} transferred",
+            file=sys.stderr,
+        )
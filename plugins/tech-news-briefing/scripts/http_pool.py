@@ -0,0 +1,436 @@
+"""Keep-alive HTTP client with per-host connection pooling.
+
+urlopen() opens a new TCP (and TLS) connection for every request, so
+fetching 18 Spotify shows pays 18 handshakes to the same host. HTTPPool
+keeps finished connections open per (scheme, host, port) and hands them to
+the next request for that host, so repeat requests cost one round trip.
+
+Behaviour matches urlopen closely enough to be a drop-in for the pre-fetch
+scripts: redirects are followed, non-2xx responses raise HTTPError (so a
+304 still arrives as HTTPError), and connection failures raise URLError.
+On top of that:
+
+  - gzip/deflate is requested by default; read() returns wire bytes,
+    content() the decoded body
+  - a pooled connection the server has since closed is retried once on a
+    fresh connection, transparently
+  - connection errors and 429/5xx responses are retried with exponential
+    backoff, honouring Retry-After (retries=0 disables this, e.g. for
+    callers with their own rate-limit-aware retry loop)
+  - under a run-wide deadline (resilience.start), timeouts shrink to the
+    budget left, retries and body reads stop once it is spent, and a GET
+    with no response after the deadline's hedge_after seconds is sent a
+    second time on another connection; the first response wins. Requests
+    with retries=0 are never hedged: their callers are rate limited.
+  - a source whose circuit breaker is open (resilience.Guard) makes no
+    requests at all: they fail at once with SourceUnavailable
+
+A connection goes back to the pool only once its response has been read to
+the end; a response abandoned half-way closes its connection instead.
+
+Every request is reported to the current telemetry source (telemetry.py):
+DNS, TCP connect and TLS time for new connections, time to first byte,
+total time once the body is consumed, wire bytes and status.
+
+Setting TECH_NEWS_BRIEFING_REPLAY=http://host:port sends every request to
+that address instead, over plain HTTP with the original Host header, so the
+scripts can run unmodified against the local replay server (see bench.py).
+
+Usage:
+    pool = shared_pool()
+    with pool.request("GET", url, headers={...}, timeout=15) as resp:
+        data = json.loads(resp.content())
+    pool.report()                       # requests / connections on stderr
+"""
+
+from __future__ import annotations
+
+import contextvars
+import http.client
+import io
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import zlib
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+
+import resilience
+import telemetry
+from resilience import DeadlineExceeded
+
+USER_AGENT = "BPG-Tech-News/2.0 (prefetch)"
+MAX_IDLE_PER_HOST = 4
+MAX_REDIRECTS = 5
+DEFAULT_RETRIES = 2
+BACKOFF = 1.0          # seconds, doubled per retry
+MAX_RETRY_AFTER = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+REPLAY_ENV = "TECH_NEWS_BRIEFING_REPLAY"
+
+# Errors that mean a reused keep-alive connection was closed by the server
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError)
+
+
+class BodyDecoder:
+    """Incremental gzip/deflate decoder. Unknown encodings pass through."""
+
+    def __init__(self, encoding: str | None):
+        self.encoding = (encoding or "").strip().lower()
+        self._obj = None
+        if self.encoding in ("gzip", "x-gzip"):
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self.encoding == "deflate" and self._obj is None and chunk:
+            # Some servers send raw deflate without the zlib header (0x78..)
+            wbits = zlib.MAX_WBITS if chunk[0] == 0x78 else -zlib.MAX_WBITS
+            self._obj = zlib.decompressobj(wbits)
+        return self._obj.decompress(chunk) if self._obj else chunk
+
+    def flush(self) -> bytes:
+        return self._obj.flush() if self._obj else b""
+
+
+def format_bytes(n: float) -> str:
+    """Human-readable byte count (e.g. '4.2 MB')."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+class PooledResponse:
+    """A response whose connection returns to the pool when fully read."""
+
+    def __init__(self, pool: HTTPPool, key: tuple, conn: http.client.HTTPConnection,
+                 resp: http.client.HTTPResponse, url: str, timing: dict | None = None):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+        self._timing = timing or {}
+        self._stats = telemetry.current()
+        self._received = 0
+
+    def read(self, amt: int | None = None) -> bytes:
+        """Read raw (possibly compressed) body bytes."""
+        if amt is not None and resilience.expired():
+            self.close()
+            raise DeadlineExceeded(f"pre-fetch deadline reached reading {self.url}")
+        data = self._resp.read(amt)
+        self._received += len(data)
+        self._pool._count_bytes(len(data))
+        if amt is None or not data:
+            self.close()
+        return data
+
+    def content(self) -> bytes:
+        """Read the rest of the body, decoded per Content-Encoding."""
+        decoder = BodyDecoder(self.headers.get("Content-Encoding"))
+        return decoder.decompress(self.read()) + decoder.flush()
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._stats is not None:
+            t = self._timing
+            self._stats.record_request(
+                self.status, self._received, dns=t.get("dns", 0.0),
+                connect=t.get("connect", 0.0), tls=t.get("tls", 0.0), ttfb=t.get("ttfb", 0.0),
+                total=time.perf_counter() - t.get("start", time.perf_counter()))
+        if self._resp.isclosed() and not self._resp.will_close:
+            self._pool._release(self._key, conn)
+        else:
+            conn.close()
+
+    def __enter__(self) -> PooledResponse:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class HTTPPool:
+    """Thread-safe pool of keep-alive connections, keyed by scheme/host/port."""
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST,
+                 retries: int = DEFAULT_RETRIES, replay: str | None = None):
+        self.max_idle_per_host = max_idle_per_host
+        self.retries = retries
+        replay = os.environ.get(REPLAY_ENV, "") if replay is None else replay
+        self.replay = urlsplit(replay) if replay else None
+        self._idle: dict[tuple, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.reused = 0
+        self.bytes_received = 0
+
+    def _count_bytes(self, n: int) -> None:
+        with self._lock:
+            self.bytes_received += n
+
+    # -- connections -------------------------------------------------------
+
+    def _acquire(self, key: tuple, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                self.reused += 1
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            self.connections += 1
+        return self._new_connection(key, timeout), False
+
+    @staticmethod
+    def _new_connection(key: tuple, timeout: float) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout)
+
+    @staticmethod
+    def _connect(conn: http.client.HTTPConnection, timing: dict) -> None:
+        """Open conn now, splitting the time into DNS, TCP connect and TLS."""
+        def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                              source_address=None, **kwargs):
+            started = time.perf_counter()
+            infos = socket.getaddrinfo(address[0], address[1], 0, socket.SOCK_STREAM)
+            timing["dns"] = time.perf_counter() - started
+            started = time.perf_counter()
+            error: OSError | None = None
+            for *_, sockaddr in infos:
+                try:
+                    sock = socket.create_connection(sockaddr[:2], timeout, source_address)
+                except OSError as e:
+                    error = e
+                    continue
+                timing["connect"] = time.perf_counter() - started
+                return sock
+            raise error or OSError(f"no addresses for {address[0]}")
+
+        conn._create_connection = create_connection
+        started = time.perf_counter()
+        conn.connect()
+        timing["tls"] = max(0.0, time.perf_counter() - started
+                            - timing.get("dns", 0.0) - timing.get("connect", 0.0))
+
+    def _release(self, key: tuple, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    # -- requests ----------------------------------------------------------
+
+    def _send(self, method: str, url: str, headers: dict, data: bytes | None,
+              timeout: float) -> PooledResponse:
+        """One request/response on a pooled connection, no retries or redirects."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise URLError(f"unsupported URL scheme: {scheme}")
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        if self.replay:
+            key = ("http", self.replay.hostname, self.replay.port or 80)
+            headers = {**headers, "Host": parts.netloc}
+
+        timing = {"start": time.perf_counter()}
+        conn, reused = self._acquire(key, timeout)
+        try:
+            if not reused:
+                self._connect(conn, timing)
+            sent = time.perf_counter()
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+        except STALE_ERRORS:
+            conn.close()
+            if not reused:
+                self._record_failure(timing)
+                raise
+            # Server dropped the idle keep-alive connection; use a fresh one
+            with self._lock:
+                self.connections += 1
+            conn = self._new_connection(key, timeout)
+            try:
+                self._connect(conn, timing)
+                sent = time.perf_counter()
+                conn.request(method, path, body=data, headers=headers)
+                resp = conn.getresponse()
+            except BaseException:
+                conn.close()
+                self._record_failure(timing)
+                raise
+        except BaseException:
+            conn.close()
+            self._record_failure(timing)
+            raise
+        timing["ttfb"] = time.perf_counter() - sent
+        with self._lock:
+            self.requests += 1
+        return PooledResponse(self, key, conn, resp, url, timing)
+
+    def _send_hedged(self, method: str, url: str, headers: dict, data: bytes | None,
+                     timeout: float) -> PooledResponse:
+        """_send(), duplicated on a second connection if the first is slow to answer."""
+        delay = resilience.hedge_after()
+        if method != "GET" or not delay or delay >= timeout:
+            return self._send(method, url, headers, data, timeout)
+
+        outcomes: queue.Queue = queue.Queue()
+
+        def attempt(timeout: float) -> None:
+            try:
+                outcomes.put((self._send(method, url, headers, data, timeout), None))
+            except BaseException as e:
+                outcomes.put((None, e))
+
+        def launch(timeout: float) -> None:
+            ctx = contextvars.copy_context()
+            threading.Thread(target=ctx.run, args=(attempt, timeout), daemon=True).start()
+
+        launch(timeout)
+        try:
+            first = outcomes.get(timeout=delay)
+        except queue.Empty:
+            # The copy gets only what is left of the original's timeout
+            telemetry.add_hedge()
+            launch(max(resilience.MIN_TIMEOUT, timeout - delay))
+            first = None
+
+        if first is not None:
+            resp, error = first
+            if error is not None:
+                raise error
+            return resp
+        resp, error = outcomes.get()
+        if error is None:
+            # The slower copy is closed whenever it answers; its connection is dropped
+            threading.Thread(target=self._discard, args=(outcomes,), daemon=True).start()
+            return resp
+        resp, second_error = outcomes.get()
+        if second_error is None:
+            return resp
+        raise error
+
+    @staticmethod
+    def _discard(outcomes: queue.Queue) -> None:
+        resp, _ = outcomes.get()
+        if resp is not None:
+            resp.close()
+
+    @staticmethod
+    def _record_failure(timing: dict) -> None:
+        stats = telemetry.current()
+        if stats is not None:
+            stats.record_request(0, 0, dns=timing.get("dns", 0.0),
+                                 connect=timing.get("connect", 0.0),
+                                 total=time.perf_counter() - timing["start"])
+
+    def request(self, method: str, url: str, headers: dict | None = None,
+                data: bytes | None = None, timeout: float = 30,
+                retries: int | None = None) -> PooledResponse:
+        """Send a request, following redirects and retrying transient failures.
+
+        Returns a PooledResponse for 2xx. Raises HTTPError for other
+        statuses and URLError (or TimeoutError) when the host is unreachable;
+        DeadlineExceeded once the run-wide budget is spent, SourceUnavailable
+        (a URLError) while the calling source's circuit breaker is open.
+        """
+        resilience.check_online()
+        retries = self.retries if retries is None else retries
+        req_headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+        req_headers.update(headers or {})
+
+        redirects = 0
+        attempt = 0
+        while True:
+            try:
+                budget = resilience.clamp(timeout)
+                if retries:
+                    resp = self._send_hedged(method, url, req_headers, data, budget)
+                else:
+                    resp = self._send(method, url, req_headers, data, budget)
+            except DeadlineExceeded:
+                raise
+            except (OSError, http.client.HTTPException) as e:
+                if attempt >= retries:
+                    if isinstance(e, (URLError, TimeoutError)):
+                        raise
+                    raise URLError(e) from e
+                attempt += 1
+                telemetry.add_retry()
+                resilience.sleep(BACKOFF * 2 ** (attempt - 1))
+                continue
+
+            if resp.status in REDIRECT_STATUSES and resp.headers.get("Location") \
+                    and redirects < MAX_REDIRECTS:
+                resp.read()
+                redirects += 1
+                url = urljoin(url, resp.headers["Location"])
+                if resp.status == 303 or (resp.status in (301, 302) and method == "POST"):
+                    method, data = "GET", None
+                    req_headers.pop("Content-Type", None)
+                continue
+
+            if 200 <= resp.status < 300:
+                return resp
+
+            body = resp.read()
+            if resp.status in RETRY_STATUSES and attempt < retries:
+                attempt += 1
+                telemetry.add_retry()
+                retry_after = resp.headers.get("Retry-After", "")
+                delay = (min(float(retry_after), MAX_RETRY_AFTER) if retry_after.isdigit()
+                         else BACKOFF * 2 ** (attempt - 1))
+                resilience.sleep(delay)
+                continue
+            raise HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+
+    def report(self, label: str = "HTTP pool") -> None:
+        """Print request/connection counters to stderr."""
+        print(
+            f"{label}: {self.requests} requests over {self.connections} connections "
+            f"({self.reused} reused), {format_bytes(self.bytes_received)} received",
+            file=sys.stderr,
+        )
+
+
+_shared: HTTPPool | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> HTTPPool:
+    """Process-wide pool, so every script and client in a run shares connections."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HTTPPool()
+        return _shared
@@ -0,0 +1,134 @@
+"""Streaming processing of the CISA KEV catalog.
+
+The catalog is a single JSON object whose last key, "vulnerabilities", holds
+every entry ever added — several MB and growing. CatalogStream reads it from
+a file in fixed-size chunks and decodes one vulnerability object at a time,
+so memory stays flat no matter how large the catalog gets.
+
+Delta tracking (which entries are new or changed since the last run) lives
+in the vulnerability store; see VulnStore.sync_kev in vuln_store.py. The
+catalog's dateReleased / count header lets an unchanged catalog be skipped
+without reading the vulnerabilities array at all, and entry_digest() spots
+changed entries without keeping old records around.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import IO, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class CatalogStream:
+    """Incrementally decode {..., "vulnerabilities": [{...}, ...]} from a file.
+
+    `header` holds the scalar top-level keys that precede the array
+    (catalogVersion, dateReleased, count); it is filled by read_header().
+    Iterating yields each vulnerability dict in order.
+    """
+
+    def __init__(self, fp: IO[str], array_key: str = "vulnerabilities"):
+        self.fp = fp
+        self.array_key = array_key
+        self.header: dict = {}
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._in_array = False
+
+    # -- buffer ------------------------------------------------------------
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer. False at EOF."""
+        if self._eof:
+            return False
+        chunk = self.fp.read(CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        c = self._peek()
+        if c == "" or c not in chars:
+            raise ValueError(f"KEV catalog: expected one of {chars!r}, got {c!r}")
+        self._pos += 1
+        return c
+
+    def _value(self):
+        """Decode the next complete JSON value, reading more input as needed."""
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the buffer edge may be cut short; make sure it ended
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    # -- public ------------------------------------------------------------
+
+    def read_header(self) -> dict:
+        """Read top-level keys up to the start of the array. Returns header."""
+        self._expect("{")
+        while True:
+            if self._peek() == "}":
+                return self.header
+            key = self._value()
+            self._expect(":")
+            if key == self.array_key:
+                self._expect("[")
+                self._in_array = True
+                return self.header
+            self.header[key] = self._value()
+            if self._expect(",}") == "}":
+                return self.header
+
+    def __iter__(self) -> Iterator[dict]:
+        if not self._in_array:
+            self.read_header()
+        if not self._in_array:
+            return
+        if self._peek() == "]":
+            return
+        while True:
+            yield self._value()
+            if self._expect(",]") == "]":
+                return
+
+
+def first_day(cutoff: datetime) -> str:
+    """Earliest YYYY-MM-DD whose midnight is at or after cutoff.
+
+    dateAdded is a plain date, so comparing strings against this matches
+    the old strptime(...) >= cutoff check without parsing every entry.
+    """
+    return ((cutoff - timedelta(microseconds=1)).date() + timedelta(days=1)).isoformat()
+
+
+def entry_digest(vuln: dict) -> str:
+    """Short stable digest of a KEV entry, used to detect changed entries."""
+    canonical = json.dumps(vuln, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""Markdown -> HTML for briefings: email bodies and the archive.
+
+One pass over the lines with precompiled patterns. Block syntax: headings
+(# to ######), paragraphs, `-`/`*`/`+` and numbered lists (indented lines
+continue the item), `>` quotes, ``` / ~~~ fenced code, pipe tables,
+horizontal rules, the metadata line (**Day** | Daily | ...) and italic
+footer lines. HTML comments such as `<!-- tab: ... -->` are dropped.
+Inline: `code`, [links](url), **bold**, *italic* and <https://autolinks>.
+All text is HTML-escaped; links other than http(s)/mailto/relative become #.
+Elements carry inline styles, since mail clients ignore <style>.
+
+Rendered documents are cached by content hash (RENDER_VERSION + markdown)
+under ~/.config/tech-news-briefing/render-cache/, so re-sending or
+re-building an unchanged briefing costs a file read.
+
+Batch mode renders every .md under the briefing archive (YYYY/week-WW/
+dailies and weekly recaps, YYYY/ monthly recaps) to a mirrored .html tree,
+in parallel worker processes. A manifest of content hashes in the output
+directory means only new or changed briefings are rendered; HTML for
+deleted briefings is removed.
+
+Usage:
+    from md_render import markdown_to_html
+    html = markdown_to_html(md)
+
+    python3 md_render.py ARCHIVE_DIR [--out DIR] [--workers N] [--force]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Bump when the rendered output changes, to invalidate cached HTML
+RENDER_VERSION = "1"
+CACHE_DIR = Path.home() / ".config" / "tech-news-briefing" / "render-cache"
+MANIFEST = ".manifest.json"
+# Below this many files, rendering inline beats starting worker processes
+PARALLEL_MIN_FILES = 8
+
+STYLES = {
+    "h1": "font-size:1.5em;font-weight:700;margin:0 0 8px;",
+    "h2": "font-size:1.2em;font-weight:600;margin:24px 0 12px;color:#3f3f46;",
+    "h3": "font-size:1.05em;font-weight:600;margin:20px 0 8px;color:#3f3f46;",
+    "h4": "font-size:1em;font-weight:600;margin:16px 0 8px;color:#52525b;",
+    "h5": "font-size:0.95em;font-weight:600;margin:12px 0 6px;color:#52525b;",
+    "h6": "font-size:0.9em;font-weight:600;margin:12px 0 6px;color:#71717a;",
+    "hr": "border:none;border-top:1px solid #e4e4e7;margin:24px 0;",
+    "ul": "padding-left:20px;margin:0;",
+    "ol": "padding-left:24px;margin:0;",
+    "li": "margin:12px 0;line-height:1.6;",
+    "p": "margin:8px 0;line-height:1.6;",
+    "meta": "color:#71717a;margin:0 0 16px;",
+    "footer": "font-size:0.85em;color:#a1a1aa;margin:4px 0;",
+    "a": "color:#2563eb;text-decoration:none;",
+    "strong_a": "color:#2563eb;text-decoration:none;font-weight:600;",
+    "blockquote": "border-left:3px solid #e4e4e7;margin:12px 0;padding:0 0 0 12px;color:#52525b;",
+    "pre": "background:#f4f4f5;border-radius:6px;padding:12px;overflow-x:auto;"
+           "font-size:0.8em;line-height:1.45;margin:12px 0;",
+    "code": "background:#f4f4f5;border-radius:4px;padding:1px 4px;font-size:0.9em;",
+    "table": "border-collapse:collapse;margin:12px 0;font-size:0.9em;",
+    "th": "border-bottom:2px solid #e4e4e7;padding:6px 10px;font-weight:600;",
+    "td": "border-bottom:1px solid #f4f4f5;padding:6px 10px;",
+}
+
+DOCUMENT = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8">{title}</head>
+<body style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;font-size:20px;color:#18181b;max-width:680px;margin:0 auto;padding:24px;line-height:1.6;">
+{body}
+</body>
+</html>"""
+
+# -- patterns ----------------------------------------------------------------
+
+# Every block-level line kind in one alternation, tried in order: one match per line
+BLOCK = re.compile(
+    r"(?P<fence>`{3,}|~{3,})\s*(?P<lang>[\w+#.-]*)"
+    r"|(?P<comment><!--.*-->$)"
+    r"|(?P<hr>(?:-\s*){3,}$|(?:\*\s*){3,}$|(?:_\s*){3,}$)"
+    r"|(?P<hashes>#{1,6})\s+(?P<heading>.*)$"
+    r"|[-*+]\s+(?P<bullet>.*)$"
+    r"|\d{1,9}[.)]\s+(?P<ordered>.*)$"
+    r"|>\s?(?P<quote>.*)$"
+    r"|(?P<meta>\*\*.*\|)"
+    r"|\*(?P<footer>[^*](?:.*[^*])?)\*$"
+)
+QUOTE = re.compile(r"^>\s?(.*)$")
+TABLE_SEP = re.compile(r"^\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?$")
+CELL_SPLIT = re.compile(r"(?<!\\)\|")
+# Inline markup can only start at one of these; text without them is just escaped
+SPECIAL = re.compile(r"[`*\[<>&]")
+
+INLINE = re.compile(
+    r"(?=[`*\[<])(?:"
+    r"(?P<tick>`+)(?P<code>.+?)(?P=tick)"
+    r"|\*\*\[(?P<slink>[^\]]+)\]\((?P<surl>[^)\s]+)\)\*\*"
+    r"|\[(?P<link>[^\]]+)\]\((?P<url>[^)\s]+)\)"
+    r"|<(?P<auto>https?://[^>\s]+)>"
+    r"|\*\*(?P<strong>.+?)\*\*"
+    r"|\*(?P<em>[^*\s](?:.*?[^*\s])?)\*"
+    r")"
+)
+SAFE_URL = re.compile(r"^(?:https?://|mailto:|[/#.]|[\w-]+(?:[/.#?]|$))", re.IGNORECASE)
+
+
+# -- inline ------------------------------------------------------------------
+
+def _escape(text: str) -> str:
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _url(raw: str) -> str:
+    return html.escape(raw if SAFE_URL.match(raw) else "#", quote=True)
+
+
+def render_inline(text: str) -> str:
+    """Escape text and render inline markup."""
+    if not SPECIAL.search(text):
+        return text
+    out = []
+    pos = 0
+    for m in INLINE.finditer(text):
+        out.append(_escape(text[pos:m.start()]))
+        pos = m.end()
+        kind = m.lastgroup
+        if m.group("code") is not None:
+            out.append(f'<code style="{STYLES["code"]}">'
+                       f'{_escape(m.group("code").strip())}</code>')
+        elif kind == "surl":
+            out.append(f'<a href="{_url(m.group("surl"))}" style="{STYLES["strong_a"]}">'
+                       f'{render_inline(m.group("slink"))}</a>')
+        elif kind == "url":
+            out.append(f'<a href="{_url(m.group("url"))}" style="{STYLES["a"]}">'
+                       f'{render_inline(m.group("link"))}</a>')
+        elif kind == "auto":
+            url = m.group("auto")
+            out.append(f'<a href="{_url(url)}" style="{STYLES["a"]}">'
+                       f'{_escape(url)}</a>')
+        elif kind == "strong":
+            out.append(f"<strong>{render_inline(m.group('strong'))}</strong>")
+        else:
+            out.append(f"<em>{render_inline(m.group('em'))}</em>")
+    out.append(_escape(text[pos:]))
+    return "".join(out)
+
+
+# -- blocks ------------------------------------------------------------------
+
+def _cells(row: str) -> list[str]:
+    row = row.strip()
+    if row.startswith("|"):
+        row = row[1:]
+    if row.endswith("|") and not row.endswith("\\|"):
+        row = row[:-1]
+    return [c.strip().replace("\\|", "|") for c in CELL_SPLIT.split(row)]
+
+
+def _table(header: str, sep: str, rows: list[str]) -> str:
+    aligns = []
+    for spec in _cells(sep):
+        if spec.startswith(":") and spec.endswith(":"):
+            aligns.append("center")
+        elif spec.endswith(":"):
+            aligns.append("right")
+        else:
+            aligns.append("left")
+
+    def row_html(cells: list[str], tag: str) -> str:
+        parts = []
+        for i, align in enumerate(aligns):
+            cell = cells[i] if i < len(cells) else ""
+            parts.append(f'<{tag} style="{STYLES[tag]}text-align:{align};">'
+                         f"{render_inline(cell)}</{tag}>")
+        return "<tr>" + "".join(parts) + "</tr>"
+
+    body = "".join(row_html(_cells(r), "td") for r in rows)
+    return (f'<table style="{STYLES["table"]}"><thead>{row_html(_cells(header), "th")}</thead>'
+            f"<tbody>{body}</tbody></table>")
+
+
+def render_body(md: str) -> str:
+    """Render markdown to an HTML fragment in one pass over its lines."""
+    lines = md.split("\n")
+    out: list[str] = []
+    para: list[str] = []
+    items: list[str] = []       # open list's items (raw markdown)
+    list_tag = ""
+
+    def flush_para() -> None:
+        if para:
+            out.append(f'<p style="{STYLES["p"]}">{render_inline(" ".join(para))}</p>')
+            para.clear()
+
+    def flush_list() -> None:
+        nonlocal list_tag
+        if items:
+            lis = "".join(f'<li style="{STYLES["li"]}">{render_inline(item)}</li>' for item in items)
+            out.append(f'<{list_tag} style="{STYLES[list_tag]}">{lis}</{list_tag}>')
+            items.clear()
+        list_tag = ""
+
+    def flush() -> None:
+        if para:
+            flush_para()
+        if list_tag:
+            flush_list()
+
+    i, n = 0, len(lines)
+    while i < n:
+        line = lines[i]
+        stripped = line.strip()
+        i += 1
+
+        if not stripped:
+            flush()
+            continue
+
+        m = BLOCK.match(stripped)
+        kind = m.lastgroup if m else None
+        if kind == "lang" or (m and m.group("fence")):
+            # Fenced code: everything up to the closing fence is literal
+            flush()
+            fence, lang = m.group("fence"), m.group("lang")
+            code = []
+            while i < n and not lines[i].strip().startswith(fence):
+                code.append(lines[i])
+                i += 1
+            i += 1  # closing fence (or end of input)
+            cls = f' class="language-{html.escape(lang, quote=True)}"' if lang else ""
+            out.append(f'<pre style="{STYLES["pre"]}"><code{cls}>'
+                       f'{html.escape(chr(10).join(code), quote=False)}</code></pre>')
+            continue
+        if kind == "comment":
+            continue
+        if kind == "hr":
+            flush()
+            out.append(f'<hr style="{STYLES["hr"]}">')
+            continue
+        if kind == "heading":
+            flush()
+            tag = f"h{len(m.group('hashes'))}"
+            text = m.group("heading")
+            if text.endswith("#"):
+                # Closing hashes ("## Title ##") are decoration
+                bare = text.rstrip("#")
+                if not bare or bare[-1] in " \t":
+                    text = bare.rstrip()
+            out.append(f'<{tag} style="{STYLES[tag]}">{render_inline(text)}</{tag}>')
+            continue
+        if kind == "bullet" or kind == "ordered":
+            flush_para()
+            tag = "ul" if kind == "bullet" else "ol"
+            if tag != list_tag:
+                flush_list()
+                list_tag = tag
+            items.append(m.group(kind))
+            continue
+
+        # Indented continuation of the previous list item
+        if items and line[:1] in (" ", "\t"):
+            items[-1] += " " + stripped
+            continue
+
+        # Table: a pipe row followed by a separator row
+        if "|" in stripped and i < n and "|" in lines[i] and TABLE_SEP.match(lines[i].strip()):
+            flush()
+            sep = lines[i].strip()
+            i += 1
+            rows = []
+            while i < n and "|" in lines[i] and lines[i].strip():
+                rows.append(lines[i])
+                i += 1
+            out.append(_table(stripped, sep, rows))
+            continue
+
+        if kind == "quote":
+            flush()
+            quoted = [m.group("quote")]
+            while i < n and (qm := QUOTE.match(lines[i].strip())):
+                quoted.append(qm.group(1))
+                i += 1
+            out.append(f'<blockquote style="{STYLES["blockquote"]}">'
+                       f"{render_body(chr(10).join(quoted))}</blockquote>")
+            continue
+        if kind == "meta":
+            flush()
+            out.append(f'<p style="{STYLES["meta"]}">{render_inline(stripped)}</p>')
+            continue
+        if kind == "footer" and not para:
+            flush_list()
+            out.append(f'<p style="{STYLES["footer"]}"><em>{render_inline(m.group("footer"))}</em></p>')
+            continue
+
+        flush_list()
+        para.append(stripped)
+
+    flush()
+    return "\n".join(out)
+
+
+def markdown_to_html(md: str, title: str | None = None) -> str:
+    """Render a briefing to a complete HTML document (uncached)."""
+    head = f"<title>{html.escape(title, quote=False)}</title>" if title else ""
+    return DOCUMENT.format(title=head, body=render_body(md))
+
+
+# -- cache -------------------------------------------------------------------
+
+def content_hash(md: str, title: str | None = None) -> str:
+    digest = hashlib.sha256(f"{RENDER_VERSION}\0{title or ''}\0".encode("utf-8"))
+    digest.update(md.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def render_cached(md: str, title: str | None = None, cache_dir: Path = CACHE_DIR) -> str:
+    """markdown_to_html(), memoized on disk by content hash."""
+    key = content_hash(md, title)
+    path = cache_dir / key[:2] / f"{key}.html"
+    try:
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        pass
+    rendered = markdown_to_html(md, title)
+    try:
+        _write_atomic(path, rendered)
+    except OSError as e:
+        print(f"  WARN: Could not cache rendered HTML: {e}", file=sys.stderr)
+    return rendered
+
+
+# -- archive -----------------------------------------------------------------
+
+def _render_file(src: str, dest: str, cache_dir: str) -> str:
+    """Worker: render one briefing file. Returns its content hash."""
+    md = Path(src).read_text(encoding="utf-8")
+    title = Path(src).stem
+    _write_atomic(Path(dest), render_cached(md, title, Path(cache_dir)))
+    return content_hash(md, title)
+
+
+def render_archive(archive: Path, out: Path | None = None, workers: int | None = None,
+                   force: bool = False, cache_dir: Path = CACHE_DIR) -> dict[str, int]:
+    """Render every .md under archive to out (default archive/html), mirrored.
+
+    Returns counts: rendered, unchanged, removed, failed.
+    """
+    out = out or archive / "html"
+    manifest_path = out / MANIFEST
+    try:
+        manifest: dict[str, str] = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        manifest = {}
+
+    sources = sorted(p for p in archive.rglob("*.md")
+                     if out not in p.parents and not any(part.startswith(".")
+                                                         for part in p.relative_to(archive).parts))
+    counts = {"rendered": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    todo: list[tuple[str, Path, Path]] = []
+    seen = set()
+    for src in sources:
+        rel = src.relative_to(archive).as_posix()
+        seen.add(rel)
+        dest = out / Path(rel).with_suffix(".html")
+        if not force and dest.exists() and manifest.get(rel) == content_hash(
+                src.read_text(encoding="utf-8"), src.stem):
+            counts["unchanged"] += 1
+            continue
+        todo.append((rel, src, dest))
+
+    for rel in sorted(set(manifest) - seen):
+        (out / Path(rel).with_suffix(".html")).unlink(missing_ok=True)
+        del manifest[rel]
+        counts["removed"] += 1
+
+    def done(rel: str, digest: str | None, error: Exception | None) -> None:
+        if error is not None:
+            print(f"  WARN: Failed to render {rel}: {error}", file=sys.stderr)
+            counts["failed"] += 1
+            return
+        manifest[rel] = digest
+        counts["rendered"] += 1
+
+    if len(todo) < PARALLEL_MIN_FILES or workers == 1:
+        for rel, src, dest in todo:
+            try:
+                done(rel, _render_file(str(src), str(dest), str(cache_dir)), None)
+            except (OSError, UnicodeDecodeError) as e:
+                done(rel, None, e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {rel: pool.submit(_render_file, str(src), str(dest), str(cache_dir))
+                       for rel, src, dest in todo}
+            for rel, future in futures.items():
+                try:
+                    done(rel, future.result(), None)
+                except (OSError, UnicodeDecodeError) as e:
+                    done(rel, None, e)
+
+    out.mkdir(parents=True, exist_ok=True)
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+    return counts
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Render the briefing archive to HTML")
+    parser.add_argument("archive", type=Path, help="Briefing archive (BRIEFING_DIR)")
+    parser.add_argument("--out", type=Path, default=None, help="Output directory (default ARCHIVE/html)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPUs)")
+    parser.add_argument("--force", action="store_true", help="Re-render unchanged briefings")
+    args = parser.parse_args()
+
+    if not args.archive.is_dir():
+        print(f"Archive not found: {args.archive}", file=sys.stderr)
+        sys.exit(1)
+    started = time.monotonic()
+    counts = render_archive(args.archive, args.out, args.workers, args.force)
+    print(f"Rendered {counts['rendered']}, unchanged {counts['unchanged']}, "
+          f"removed {counts['removed']}, failed {counts['failed']} "
+          f"in {time.monotonic() - started:.2f}s", file=sys.stderr)
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
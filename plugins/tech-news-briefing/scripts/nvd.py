@@ -0,0 +1,302 @@
+"""Paginated, rate-limit-aware NVD API 2.0 client with resumable checkpoints.
+
+NVD caps the public API at 5 requests per rolling 30 seconds (50 with an API
+key). A single query returns at most `resultsPerPage` records and reports the
+full size in `totalResults`, so anything past the first page has to be
+requested with `startIndex`.
+
+NVDClient.fetch_range() fetches page 0, reads totalResults, then fetches the
+remaining pages in parallel — every request, including retries, goes through
+a TokenBucket sized to the documented limit and shared by every client in
+the process, so concurrent sources cannot jointly exceed it. Each completed
+page is written to prefetch/nvd-checkpoints/<job>/ so an interrupted run
+picks up at the missing pages instead of starting over; the checkpoint is
+removed once the range completes.
+
+API key: NVD_API_KEY environment variable, or macOS Keychain service
+"tech-news-briefing-nvd" (password = key).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+
+from http_pool import shared_pool
+import resilience
+import telemetry
+from resilience import DeadlineExceeded, SourceUnavailable
+
+NVD_URL = "https://services.nvd.nist.gov/rest/json/cves/2.0"
+CHECKPOINT_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch" / "nvd-checkpoints"
+NVD_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000"
+
+PUBLIC_LIMIT = 5       # requests per window without an API key
+KEYED_LIMIT = 50       # requests per window with an API key
+LIMIT_WINDOW = 30.0    # seconds
+MAX_PAGE_SIZE = 2000   # NVD's resultsPerPage ceiling
+MAX_ATTEMPTS = 4
+CHECKPOINT_MAX_AGE = timedelta(hours=6)
+
+
+def get_nvd_api_key() -> str | None:
+    """Read the NVD API key from the environment or macOS Keychain."""
+    key = os.environ.get("NVD_API_KEY", "").strip()
+    if key:
+        return key
+    try:
+        result = subprocess.run(
+            ["security", "find-generic-password", "-s", "tech-news-briefing-nvd", "-w"],
+            capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+class TokenBucket:
+    """Rolling-window rate limiter: at most `capacity` acquisitions per `window`.
+
+    Each spent token is refilled exactly `window` seconds after it was taken,
+    which matches how NVD counts requests (a rolling 30s window) and never
+    allows the refill-rate burst a classic continuous bucket would.
+    """
+
+    def __init__(self, capacity: int, window: float = LIMIT_WINDOW):
+        self.capacity = capacity
+        self.window = window
+        self._spent: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it.
+
+        Raises DeadlineExceeded instead of waiting past the run-wide deadline.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._spent and now - self._spent[0] >= self.window:
+                    self._spent.popleft()
+                if len(self._spent) < self.capacity:
+                    self._spent.append(now)
+                    return
+                wait = self.window - (now - self._spent[0])
+            resilience.sleep(max(wait, 0.01))
+
+
+_buckets: dict[int, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def shared_bucket(capacity: int) -> TokenBucket:
+    """Process-wide bucket for a given limit (one per API-key state)."""
+    with _buckets_lock:
+        if capacity not in _buckets:
+            _buckets[capacity] = TokenBucket(capacity)
+        return _buckets[capacity]
+
+
+class NVDClient:
+    """Fetch complete NVD result sets within the API rate limit."""
+
+    def __init__(self, api_key: str | None = None, base_url: str = NVD_URL,
+                 page_size: int = MAX_PAGE_SIZE, timeout: float = 60,
+                 checkpoint_dir: Path = CHECKPOINT_DIR):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.page_size = min(page_size, MAX_PAGE_SIZE)
+        self.timeout = timeout
+        self.checkpoint_dir = checkpoint_dir
+        self.bucket = shared_bucket(KEYED_LIMIT if api_key else PUBLIC_LIMIT)
+        self.pool = shared_pool()
+        self.requests = 0
+
+    # -- HTTP --------------------------------------------------------------
+
+    def _get_page(self, params: dict, start_index: int) -> dict:
+        """GET one page, retrying rate-limit and transient errors.
+
+        A param whose value is None is sent as a bare flag (e.g. `hasKev`).
+        """
+        flags = [k for k, v in params.items() if v is None]
+        values = {k: v for k, v in params.items() if v is not None}
+        query = "&".join(flags + [urlencode({**values, "resultsPerPage": self.page_size,
+                                              "startIndex": start_index}, doseq=True)])
+        headers = {"apiKey": self.api_key} if self.api_key else {}
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.bucket.acquire()
+            self.requests += 1
+            try:
+                # retries=0: rate-limit retries must go back through the bucket
+                with self.pool.request("GET", f"{self.base_url}?{query}", headers=headers,
+                                       timeout=self.timeout, retries=0) as resp:
+                    body = resp.content()
+                with telemetry.parsing():
+                    return json.loads(body.decode("utf-8"))
+            except (DeadlineExceeded, SourceUnavailable):
+                raise
+            except HTTPError as e:
+                # NVD signals rate limiting with 403/429; 5xx is transient
+                if e.code not in (403, 429, 500, 502, 503, 504) or attempt == MAX_ATTEMPTS:
+                    raise
+                retry_after = e.headers.get("Retry-After", "") if e.headers else ""
+                delay = float(retry_after) if retry_after.isdigit() else 6.0 * attempt
+            except (URLError, TimeoutError, json.JSONDecodeError):
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                delay = 2.0 * attempt
+            print(f"  NVD page {start_index}: retry {attempt} in {delay:.0f}s", file=sys.stderr)
+            telemetry.add_retry()
+            resilience.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    # -- checkpoints -------------------------------------------------------
+
+    def _load_checkpoint(self, job_dir: Path, params: dict, field: str,
+                         start: datetime) -> dict | None:
+        """Return a resumable checkpoint's meta, or None (discarding stale ones)."""
+        try:
+            meta = json.loads((job_dir / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return None
+        created = datetime.fromisoformat(meta.get("created", "1970-01-01T00:00:00+00:00"))
+        usable = (
+            meta.get("params") == params
+            and meta.get("field") == field
+            and meta.get("page_size") == self.page_size
+            and meta.get("start", "") <= start.strftime(NVD_DATE_FORMAT)
+            and datetime.now(timezone.utc) - created < CHECKPOINT_MAX_AGE
+        )
+        if not usable:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return None
+        return meta
+
+    @staticmethod
+    def _write_json(path: Path, data) -> None:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+
+    # -- public ------------------------------------------------------------
+
+    def fetch_range(self, start: datetime, end: datetime, params: dict | None = None,
+                    field: str = "pub", job: str | None = None) -> list[dict]:
+        """Fetch every CVE whose `field` date (pub or lastMod) is in [start, end].
+
+        Returns the raw NVD `vulnerabilities` items, deduplicated by CVE ID.
+        If a recent checkpoint for `job` exists with the same query, its
+        window is resumed from the missing pages and the gap up to `end` is
+        fetched fresh.
+        """
+        params = dict(params or {})
+        job_dir = self.checkpoint_dir / (job or field)
+        meta = self._load_checkpoint(job_dir, params, field, start) if job_dir.exists() else None
+
+        items: list[dict] = []
+        if meta:
+            print(f"  Resuming NVD checkpoint {job_dir.name} ({meta['start']} → {meta['end']})",
+                  file=sys.stderr)
+            items.extend(self._fetch_window(meta, job_dir))
+            tail_start = datetime.strptime(meta["end"], NVD_DATE_FORMAT).replace(tzinfo=timezone.utc)
+            if tail_start < end:
+                items.extend(self._fetch_window(self._new_meta(tail_start, end, params, field)))
+        else:
+            items.extend(self._fetch_window(self._new_meta(start, end, params, field), job_dir))
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+        return self._dedupe(items)
+
+    def fetch_all(self, params: dict) -> list[dict]:
+        """Fetch every page of a query with no date window (e.g. hasKev)."""
+        meta = {"params": dict(params), "field": None, "page_size": self.page_size}
+        return self._dedupe(self._fetch_window(meta))
+
+    def lookup(self, cve_ids: list[str]) -> list[dict]:
+        """Fetch individual CVEs by ID, in parallel within the rate limit.
+
+        IDs that fail or that NVD does not know are simply absent from the
+        result; failures are logged, not raised.
+        """
+        def one(cve_id: str) -> list[dict]:
+            try:
+                return self._get_page({"cveId": cve_id}, 0).get("vulnerabilities", [])
+            except (URLError, TimeoutError, json.JSONDecodeError) as e:
+                print(f"  WARN: NVD lookup failed for {cve_id}: {e}", file=sys.stderr)
+                return []
+
+        with ThreadPoolExecutor(max_workers=self.bucket.capacity) as pool:
+            futures = [telemetry.submit(pool, one, cve_id) for cve_id in cve_ids]
+            return [item for future in futures for item in future.result()]
+
+    @staticmethod
+    def _dedupe(items: list[dict]) -> list[dict]:
+        seen: dict[str, dict] = {}
+        for item in items:
+            cve_id = item.get("cve", {}).get("id", "")
+            if cve_id:
+                seen[cve_id] = item
+        return list(seen.values())
+
+    def _new_meta(self, start: datetime, end: datetime, params: dict, field: str) -> dict:
+        return {
+            "params": params,
+            "field": field,
+            "start": start.strftime(NVD_DATE_FORMAT),
+            "end": end.strftime(NVD_DATE_FORMAT),
+            "page_size": self.page_size,
+            "created": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def _fetch_window(self, meta: dict, job_dir: Path | None = None) -> list[dict]:
+        """Fetch all pages of one window, checkpointing each page to job_dir."""
+        query = dict(meta["params"])
+        if meta.get("field"):
+            query[f"{meta['field']}StartDate"] = meta["start"]
+            query[f"{meta['field']}EndDate"] = meta["end"]
+
+        pages: dict[int, list] = {}
+        if job_dir is not None:
+            job_dir.mkdir(parents=True, exist_ok=True)
+            for path in job_dir.glob("page-*.json"):
+                try:
+                    pages[int(path.stem[5:])] = json.loads(path.read_text(encoding="utf-8"))
+                except (ValueError, OSError):
+                    continue
+
+        def fetch(index: int) -> dict:
+            data = self._get_page(query, index)
+            pages[index] = data.get("vulnerabilities", [])
+            if job_dir is not None:
+                self._write_json(job_dir / f"page-{index}.json", pages[index])
+            return data
+
+        if "total" not in meta:
+            meta["total"] = fetch(0).get("totalResults", 0)
+            if job_dir is not None:
+                self._write_json(job_dir / "meta.json", meta)
+        total = meta["total"]
+        missing = [i for i in range(0, total, self.page_size) if i not in pages]
+        if missing:
+            print(f"  NVD: {total} results, fetching {len(missing)} more page(s)", file=sys.stderr)
+            with ThreadPoolExecutor(max_workers=self.bucket.capacity) as pool:
+                for future in [telemetry.submit(pool, fetch, i) for i in missing]:
+                    future.result()
+
+        return [item for i in sorted(pages) for item in pages[i]]
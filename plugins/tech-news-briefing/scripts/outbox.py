@@ -0,0 +1,407 @@
+"""On-disk outbox for briefing email, delivered by a small pool of SMTP sessions.
+
+Spool layout (~/.config/tech-news-briefing/outbox/):
+
+  messages/<batch>.eml   one rendered message per briefing, without a To header
+  pending/<id>.json      a delivery: which message, From, recipients, attempts,
+                         next_attempt (epoch seconds), last_error
+  inflight/<id>.json     claimed by a running delivery (an atomic rename, so
+                         two send-email processes never send the same entry)
+  sent/<id>.json         delivered; pruned after RETAIN_DAYS
+  failed/<id>.json       permanently refused (5xx), or still failing GIVE_UP_DAYS
+                         after it was spooled
+
+enqueue() spools a message for a list of recipients: one delivery carrying
+all of them, or one per recipient (its own To header, so subscribers do not
+see each other). Per-recipient is used automatically above GROUP_MAX.
+
+deliver() sends everything that is due on `workers` threads. Each worker
+opens one SMTP session (STARTTLS + login once) and reuses it for every
+message it sends; a session the server has dropped is reopened and the
+message resent once without counting as an attempt. Transient failures
+(4xx replies, connection errors, timeouts) go back to pending/ with an
+exponential backoff (BASE_DELAY * 2**attempts, capped at MAX_DELAY, with
+jitter). Deliveries that come due again before `max_time` runs out are
+retried in the same run, up to RUN_ATTEMPTS sends each; the rest wait for
+the next `send-email.py --flush`. Giving up depends on a delivery's age,
+not its attempt count, so an outage of any length within GIVE_UP_DAYS is
+ridden out. Nothing is deleted before the server has accepted it, so a
+failed send keeps the day's briefing in the spool.
+
+An inflight entry older than INFLIGHT_STALE (its process died mid-send) is
+returned to pending/ by the next delivery.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import random
+import smtplib
+import socket
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.message import Message
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import formataddr, parseaddr
+from pathlib import Path
+from typing import Callable
+
+OUTBOX_DIR = Path.home() / ".config" / "tech-news-briefing" / "outbox"
+
+DEFAULT_WORKERS = 4        # concurrent SMTP sessions (Gmail tolerates a handful)
+DEFAULT_MAX_TIME = 300.0   # seconds one deliver() call may spend
+GROUP_MAX = 10             # above this many recipients, send one message each
+RUN_ATTEMPTS = 4           # sends one deliver() call makes per delivery
+GIVE_UP_DAYS = 2           # transient failures become permanent after this long
+BASE_DELAY = 2.0           # seconds before the first retry
+MAX_DELAY = 900.0
+INFLIGHT_STALE = 900       # seconds before an orphaned inflight entry is reclaimed
+RETAIN_DAYS = 14           # sent/ and failed/ entries kept this long
+
+# Anything else smtplib or the socket raises: dropped connections, timeouts
+TRANSIENT_ERRORS = (smtplib.SMTPException, socket.timeout, OSError)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def backoff(attempts: int) -> float:
+    """Delay before retry number `attempts` (1-based), with +/-20% jitter."""
+    delay = min(BASE_DELAY * 2 ** (attempts - 1), MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+@dataclass
+class DeliveryReport:
+    sent: int = 0
+    retrying: int = 0
+    failed: int = 0
+    sessions: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def merge(self, other: DeliveryReport) -> None:
+        self.sent += other.sent
+        self.retrying += other.retrying
+        self.failed += other.failed
+        self.sessions += other.sessions
+        self.errors.extend(other.errors)
+
+
+class Outbox:
+    """A directory-backed queue of outgoing messages."""
+
+    def __init__(self, root: Path = OUTBOX_DIR):
+        self.root = root
+        self.dirs = {name: root / name
+                     for name in ("messages", "pending", "inflight", "sent", "failed")}
+        for path in self.dirs.values():
+            path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    # -- spooling ------------------------------------------------------------
+
+    def enqueue(self, msg: Message, from_addr: str, recipients: list[str],
+                per_recipient: bool | None = None) -> list[str]:
+        """Spool `msg` for `recipients`; return the delivery IDs.
+
+        Any To header on msg is replaced: per-recipient deliveries get their
+        own address, a group delivery gets the whole list.
+        """
+        if not recipients:
+            raise ValueError("no recipients")
+        if per_recipient is None:
+            per_recipient = len(recipients) > GROUP_MAX
+        del msg["To"]
+        batch = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        body = self.dirs["messages"] / f"{batch}.eml"
+        tmp = body.with_suffix(".tmp")
+        tmp.write_bytes(msg.as_bytes(policy=SMTP_POLICY))
+        os.replace(tmp, body)
+
+        groups = [[addr] for addr in recipients] if per_recipient else [recipients]
+        ids = []
+        for n, group in enumerate(groups):
+            entry_id = f"{batch}-{n:04d}"
+            _write_json(self.dirs["pending"] / f"{entry_id}.json", {
+                "id": entry_id,
+                "message": body.name,
+                "from": from_addr,
+                "to": group,
+                "subject": str(msg.get("Subject", "")),
+                "created": _now(),
+                "attempts": 0,
+                "next_attempt": 0,
+                "last_error": None,
+            })
+            ids.append(entry_id)
+        return ids
+
+    def counts(self) -> dict[str, int]:
+        return {name: sum(1 for _ in self.dirs[name].glob("*.json"))
+                for name in ("pending", "inflight", "sent", "failed")}
+
+    def states(self, ids: list[str]) -> dict[str, int]:
+        """How many of the given deliveries are in each state."""
+        found = {name: 0 for name in ("pending", "inflight", "sent", "failed")}
+        for entry_id in ids:
+            for name in found:
+                if any(self.dirs[name].glob(f"{entry_id}*.json")):
+                    found[name] += 1
+                    break
+        return found
+
+    # -- claiming ------------------------------------------------------------
+
+    def _reclaim_stale(self) -> None:
+        cutoff = time.time() - INFLIGHT_STALE
+        for path in self.dirs["inflight"].glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    os.replace(path, self.dirs["pending"] / path.name)
+            except OSError:
+                continue
+
+    def _claim_due(self, skip: set[str] | None = None) -> tuple[list[dict], float | None]:
+        """Move due pending entries, except those in `skip`, to inflight/.
+
+        Returns (claimed entries, epoch time the next not-yet-due one is due).
+        """
+        claimed, next_due = [], None
+        now = time.time()
+        for path in sorted(self.dirs["pending"].glob("*.json")):
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                continue
+            if skip and entry.get("id") in skip:
+                continue
+            if entry.get("next_attempt", 0) > now:
+                next_due = min(next_due or entry["next_attempt"], entry["next_attempt"])
+                continue
+            claim = self.dirs["inflight"] / path.name
+            try:
+                os.replace(path, claim)
+                os.utime(claim)     # the stale-claim clock starts now
+            except FileNotFoundError:
+                continue    # another process claimed it first
+            claimed.append(entry)
+        return claimed, next_due
+
+    def _settle(self, entry: dict, state: str) -> None:
+        """Write entry to pending/, sent/ or failed/ and drop its inflight copy."""
+        name = f"{entry['id']}.json"
+        _write_json(self.dirs[state] / name, entry)
+        (self.dirs["inflight"] / name).unlink(missing_ok=True)
+
+    def _body(self, entry: dict, cache: dict[str, bytes]) -> bytes:
+        name = entry["message"]
+        with self._lock:
+            if name not in cache:
+                cache[name] = (self.dirs["messages"] / name).read_bytes()
+            return cache[name]
+
+    # -- delivery ------------------------------------------------------------
+
+    def deliver(self, connect: Callable[[], smtplib.SMTP], workers: int = DEFAULT_WORKERS,
+                max_time: float = DEFAULT_MAX_TIME) -> DeliveryReport:
+        """Send every due delivery within max_time.
+
+        `connect` returns a logged-in SMTP session; it is called once per
+        worker and again only when a session has to be reopened. A delivery
+        is sent at most RUN_ATTEMPTS times per call; deliveries still queued
+        when max_time runs out go back to pending/ untouched. Raises
+        smtplib.SMTPAuthenticationError if login is refused; the affected
+        deliveries stay pending without using up an attempt.
+        """
+        deadline = time.monotonic() + max_time
+        self._reclaim_stale()
+        work: queue.Queue[dict | None] = queue.Queue()
+        report = DeliveryReport()
+        bodies: dict[str, bytes] = {}
+        abort: list[Exception] = []
+        sends: dict[str, int] = {}
+
+        def worker() -> None:
+            mine = DeliveryReport()
+            session: smtplib.SMTP | None = None
+            while (entry := work.get()) is not None:
+                try:
+                    if abort or time.monotonic() > deadline:
+                        self._settle(entry, "pending")
+                        continue
+                    with self._lock:
+                        sends[entry["id"]] = sends.get(entry["id"], 0) + 1
+                    session = self._send_one(entry, session, connect, bodies, mine)
+                except smtplib.SMTPAuthenticationError as e:
+                    abort.append(e)
+                    self._settle(entry, "pending")
+                    session = None
+                finally:
+                    work.task_done()
+            if session is not None:
+                try:
+                    session.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+            with self._lock:
+                report.merge(mine)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+        try:
+            while not abort and time.monotonic() < deadline:
+                with self._lock:
+                    spent = {entry_id for entry_id, n in sends.items() if n >= RUN_ATTEMPTS}
+                claimed, next_due = self._claim_due(spent)
+                for entry in claimed:
+                    work.put(entry)
+                work.join()
+                if claimed:
+                    continue
+                if next_due is None:
+                    break
+                wait = next_due - time.time()
+                if time.monotonic() + wait > deadline:
+                    break
+                time.sleep(max(wait, 0.05))
+        finally:
+            for _ in threads:
+                work.put(None)
+            for thread in threads:
+                thread.join()
+
+        if abort:
+            raise abort[0]
+        report.retrying = self.counts()["pending"]
+        self.prune()
+        return report
+
+    def _send_one(self, entry: dict, session: smtplib.SMTP | None,
+                  connect: Callable[[], smtplib.SMTP], bodies: dict[str, bytes],
+                  report: DeliveryReport) -> smtplib.SMTP | None:
+        """Send one delivery on `session`, returning the session to keep using."""
+        data = self._header("To", entry["to"]) + self._body(entry, bodies)
+        reused = session is not None
+        try:
+            if session is None:
+                session = connect()
+                report.sessions += 1
+            try:
+                refused = session.sendmail(entry["from"], entry["to"], data)
+            except smtplib.SMTPServerDisconnected:
+                if not reused:
+                    raise
+                # An idle session the server closed: reopen once, free of charge
+                session = connect()
+                report.sessions += 1
+                refused = session.sendmail(entry["from"], entry["to"], data)
+        except smtplib.SMTPAuthenticationError:
+            raise
+        except (smtplib.SMTPConnectError, smtplib.SMTPHeloError) as e:
+            self._fail(entry, f"{e.smtp_code} {e.smtp_error!r}", False, report)
+            return self._drop(session)
+        except smtplib.SMTPRecipientsRefused as e:
+            refused = e.recipients
+        except smtplib.SMTPResponseException as e:
+            self._fail(entry, f"{e.smtp_code} {e.smtp_error!r}", e.smtp_code >= 500, report)
+            if isinstance(e, smtplib.SMTPSenderRefused) or e.smtp_code == 421:
+                return self._drop(session)
+            return session
+        except TRANSIENT_ERRORS as e:
+            self._fail(entry, f"{type(e).__name__}: {e}", False, report)
+            return self._drop(session)
+
+        if not refused:
+            entry["sent_at"] = _now()
+            self._settle(entry, "sent")
+            report.sent += 1
+            return session
+        # Some recipients refused: keep retrying only the temporarily refused ones
+        permanent = [addr for addr, (code, _) in refused.items() if code >= 500]
+        temporary = [addr for addr, (code, _) in refused.items() if code < 500]
+        reason = "; ".join(f"{addr}: {code}" for addr, (code, _) in refused.items())
+        accepted = [addr for addr in entry["to"] if addr not in refused]
+        if permanent:
+            report.failed += 1
+            report.errors.append(f"{', '.join(permanent)} refused ({reason})")
+            failed = {**entry, "id": f"{entry['id']}-refused", "to": permanent,
+                      "last_error": reason, "failed_at": _now()}
+            _write_json(self.dirs["failed"] / f"{failed['id']}.json", failed)
+        if accepted:
+            report.sent += 1
+            _write_json(self.dirs["sent"] / f"{entry['id']}-sent.json",
+                        {**entry, "to": accepted, "sent_at": _now()})
+        if temporary:
+            self._fail({**entry, "to": temporary}, reason, False, report)
+        else:
+            (self.dirs["inflight"] / f"{entry['id']}.json").unlink(missing_ok=True)
+        return session
+
+    @staticmethod
+    def _header(name: str, addresses: list[str]) -> bytes:
+        value = ", ".join(formataddr(parseaddr(addr)) for addr in addresses)
+        return f"{name}: {value}\r\n".encode("utf-8")
+
+    @staticmethod
+    def _drop(session: smtplib.SMTP | None) -> None:
+        if session is not None:
+            try:
+                session.close()
+            except OSError:
+                pass
+        return None
+
+    def _fail(self, entry: dict, reason: str, permanent: bool, report: DeliveryReport) -> None:
+        entry["attempts"] = entry.get("attempts", 0) + 1
+        entry["last_error"] = reason[:300]
+        to = ", ".join(entry["to"])
+        age = time.time() - datetime.fromisoformat(entry["created"]).timestamp()
+        if permanent or age >= GIVE_UP_DAYS * 86400:
+            entry["failed_at"] = _now()
+            self._settle(entry, "failed")
+            report.failed += 1
+            report.errors.append(f"{to}: {reason}")
+            print(f"  WARN: giving up on {to} after {entry['attempts']} attempt(s) "
+                  f"over {age / 3600:.0f}h: {reason}", file=sys.stderr)
+            return
+        delay = backoff(entry["attempts"])
+        entry["next_attempt"] = time.time() + delay
+        self._settle(entry, "pending")
+        print(f"  {to}: {reason}; retry {entry['attempts']} in {delay:.0f}s", file=sys.stderr)
+
+    # -- housekeeping --------------------------------------------------------
+
+    def prune(self, retain_days: int = RETAIN_DAYS) -> None:
+        """Drop old sent/failed entries and message bodies nothing refers to."""
+        cutoff = time.time() - retain_days * 86400
+        for state in ("sent", "failed"):
+            for path in self.dirs[state].glob("*.json"):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                except OSError:
+                    continue
+        live = set()
+        for state in ("pending", "inflight", "sent", "failed"):
+            for path in self.dirs[state].glob("*.json"):
+                try:
+                    live.add(json.loads(path.read_text(encoding="utf-8"))["message"])
+                except (OSError, json.JSONDecodeError, KeyError):
+                    continue
+        for path in self.dirs["messages"].glob("*.eml"):
+            if path.name not in live and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
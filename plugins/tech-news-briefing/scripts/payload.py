@@ -0,0 +1,329 @@
+"""Compact pre-fetch payloads: fewer input tokens for the briefing run.
+
+The research and podcasts skills have the model read osint-*.json,
+news-*.json and podcasts-*.json in full, so every repeated key, duplicated
+value and long description is paid for in input tokens on every run. In
+compact format (the default) each section of the payload becomes a table:
+
+  {"cols": ["cve_id", "vendor", ...], "rows": [[...], ...],
+   "same": {"source": "CISA KEV"},          # columns equal in every row
+   "more": {"count": 12, "ids": [...]}}     # ranked below the top N
+
+  - Columns that are empty in every row, or that the briefing never uses
+    (Spotify IDs, Apple IDs), are dropped; columns with one value across
+    all rows move to "same".
+  - Descriptions and summaries are cut to about `description_tokens`
+    tokens (by the estimate in prompt_compiler.py), article extracts
+    (extract.py) to `extract_tokens`.
+  - Rows are ranked by a deterministic pre-score (the "score" column): KEV
+    by CVSS, known ransomware use, new vs. updated and recency; NVD by
+    CVSS, KEV listing, ransomware and recency; feeds and episodes by
+    recency; news stories by recency, points, comments and pickup by other
+    sources; the Apple chart by position. Records already reported or seen
+    (story_index.py) are ranked down. Ties break on the record key.
+  - Only the top N rows per section are inline. The rest are listed by key
+    under "more" and kept in full, together with the complete fetch_stats,
+    in the <name>.full.json file next to the payload ("full").
+  - fetch_stats keeps only sources with errors or stale data.
+
+format "json" writes the previous indent=2 document instead, for debugging.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from prompt_compiler import estimate_tokens
+
+FORMAT_VERSION = "compact/1"
+FORMATS = ("compact", "json")
+DESCRIPTION_TOKENS = 60
+EXTRACT_TOKENS = 150
+REPEAT_PENALTY = {"reported_on": 40, "seen_on": 10}   # see story_index.py
+TRIM_FIELDS = ("description", "summary")
+WHITESPACE = re.compile(r"\s+")
+
+
+# -- scoring -------------------------------------------------------------------
+
+def _parse_time(value: Any) -> datetime | None:
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def recency(value: Any, now: datetime, half_life_days: float) -> float:
+    """1.0 for `now`, halving every half_life_days; 0.0 if undated."""
+    when = _parse_time(value)
+    if when is None:
+        return 0.0
+    age = max((now - when).total_seconds() / 86400, 0.0)
+    return 0.5 ** (age / half_life_days)
+
+
+def score_kev(record: dict, now: datetime) -> float:
+    return ((record.get("cvss_score") or 0) * 4
+            + (30 if record.get("known_ransomware") == "Known" else 0)
+            + {"new": 10, "updated": 4}.get(record.get("change"), 0)
+            + 20 * recency(record.get("date_added"), now, 3))
+
+
+def score_nvd(record: dict, now: datetime) -> float:
+    return ((record.get("cvss_score") or 0) * 5
+            + (25 if record.get("in_kev") else 0)
+            + (15 if record.get("known_ransomware") == "Known" else 0)
+            + 10 * recency(record.get("published"), now, 2))
+
+
+def by_recency(field: str, half_life_days: float = 2) -> Callable[[dict, datetime], float]:
+    return lambda record, now: 100 * recency(record.get(field), now, half_life_days)
+
+
+def score_story(record: dict, now: datetime) -> float:
+    """News stories: recency, then HN/Reddit/GitHub popularity and other sources' pickup."""
+    return (60 * recency(record.get("date"), now, 1)
+            + 10 * math.log10(1 + (record.get("points") or 0))
+            + 5 * math.log10(1 + (record.get("comments") or 0))
+            + 10 * len(record.get("also") or ()))
+
+
+def by_position(record: dict, now: datetime) -> float:
+    return -(record.get("position") or 1000)
+
+
+@dataclass(frozen=True)
+class Section:
+    """How one payload section is ranked and cut."""
+    score: Callable[[dict, datetime], float]
+    key: str                 # record field listed under "more"
+    top_n: int
+    show_score: bool = True
+    drop: tuple[str, ...] = ()   # fields the briefing never uses (kept in .full.json)
+
+
+OSINT_SECTIONS = {
+    "cisa_kev": Section(score_kev, "cve_id", 20),
+    "nvd_cves": Section(score_nvd, "cve_id", 20),
+    "rss_feeds": Section(by_recency("pub_date"), "url", 5),
+}
+
+NEWS_SECTIONS = {
+    "ai_news": Section(score_story, "url", 8, drop=("category",)),
+    "breakthroughs": Section(score_story, "url", 8, drop=("category",)),
+}
+
+PODCAST_SECTIONS = {
+    "spotify_episodes": Section(by_recency("release_date", 3), "url", 60,
+                                drop=("show_id", "id")),
+    "apple_charts": Section(by_position, "url", 25, show_score=False, drop=("apple_id",)),
+}
+
+
+# -- compaction ----------------------------------------------------------------
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """Collapse whitespace and cut to about max_tokens, ending with an ellipsis."""
+    text = WHITESPACE.sub(" ", text).strip()
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for word in text.split(" "):
+        used += estimate_tokens(word)
+        if used > max_tokens - 1:
+            break
+        kept.append(word)
+    return " ".join(kept).rstrip(",.;:") + "…"
+
+
+def _empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def columnar(records: list[dict]) -> dict:
+    """Records -> {"cols", "rows", "same"}, dropping empty and constant columns."""
+    cols: list[str] = []
+    for record in records:
+        cols.extend(k for k in record if k not in cols)
+    cols = [c for c in cols if not all(_empty(r.get(c)) for r in records)]
+    same = {}
+    if len(records) > 1:
+        for c in cols:
+            first = records[0].get(c)
+            if all(r.get(c) == first for r in records[1:]):
+                same[c] = first
+    cols = [c for c in cols if c not in same]
+    table = {"cols": cols, "rows": [[r.get(c) for c in cols] for r in records]}
+    if same:
+        table["same"] = same
+    return table
+
+
+def repeat_penalty(record: dict) -> float:
+    """Rank items an earlier briefing or pre-fetch already had below fresh ones."""
+    return sum(points for field, points in REPEAT_PENALTY.items() if record.get(field))
+
+
+def ranked(records: list[dict], section: Section, now: datetime) -> list[tuple[float, dict]]:
+    """(score, record) pairs, highest first; ties break on the record key."""
+    return sorted(((section.score(r, now) - repeat_penalty(r), r) for r in records),
+                  key=lambda pair: (-pair[0], str(pair[1].get(section.key, ""))))
+
+
+def compact_section(records: list[dict], section: Section, now: datetime,
+                    top_n: int | None = None,
+                    description_tokens: int = DESCRIPTION_TOKENS,
+                    extract_tokens: int = EXTRACT_TOKENS) -> dict:
+    """Rank, cut and tabulate one list of records."""
+    top_n = section.top_n if top_n is None else top_n
+    order = ranked(records, section, now)
+    inline = []
+    for score, record in order[:top_n]:
+        row = {k: v for k, v in record.items() if k not in section.drop}
+        for name in TRIM_FIELDS:
+            if isinstance(row.get(name), str):
+                row[name] = trim_text(row[name], description_tokens)
+        if isinstance(row.get("extract"), str):
+            row["extract"] = trim_text(row["extract"], extract_tokens)
+        if section.show_score:
+            row["score"] = round(score)
+        inline.append(row)
+    table = columnar(inline)
+    rest = order[top_n:]
+    if rest:
+        table["more"] = {"count": len(rest),
+                         "ids": [r.get(section.key) for _, r in rest if r.get(section.key)]}
+    return table
+
+
+def rows(table: dict) -> list[dict]:
+    """A compact table back as records (inline rows only, "same" merged in)."""
+    same = table.get("same", {})
+    return [{**same, **dict(zip(table.get("cols", []), row))} for row in table.get("rows", [])]
+
+
+def expand(doc: dict) -> dict:
+    """Read a payload in either format back into {section: records}.
+
+    Compact tables give their inline rows; IDs ranked under "more" come
+    back as {"<key>": id} stubs, keyed by the section's record key.
+    """
+    if doc.get("format") != FORMAT_VERSION:
+        return doc
+    sections = {**OSINT_SECTIONS, **NEWS_SECTIONS, **PODCAST_SECTIONS}
+
+    def one(key: str, table: dict) -> list[dict]:
+        records = rows(table)
+        more = table.get("more", {})
+        if key in sections:
+            records += [{sections[key].key: i} for i in more.get("ids", [])]
+        return records
+
+    out = {}
+    for key, value in doc.items():
+        if isinstance(value, dict) and "cols" in value:
+            out[key] = one(key, value)
+        elif key in sections and isinstance(value, dict):
+            out[key] = {name: one(key, table) for name, table in value.items()}
+        else:
+            out[key] = value
+    return out
+
+
+def fetch_issues(fetch_stats: dict) -> dict:
+    """Only the sources a reader needs to know about: stale or erroring ones."""
+    issues = {}
+    for source_id, stats in (fetch_stats or {}).items():
+        if not isinstance(stats, dict):
+            continue
+        picked = {k: stats[k] for k in ("stale_as_of", "stale_reason", "breaker")
+                  if stats.get(k)}
+        if stats.get("errors"):
+            picked["errors"] = stats["errors"]
+        if picked:
+            issues[source_id] = picked
+    return issues
+
+
+def compact(result: dict, sections: dict[str, Section], settings: dict | None = None,
+            full_name: str | None = None) -> dict:
+    """Build the compact document for a pre-fetch result."""
+    settings = settings or {}
+    top_n = settings.get("top_n", {})
+    description_tokens = int(settings.get("description_tokens", DESCRIPTION_TOKENS))
+    extract_tokens = int(settings.get("extract_tokens", EXTRACT_TOKENS))
+    now = _parse_time(result.get("fetched_at")) or datetime.now(timezone.utc)
+
+    doc: dict[str, Any] = {"format": FORMAT_VERSION}
+    for key, value in result.items():
+        section = sections.get(key)
+        if key == "fetch_stats":
+            doc[key] = fetch_issues(value)
+        elif section is None:
+            doc[key] = value
+        elif isinstance(value, dict):
+            doc[key] = {name: compact_section(items, section, now, top_n.get(key),
+                                              description_tokens, extract_tokens)
+                        for name, items in value.items()}
+        else:
+            doc[key] = compact_section(value or [], section, now, top_n.get(key),
+                                       description_tokens, extract_tokens)
+    if full_name:
+        doc["full"] = full_name
+    return doc
+
+
+# -- writing -------------------------------------------------------------------
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON with one table row or record per line.
+
+    Keeps lines short enough for tools that truncate long lines, at a
+    newline per row rather than indentation on every key.
+    """
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        return "{\n" + ",\n".join(f"{json.dumps(k, ensure_ascii=False)}:{dumps(v)}"
+                                   for k, v in value.items()) + "\n}"
+    if isinstance(value, list) and any(isinstance(v, (dict, list)) for v in value):
+        return "[\n" + ",\n".join(_flat(v) for v in value) + "\n]"
+    return _flat(value)
+
+
+def _flat(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def full_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.full.json")
+
+
+def write_payload(result: dict, path: Path, sections: dict[str, Section],
+                  fmt: str = "compact", settings: dict | None = None) -> Path:
+    """Write `result` to path in `fmt`; compact also writes the .full.json sidecar."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown payload format {fmt!r} (use {', '.join(FORMATS)})")
+    if fmt == "json":
+        _write_atomic(path, json.dumps(result, indent=2, ensure_ascii=False))
+        return path
+    full = full_path(path)
+    _write_atomic(full, dumps(result))
+    _write_atomic(path, dumps(compact(result, sections, settings, full.name)))
+    return path
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Single entry point for the pre-fetch phase — zero LLM tokens.
+
+Runs every collector a cadence needs in one process, concurrently on one
+asyncio event loop, instead of one python3 start-up per script:
+
+  daily   — OSINT (fetch-osint.py) + AI/breakthrough news (fetch-news.py)
+  weekly  — OSINT + podcasts (fetch-podcasts.py)
+  monthly — nothing (the monthly retrospective reads past briefings)
+
+Collector scripts are imported lazily, so a cadence only pays for the
+modules it uses. Their blocking HTTP work runs in worker threads; both
+share one process-wide HTTP cache (http_cache.shared_cache) and keep-alive
+connection pool (http_pool.shared_pool), saved and reported once at the
+end. A collector that fails is logged and does not stop the others.
+
+All collectors share one deadline (--budget; by default the longest
+deadline.budget_seconds in the cadence's source registries): requests time
+out when it passes and sources that miss it are served from their last
+good data, marked stale (see resilience.py), so the briefing starts on time.
+
+When the polling daemon (prefetch_daemon.py) is running, nothing is
+fetched: every collector writes its file from the data the daemon keeps
+current (--warm in the collector scripts), so the briefing starts without
+waiting on the network. --fetch fetches anyway.
+
+Output files use the compact payload format (payload.py); --format json
+writes indented JSON instead, for debugging.
+
+Usage: python3 prefetch.py [--cadence daily|weekly|monthly] [--date YYYY-MM-DD] [--days 7]
+                           [--budget SECONDS] [--format compact|json] [--fetch]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+CONFIG_DIR = SCRIPTS_DIR.parent / "config"
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+
+# cadence -> collectors to run
+CADENCES = {
+    "daily": ("osint", "news"),
+    "weekly": ("osint", "podcasts"),
+    "monthly": (),
+}
+
+# collector -> its source registry (podcasts has none)
+REGISTRIES = {
+    "osint": CONFIG_DIR / "osint-sources.json",
+    "news": CONFIG_DIR / "news-sources.json",
+}
+
+
+def load_script(name: str):
+    """Import a hyphenated script (e.g. fetch-osint.py) as a module."""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    module_name = name.replace("-", "_")
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def collect_osint(target_date: str, days: int, fmt: str | None, warm: bool) -> Path:
+    return load_script("fetch-osint").run(target_date, report=False, fmt=fmt, warm=warm)
+
+
+def collect_news(target_date: str, days: int, fmt: str | None, warm: bool) -> Path:
+    return load_script("fetch-news").run(target_date, report=False, fmt=fmt, warm=warm)
+
+
+def collect_podcasts(target_date: str, days: int, fmt: str | None, warm: bool) -> Path:
+    return load_script("fetch-podcasts").run(target_date, days, report=False,
+                                             fmt=fmt or "compact", warm=warm)
+
+
+COLLECTORS = {
+    "osint": collect_osint,
+    "news": collect_news,
+    "podcasts": collect_podcasts,
+}
+
+
+def registry_deadline(names: tuple[str, ...]) -> tuple[float, float | None]:
+    """(budget, hedge_after) for the collectors' shared deadline, from their registries.
+
+    The longest budget_seconds and shortest hedge_after any of them sets,
+    so no collector gets less than its own registry asks for; resilience.py
+    defaults when none does.
+    """
+    from fetch_engine import load_registry
+    import resilience
+    deadlines = [load_registry(REGISTRIES[n]).settings.get("deadline", {})
+                 for n in names if n in REGISTRIES]
+    budgets = [float(d["budget_seconds"]) for d in deadlines if "budget_seconds" in d]
+    hedges = [float(d["hedge_after"]) for d in deadlines if "hedge_after" in d]
+    return (max(budgets, default=resilience.DEFAULT_BUDGET),
+            min(hedges, default=resilience.HEDGE_AFTER))
+
+
+async def run_collectors(names: tuple[str, ...], target_date: str, days: int,
+                         fmt: str | None = None, warm: bool = False) -> dict[str, Path | None]:
+    """Run the named collectors concurrently; a failed collector maps to None."""
+    async def timed(name: str) -> Path:
+        started = time.monotonic()
+        path = await asyncio.to_thread(COLLECTORS[name], target_date, days, fmt, warm)
+        print(f"  {name}: done in {time.monotonic() - started:.1f}s", file=sys.stderr)
+        return path
+
+    outcomes = await asyncio.gather(*(timed(n) for n in names), return_exceptions=True)
+    results: dict[str, Path | None] = {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"  WARN: {name} pre-fetch failed: {outcome}", file=sys.stderr)
+            results[name] = None
+        else:
+            results[name] = outcome
+    return results
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run all pre-fetch collectors for a cadence")
+    parser.add_argument("--cadence", choices=sorted(CADENCES), default="daily")
+    parser.add_argument("--date", help="Target date (YYYY-MM-DD)", default=None)
+    parser.add_argument("--days", help="Podcast look-back in days", type=int, default=7)
+    parser.add_argument("--budget", help="Deadline for the whole phase in seconds "
+                        "(default from the registries)", type=float, default=None)
+    parser.add_argument("--format", help="Output format (json = indented, for debugging)",
+                        choices=("compact", "json"), default=None)
+    parser.add_argument("--fetch", action="store_true",
+                        help="Fetch even if the polling daemon is running")
+    args = parser.parse_args()
+
+    target_date = args.date or datetime.now().strftime("%Y-%m-%d")
+    names = CADENCES[args.cadence]
+    if not names:
+        print(f"No pre-fetch collectors for {args.cadence} cadence", file=sys.stderr)
+        return
+
+    print(f"Pre-fetch ({args.cadence}): {', '.join(names)}", file=sys.stderr)
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    import daemon_state
+    import resilience
+    warm = not args.fetch and daemon_state.running() is not None
+    if warm:
+        print("Polling daemon is running; writing from its data", file=sys.stderr)
+    else:
+        budget, hedge_after = registry_deadline(names)
+        if args.budget is not None:
+            budget = args.budget
+        resilience.start(budget, hedge_after)
+    started = time.monotonic()
+    results = asyncio.run(run_collectors(names, target_date, args.days, args.format, warm))
+
+    from http_cache import shared_cache
+    from http_pool import shared_pool
+    cache = shared_cache(PREFETCH_DIR / "http-cache")
+    cache.save()
+    cache.report()
+    shared_pool().report()
+    print(f"Pre-fetch finished in {time.monotonic() - started:.1f}s", file=sys.stderr)
+
+    if not any(results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""Always-warm pre-fetch: poll every source between scheduled briefings.
+
+The scheduled pre-fetch samples each source once, right before the
+briefing, so the run waits on the network and fast-moving KEV/NVD entries
+are seen once a day. This daemon keeps polling instead, each source on its
+own interval, through the same handlers and resilience.Guard as the
+collectors (fetch-osint.py, fetch-news.py, fetch-podcasts.py), into the
+stores they already keep:
+
+  - KEV, NVD and NVD enrichment   prefetch/vulns.db (vuln_store.py)
+  - Spotify                       prefetch/spotify-shows.json (spotify.py)
+  - feeds, news APIs, Apple       prefetch/last-good/<source>.json
+
+Intervals come from each registry entry's `poll_seconds` (fetch-podcasts.py
+POLL_SECONDS for Spotify and Apple) and adapt:
+
+  - changed     back to the base interval
+  - unchanged   stretched by STRETCH per poll, up to MAX_STRETCH x base
+  - failed      retried after RETRY_DELAY, doubling per failure up to the
+                base interval, with the daemon's breaker cooldown (much
+                shorter than a scheduled run's) taking over for outages
+
+Every delay gets +/-10% jitter. One request at a time per host.
+
+prefetch.py detects a running daemon and writes the day's files from these
+stores without any requests (the collectors' warm mode; see
+fetch_engine.serve_warm). A source whose last success is older than
+WARM_STALE_POLLS of its intervals is served marked stale, as after a failed
+fetch. Each output file is replaced atomically.
+
+State (prefetch/daemon/state.json): pid, heartbeat and each source's
+schedule, so a restart resumes where it left off. One daemon per HOME
+(prefetch/daemon/daemon.lock). Restart it to pick up registry changes.
+
+Usage:
+    python3 prefetch_daemon.py run [--days 7] [--once]
+    python3 prefetch_daemon.py snapshot [--cadence daily|weekly] [--date YYYY-MM-DD]
+                                        [--days 7] [--format compact|json]
+    python3 prefetch_daemon.py status
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from daemon_state import DAEMON_DIR, LOCK_PATH, STATE_PATH, read_state, running
+from fetch_engine import load_registry
+from http_cache import shared_cache
+from prefetch import CADENCES, load_script, run_collectors
+from resilience import Guard
+import telemetry
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+
+DEFAULT_WORKERS = 8
+STRETCH = 1.5              # interval growth per unchanged poll
+MAX_STRETCH = 3            # ... up to this multiple of the base interval
+RETRY_DELAY = 60.0         # seconds before the first retry of a failed poll
+BREAKER_COOLDOWN = timedelta(minutes=10)
+HEARTBEAT = 30.0           # seconds between state writes while idle
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _jitter(seconds: float) -> float:
+    return seconds * random.uniform(0.9, 1.1)
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class Job:
+    """One source the daemon polls, with its schedule."""
+
+    id: str
+    collector: str                  # osint | news | podcasts
+    host: str
+    poll: float                     # base interval, seconds
+    fetch: Callable[[], Any] = field(repr=False, default=lambda: None)
+    last_good: bool = True
+    # -- schedule (persisted) --
+    interval: float = 0.0
+    next_due: float = 0.0           # epoch seconds
+    failures: int = 0
+    digest: str | None = None
+    status: str = "new"             # new | changed | unchanged | failed
+    items: int | None = None
+    error: str | None = None
+    last_poll: str | None = None
+    last_ok: str | None = None
+
+    SCHEDULE = ("interval", "next_due", "failures", "digest", "status", "items", "error",
+                "last_poll", "last_ok")
+
+    def schedule(self) -> dict:
+        return {k: getattr(self, k) for k in self.SCHEDULE}
+
+
+def build_jobs(days: int = 7) -> list[Job]:
+    """One job per registry source, plus NVD enrichment, Spotify and Apple Charts."""
+    osint = load_script("fetch-osint")
+    news = load_script("fetch-news")
+    podcasts = load_script("fetch-podcasts")
+    jobs: list[Job] = []
+
+    def registry_jobs(collector: str, module, handlers: Callable[[], dict]) -> Any:
+        registry = load_registry(module.REGISTRY_PATH)
+        types = handlers()
+        for src in registry.sources:
+            if src.type not in types:
+                print(f"  WARN: No handler for source type '{src.type}' ({src.id})",
+                      file=sys.stderr)
+                continue
+            jobs.append(Job(src.id, collector, src.host, src.poll_seconds,
+                            lambda src=src: handlers()[src.type](src),
+                            bool(src.options.get("last_good", True))))
+        return registry
+
+    registry = registry_jobs("osint", osint,
+                             lambda: osint.source_handlers(_now() - osint.WINDOW))
+    enrichment = registry.settings.get("enrichment", {})
+    nvd = next((s for s in registry.sources if s.type == "nvd"), None)
+    if enrichment.get("enabled", True) and nvd is not None:
+        jobs.append(Job("nvd-enrichment", "osint", nvd.host, nvd.poll_seconds,
+                        lambda: osint.refresh_details(registry, enrichment), last_good=False))
+
+    registry_jobs("news", news, lambda: news.source_handlers(_now()))
+
+    creds = podcasts.get_spotify_credentials()
+    if creds:
+        jobs.append(Job("spotify", "podcasts", "api.spotify.com", podcasts.POLL_SECONDS["spotify"],
+                        lambda: podcasts.fetch_spotify_episodes(
+                            *creds, _now() - timedelta(days=days)),
+                        last_good=False))
+    jobs.append(Job("apple-charts", "podcasts", "rss.applemarketingtools.com",
+                    podcasts.POLL_SECONDS["apple-charts"], podcasts.fetch_apple_charts))
+    return jobs
+
+
+class Daemon:
+    """Polls jobs on a worker pool, one job per host at a time."""
+
+    def __init__(self, jobs: list[Job], state_path: Path = STATE_PATH,
+                 workers: int = DEFAULT_WORKERS):
+        self.jobs = {job.id: job for job in jobs}
+        self.state_path = state_path
+        self.workers = workers
+        self.guard = Guard(PREFETCH_DIR, cooldown=BREAKER_COOLDOWN)
+        self.cache = shared_cache(PREFETCH_DIR / "http-cache")
+        self.started = _now()
+        self.stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._running: set[str] = set()
+        self._polled: set[str] = set()
+        self._load_state()
+
+    # -- state -------------------------------------------------------------
+
+    def _load_state(self) -> None:
+        try:
+            saved = json.loads(self.state_path.read_text(encoding="utf-8")).get("jobs", {})
+        except (OSError, json.JSONDecodeError):
+            return
+        for job_id, schedule in saved.items():
+            job = self.jobs.get(job_id)
+            if job is not None:
+                for key in Job.SCHEDULE:
+                    if key in schedule:
+                        setattr(job, key, schedule[key])
+
+    def save_state(self, stopped: bool = False) -> None:
+        with self._lock:
+            state = {
+                "pid": os.getpid(),
+                "started": self.started.isoformat(),
+                "heartbeat": _now().isoformat(),
+                "stopped": stopped,
+                "jobs": {job.id: {"collector": job.collector, "poll": job.poll,
+                                  **job.schedule()} for job in self.jobs.values()},
+            }
+        with self._save_lock:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+            os.replace(tmp, self.state_path)
+
+    # -- polling -----------------------------------------------------------
+
+    def _poll(self, job: Job) -> None:
+        recorder = telemetry.Recorder("daemon")
+        stats = recorder.stats(job.id)
+        value = None
+        try:
+            with recorder.source(job.id):
+                value = self.guard.run(job.id, job.fetch, stats, last_good=job.last_good)
+            with self._save_lock:
+                self.guard.save()
+                self.cache.save()
+        except Exception as e:
+            # guard.run() catches the fetch's own errors; this is the guard or disk failing
+            stats.stale_as_of = stats.stale_as_of or "unknown"
+            stats.stale_reason = f"poll failed: {e}"
+        finally:
+            with self._lock:
+                self._reschedule(job, value, stats)
+                self._running.discard(job.id)
+                self._polled.add(job.id)
+            self._wake.set()
+        items = f", {job.items} items" if job.items is not None else ""
+        print(f"[{datetime.now():%H:%M:%S}] {job.id}: {job.status}"
+              f"{f' ({job.error})' if job.error else ''}{items}, "
+              f"next in {job.interval / 60:.0f} min", file=sys.stderr)
+
+    def _reschedule(self, job: Job, value: Any, stats: telemetry.SourceStats) -> None:
+        now = _now()
+        job.last_poll = now.isoformat()
+        job.items = len(value) if isinstance(value, list) else None
+        if stats.stale_as_of is not None:
+            # Failed, or skipped behind an open breaker: retry sooner, backing off
+            job.failures += 1
+            job.status, job.error = "failed", stats.stale_reason
+            job.interval = min(RETRY_DELAY * 2 ** (job.failures - 1), job.poll)
+        else:
+            digest = _digest(value)
+            changed = digest != job.digest
+            job.status = "changed" if changed else "unchanged"
+            job.interval = (job.poll if changed or not job.interval
+                            else min(job.interval * STRETCH, job.poll * MAX_STRETCH))
+            job.failures, job.error, job.digest = 0, None, digest
+            job.last_ok = now.isoformat()
+        job.next_due = time.time() + _jitter(job.interval)
+
+    def _dispatch(self, pool: ThreadPoolExecutor, once: bool) -> float:
+        """Start every due job whose host is free; return seconds until the next is due."""
+        now = time.time()
+        with self._lock:
+            busy = {self.jobs[j].host for j in self._running}
+            waiting = [job for job in self.jobs.values()
+                       if job.id not in self._running
+                       and not (once and job.id in self._polled)]
+            for job in sorted(waiting, key=lambda j: j.next_due):
+                if (once or job.next_due <= now) and job.host not in busy:
+                    busy.add(job.host)
+                    self._running.add(job.id)
+                    pool.submit(self._poll, job)
+            # A job waiting on a busy host is started by the _wake its poll's end sets
+            idle = [job.next_due for job in self.jobs.values()
+                    if job.id not in self._running and job.host not in busy]
+        return max(0.5, min([HEARTBEAT] + [due - now for due in idle]))
+
+    def serve(self, once: bool = False) -> None:
+        """Poll until stopped; with once, poll every job once and return."""
+        print(f"Polling {len(self.jobs)} sources with {self.workers} workers", file=sys.stderr)
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while not self.stop.is_set():
+                wait = self._dispatch(pool, once)
+                self.save_state()
+                if once:
+                    with self._lock:
+                        if len(self._polled) == len(self.jobs):
+                            break
+                self._wake.wait(wait)
+                self._wake.clear()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.save_state(stopped=True)
+
+    def shutdown(self, *_args) -> None:
+        print("Stopping after the polls in flight...", file=sys.stderr)
+        self.stop.set()
+        self._wake.set()
+
+
+# -- clients -------------------------------------------------------------------
+
+def _ago(iso: str | None) -> str:
+    if not iso:
+        return "never"
+    seconds = (_now() - datetime.fromisoformat(iso)).total_seconds()
+    return f"{seconds / 60:.0f}m" if seconds < 5400 else f"{seconds / 3600:.1f}h"
+
+
+def print_status(state: dict | None) -> None:
+    if state is None:
+        print("Polling daemon has never run")
+        return
+    live = running() is not None
+    print(f"Polling daemon {'running' if live else 'NOT running'} (pid {state.get('pid')}, "
+          f"started {_ago(state.get('started'))} ago, heartbeat {_ago(state.get('heartbeat'))} ago)")
+    print(f"  {'source':<22} {'collector':<9} {'status':<10} {'last ok':>8} {'next':>6} "
+          f"{'every':>6} {'fails':>5}")
+    now = time.time()
+    for job_id, job in sorted(state.get("jobs", {}).items(),
+                              key=lambda kv: (kv[1].get("collector", ""), kv[0])):
+        next_in = max(0.0, job.get("next_due", 0) - now) / 60
+        print(f"  {job_id:<22} {job.get('collector', ''):<9} {job.get('status', ''):<10} "
+              f"{_ago(job.get('last_ok')):>8} {next_in:>5.0f}m {job.get('interval', 0) / 60:>5.0f}m "
+              f"{job.get('failures', 0):>5}")
+        if job.get("error"):
+            print(f"      {job['error']}")
+
+
+def snapshot(cadence: str, target_date: str, days: int = 7,
+             fmt: str | None = None) -> dict[str, Path | None]:
+    """Write the cadence's pre-fetch files from the daemon's data, without requests."""
+    import asyncio
+    names = CADENCES[cadence]
+    if running() is None:
+        print("  WARN: polling daemon is not running; sources it has not polled recently "
+              "are served stale", file=sys.stderr)
+    return asyncio.run(run_collectors(names, target_date, days, fmt, warm=True))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Always-warm pre-fetch polling daemon")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="Poll sources until stopped")
+    run_p.add_argument("--days", type=int, default=7, help="Podcast look-back in days")
+    run_p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    run_p.add_argument("--once", action="store_true", help="Poll every source once and exit")
+    snap_p = sub.add_parser("snapshot", help="Write pre-fetch files from the polled data")
+    snap_p.add_argument("--cadence", choices=sorted(CADENCES), default="daily")
+    snap_p.add_argument("--date", help="Target date (YYYY-MM-DD)", default=None)
+    snap_p.add_argument("--days", type=int, default=7, help="Podcast look-back in days")
+    snap_p.add_argument("--format", choices=("compact", "json"), default=None)
+    sub.add_parser("status", help="Show each source's schedule")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print_status(read_state())
+        return
+    if args.command == "snapshot":
+        started = time.monotonic()
+        target_date = args.date or datetime.now().strftime("%Y-%m-%d")
+        results = snapshot(args.cadence, target_date, args.days, args.format)
+        print(f"Snapshot written in {time.monotonic() - started:.2f}s", file=sys.stderr)
+        if not all(results.values()):
+            sys.exit(1)
+        return
+
+    DAEMON_DIR.mkdir(parents=True, exist_ok=True)
+    lock = open(LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print("Polling daemon is already running", file=sys.stderr)
+        sys.exit(1)
+    daemon = Daemon(build_jobs(args.days), workers=args.workers)
+    signal.signal(signal.SIGTERM, daemon.shutdown)
+    signal.signal(signal.SIGINT, daemon.shutdown)
+    daemon.serve(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
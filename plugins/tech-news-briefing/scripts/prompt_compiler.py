@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Compile the self-contained `claude -p` prompt for a cadence.
+
+claude -p cannot resolve plugin commands, so run-briefing.sh inlines the
+command body, the skills it references and the output template into one
+prompt. config/prompts.json lists each cadence's sections in order; each
+file has its YAML frontmatter (a leading --- ... --- block) removed and
+${CLAUDE_PLUGIN_ROOT} replaced by the plugin directory. Sections are joined
+as "# TITLE", the body, and --- separators.
+
+A section can be cut down to part of its file: "tab" keeps one tab of a
+template (its <!-- tab: --> marker to the next, without header or footer),
+and "keep" lists Markdown headings to keep, with everything under them.
+The file's preamble and the headings above a kept one stay, so the result
+still reads in order. Cadences can also list "tabs": one prompt per tab of
+the briefing, for briefing_tabs.py; --tab compiles one of them.
+
+The compiled prompt is cached under ~/.config/tech-news-briefing/
+prompt-cache/<cadence>.md (<cadence>.<tab>.md for a tab), keyed by a hash of
+the manifest, the plugin root and every source file's content, so a run with
+unchanged files only hashes a few small files. The path is printed on stdout
+for the caller to feed to claude on stdin (argv is limited and shows up in
+`ps`).
+
+Every compile records a per-section size report (characters and estimated
+tokens) next to the prompt; --report prints it. Token counts are an
+estimate (see estimate_tokens), good for comparing sections and runs, not
+for billing. A cadence's token_budget in prompts.json, if non-zero, turns
+an oversized prompt into a WARN.
+
+Usage:
+    python3 prompt_compiler.py --cadence daily [--tab "AI News"] [--report] [--force]
+    claude -p ... < "$(python3 prompt_compiler.py --cadence daily)"
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+MANIFEST_PATH = PLUGIN_ROOT / "config" / "prompts.json"
+CACHE_DIR = Path.home() / ".config" / "tech-news-briefing" / "prompt-cache"
+COMPILER_VERSION = "1"   # bump when the output format changes
+
+FRONTMATTER = re.compile(r"\A---[ \t]*\r?\n.*?^---[ \t]*\r?\n", re.S | re.M)
+TOKEN_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+TAB_MARKER = re.compile(r"^\s*<!--\s*tab:\s*(.+?)\s*-->\s*$")
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+RULE = re.compile(r"^\s*---+\s*$")
+
+
+def strip_frontmatter(text: str) -> str:
+    """Remove a leading YAML frontmatter block; later --- rules are kept."""
+    return FRONTMATTER.sub("", text, count=1)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count: ~4 letters or 3 digits per token, 1 per symbol.
+
+    Tracks Claude's tokenizer to within roughly 10-15% on English Markdown.
+    """
+    total = 0
+    for piece in TOKEN_PIECE.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            total += (len(piece) + 3) // 4
+        elif first.isdigit():
+            total += (len(piece) + 2) // 3
+        else:
+            total += 1
+    return total
+
+
+def split_template(text: str) -> tuple[str, list[tuple[str, str]], str]:
+    """(header, [(tab name, tab text)], footer) of a briefing template.
+
+    Each tab's text runs from its marker to the next one (the last tab's
+    to the footer): everything after the last --- rule with no heading below it.
+    """
+    lines = text.strip("\n").splitlines()
+    starts = [(i, m.group(1)) for i, line in enumerate(lines) if (m := TAB_MARKER.match(line))]
+    if not starts:
+        return text.strip("\n"), [], ""
+    end = len(lines)
+    for i in range(len(lines) - 1, starts[-1][0], -1):
+        if HEADING.match(lines[i]):
+            break
+        if RULE.match(lines[i]):
+            end = i
+    tabs = []
+    for (start, name), (stop, _) in zip(starts, starts[1:] + [(end, "")]):
+        tabs.append((name, "\n".join(lines[start:stop]).strip("\n")))
+    header = "\n".join(lines[:starts[0][0]]).strip("\n")
+    return header, tabs, "\n".join(lines[end + 1:]).strip("\n")
+
+
+def template_tab(text: str, name: str) -> str:
+    """One tab of a template, without trailing --- rules; ValueError if there is none."""
+    for tab, body in split_template(text)[1]:
+        if tab == name:
+            lines = body.splitlines()
+            while lines and (not lines[-1].strip() or RULE.match(lines[-1])):
+                lines.pop()
+            return "\n".join(lines)
+    raise ValueError(f"no <!-- tab: {name} --> in template")
+
+
+def keep_headings(text: str, keep: list[str]) -> str:
+    """The preamble, the listed headings with everything under them, and their parents.
+
+    Parent headings keep only their own text up to their first subheading.
+    Lines inside ``` fences are never headings. Raises ValueError for a
+    listed heading the text does not have.
+    """
+    blocks: list[list] = [[0, "", []]]           # [level, title, lines]; block 0 = preamble
+    fenced = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            fenced = not fenced
+        heading = None if fenced else HEADING.match(line)
+        if heading:
+            blocks.append([len(heading.group(1)), heading.group(2), []])
+        blocks[-1][2].append(line)
+
+    missing = set(keep) - {title for _, title, _ in blocks[1:]}
+    if missing:
+        raise ValueError(f"no heading {', '.join(sorted(missing))!r}")
+    wanted = {0}
+    stack: list[tuple[int, int, bool]] = []      # (level, block, kept with its subtree)
+    for i, (level, title, _) in enumerate(blocks[1:], 1):
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        kept = title in keep or bool(stack and stack[-1][2])
+        if kept:
+            wanted.add(i)
+            wanted.update(j for _, j, _ in stack)
+        stack.append((level, i, kept))
+    return "\n".join(line for i in sorted(wanted) for line in blocks[i][2]).strip("\n")
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def cache_key(manifest_bytes: bytes, cadence: str, sources: list[tuple[str, bytes]],
+              plugin_root: Path) -> str:
+    h = hashlib.sha256()
+    for part in (COMPILER_VERSION.encode(), cadence.encode(), str(plugin_root).encode(),
+                 manifest_bytes):
+        h.update(part + b"\0")
+    for name, data in sources:
+        h.update(name.encode() + b"\0" + hashlib.sha256(data).digest())
+    return h.hexdigest()
+
+
+def render(sections: list[dict], sources: list[tuple[str, bytes]],
+           plugin_root: Path) -> tuple[str, list[dict]]:
+    """Assemble the prompt text and its per-section report."""
+    parts, report = [], []
+    for section, (name, data) in zip(sections, sources):
+        body = data.decode("utf-8")
+        if section.get("frontmatter", True):
+            body = strip_frontmatter(body)
+        if section.get("tab"):
+            body = template_tab(body, section["tab"])
+        if section.get("keep"):
+            body = keep_headings(body, section["keep"])
+        body = body.replace("${CLAUDE_PLUGIN_ROOT}", str(plugin_root)).strip("\n")
+        text = f"# {section['title']}\n\n{body}\n"
+        parts.append(text)
+        report.append({"title": section["title"], "file": name,
+                       "chars": len(text), "tokens": estimate_tokens(text)})
+    return "\n---\n\n".join(parts), report
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def tab_config(config: dict, tab: str) -> dict:
+    """A cadence's entry for one tab; raises KeyError if it has none."""
+    for entry in config.get("tabs", []):
+        if entry["name"] == tab:
+            return entry
+    raise KeyError(tab)
+
+
+def slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def compile_prompt(cadence: str, plugin_root: Path = PLUGIN_ROOT,
+                   manifest_path: Path | None = None, cache_dir: Path = CACHE_DIR,
+                   force: bool = False, tab: str | None = None) -> tuple[Path, dict]:
+    """Return (path of the compiled prompt, its metadata), compiling if needed.
+
+    With tab, compiles that tab's prompt from the cadence's "tabs" instead.
+    Raises KeyError for an unknown cadence or tab, OSError for a missing
+    file and ValueError for a "tab" or "keep" the file does not have.
+    """
+    manifest_path = manifest_path or plugin_root / "config" / "prompts.json"
+    manifest_bytes = manifest_path.read_bytes()
+    config = json.loads(manifest_bytes)["cadences"][cadence]
+    name = cadence
+    if tab is not None:
+        config = tab_config(config, tab)
+        name = f"{cadence}.{slug(tab)}"
+    sections = config["sections"]
+    sources = [(s["file"], (plugin_root / s["file"]).read_bytes()) for s in sections]
+    key = cache_key(manifest_bytes, name, sources, plugin_root)
+
+    prompt_path = cache_dir / f"{name}.md"
+    meta_path = cache_dir / f"{name}.json"
+    if not force:
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("key") == key and prompt_path.exists():
+                return prompt_path, {**meta, "cached": True}
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    text, report = render(sections, sources, plugin_root)
+    meta = {
+        "key": key,
+        "cadence": cadence,
+        "tab": tab,
+        "chars": len(text),
+        "tokens": sum(s["tokens"] for s in report),
+        "token_budget": config.get("token_budget", 0),
+        "sections": report,
+    }
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(prompt_path, text)
+    _write_atomic(meta_path, json.dumps(meta, indent=2))
+    return prompt_path, {**meta, "cached": False}
+
+
+def print_report(meta: dict) -> None:
+    total = meta["tokens"] or 1
+    print(f"  {'Section':<34} {'chars':>8} {'~tokens':>8} {'share':>6}", file=sys.stderr)
+    for s in meta["sections"]:
+        print(f"  {s['title']:<34} {s['chars']:>8,} {s['tokens']:>8,} "
+              f"{s['tokens'] / total:>6.0%}", file=sys.stderr)
+    print(f"  {'Total':<34} {meta['chars']:>8,} {meta['tokens']:>8,}", file=sys.stderr)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Compile the claude -p prompt for a cadence")
+    parser.add_argument("--cadence", required=True, help="daily, weekly or monthly")
+    parser.add_argument("--tab", help="Compile one tab's prompt (see \"tabs\" in prompts.json)")
+    parser.add_argument("--plugin-root", type=Path, default=PLUGIN_ROOT,
+                        help="Plugin directory (replaces ${CLAUDE_PLUGIN_ROOT})")
+    parser.add_argument("--manifest", type=Path, default=None,
+                        help="Prompt manifest (default PLUGIN_ROOT/config/prompts.json)")
+    parser.add_argument("--report", action="store_true", help="Print per-section token costs")
+    parser.add_argument("--force", action="store_true", help="Recompile even if cached")
+    args = parser.parse_args()
+
+    try:
+        path, meta = compile_prompt(args.cadence, args.plugin_root.resolve(), args.manifest,
+                                    force=args.force, tab=args.tab)
+    except KeyError:
+        what = f"tab '{args.tab}' for" if args.tab else "cadence"
+        print(f"ERROR: Unknown {what} '{args.cadence}'", file=sys.stderr)
+        sys.exit(1)
+    except (OSError, ValueError, UnicodeDecodeError) as e:
+        print(f"ERROR: Cannot compile {args.cadence} prompt: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    label = f"{args.cadence}, {args.tab}" if args.tab else args.cadence
+    print(f"Prompt ({label}): ~{meta['tokens']:,} tokens, {meta['chars']:,} chars"
+          f"{' (cached)' if meta['cached'] else ''}", file=sys.stderr)
+    if args.report:
+        print_report(meta)
+    budget = meta.get("token_budget") or 0
+    if budget and meta["tokens"] > budget:
+        print(f"  WARN: {label} prompt is ~{meta['tokens']:,} tokens, "
+              f"over its budget of {budget:,}", file=sys.stderr)
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,646 @@
+"""Local stand-ins for every upstream the pre-fetch and email scripts talk to.
+
+ReplayServer is a keep-alive HTTP server that answers for CISA KEV, NVD,
+the RSS feeds, Spotify, Apple Charts and the news sources (HN Algolia,
+arXiv, Reddit, Dev.to, GitHub search), and serves the article pages their
+stories link to (for extract.py; a few are dead, for url_check.py), to GET
+and HEAD, routed by the Host header. Point the scripts at it with
+TECH_NEWS_BRIEFING_REPLAY=http://127.0.0.1:<port> (http_pool.py forwards
+every request there). SMTPStandIn accepts mail the
+way Gmail's submission port would, minus TLS and authentication checks;
+send-email.py uses it when TECH_NEWS_BRIEFING_SMTP=127.0.0.1:<port>.
+
+Payloads are generated deterministically from a seed, at realistic sizes
+(full KEV catalog, NVD result sets spanning several 2000-record pages), and
+scaled by `scale`. A recorded payload dropped into the fixtures directory
+as <fixtures>/<host>/<path> (e.g. www.cisa.gov/sites/default/files/feeds/
+known_exploited_vulnerabilities.json) is served instead of the generated
+one. NVD, Spotify and the news APIs stay generated, since their responses
+depend on the query. Some HN and Reddit stories link to publisher feed
+items, as they do live.
+
+Both servers honour the behaviour the clients depend on: gzip, ETag/304,
+NVD startIndex/resultsPerPage and date windows, Spotify limit/offset
+paging with `next` links. `latency` delays every response, `error_rate`
+answers that fraction of requests with 503 + Retry-After: 0, and both
+servers count requests and bytes sent so a harness can attribute traffic
+to one run.
+
+Usage:
+    server = ReplayServer(latency=0.05, scale=1.0).start()
+    ... run scripts with TECH_NEWS_BRIEFING_REPLAY=server.url ...
+    server.stats()    # {"requests": ..., "bytes": ..., "by_host": {...}}
+    server.stop()
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import random
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+KEV_HOST = "www.cisa.gov"
+KEV_PATH = "/sites/default/files/feeds/known_exploited_vulnerabilities.json"
+NVD_HOST = "services.nvd.nist.gov"
+NVD_PATH = "/rest/json/cves/2.0"
+FEEDS = {
+    ("isc.sans.edu", "/rssfeed.xml"): ("rss", "SANS ISC"),
+    ("www.schneier.com", "/feed/atom/"): ("atom", "Schneier on Security"),
+    ("risky.biz", "/feeds/risky-business/"): ("rss", "Risky Business"),
+    ("openai.com", "/news/rss.xml"): ("rss", "OpenAI Blog"),
+    ("deepmind.google", "/blog/rss.xml"): ("rss", "Google DeepMind"),
+    ("blogs.microsoft.com", "/ai/feed/"): ("rss", "Microsoft AI"),
+    ("arstechnica.com", "/ai/feed/"): ("rss", "Ars Technica"),
+    ("www.theverge.com", "/rss/ai-artificial-intelligence/index.xml"): ("atom", "The Verge"),
+    ("techcrunch.com", "/category/artificial-intelligence/feed/"): ("rss", "TechCrunch"),
+    ("huggingface.co", "/blog/feed.xml"): ("rss", "Hugging Face"),
+}
+HN_HOST = "hn.algolia.com"
+ARXIV_HOST = "export.arxiv.org"
+REDDIT_HOST = "www.reddit.com"
+DEVTO_HOST = "dev.to"
+GITHUB_API_HOST = "api.github.com"
+NEWS_FEED_HOSTS = {"openai.com", "deepmind.google", "blogs.microsoft.com", "arstechnica.com",
+                   "www.theverge.com", "techcrunch.com", "huggingface.co"}
+SPOTIFY_API_HOST = "api.spotify.com"
+SPOTIFY_ACCOUNTS_HOST = "accounts.spotify.com"
+APPLE_HOST = "rss.applemarketingtools.com"
+# Story links that are not API calls: article pages with the usual page furniture
+ARTICLE_HOSTS = {"example.org", "example.com", "github.com", DEVTO_HOST, REDDIT_HOST}
+
+# Sizes at scale=1.0, close to the live payloads
+KEV_ENTRIES = 1500
+NVD_CVES = 5000          # modified in the last 30 days: three 2000-record pages
+FEED_ITEMS = 40
+SHOW_EPISODES = 60
+CHART_SIZE = 25
+ARTICLE_PARAGRAPHS = 8
+DEAD_LINK_RATE = 0.05    # article paths answered with 404, for url_check.py
+NVD_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000"
+VENDORS = ["microsoft", "apple", "google", "cisco", "fortinet", "ivanti", "oracle",
+           "vmware", "citrix", "paloaltonetworks", "apache", "linux", "adobe", "sap"]
+WORDS = ("remote code execution authentication bypass privilege escalation improper input "
+         "validation memory corruption deserialization path traversal injection overflow "
+         "crafted request unauthenticated attacker arbitrary server component").split()
+
+
+class Fixtures:
+    """Deterministic synthetic upstream payloads."""
+
+    def __init__(self, scale: float = 1.0, seed: int = 1, now: datetime | None = None,
+                 fixtures_dir: Path | None = None):
+        self.scale = scale
+        self.now = (now or datetime.now(timezone.utc)).replace(microsecond=0)
+        self.fixtures_dir = fixtures_dir
+        rng = random.Random(seed)
+        self._rng = rng
+
+        n_nvd = max(1, int(NVD_CVES * scale))
+        self.nvd = []
+        for i in range(n_nvd):
+            modified = self.now - timedelta(seconds=rng.randint(0, 30 * 86400))
+            published = modified - timedelta(days=rng.randint(0, 60))
+            self.nvd.append(self._cve(f"CVE-{published.year}-{10000 + i}", published, modified))
+        self.nvd_by_id = {item["cve"]["id"]: item for item in self.nvd}
+
+        n_kev = max(1, int(KEV_ENTRIES * scale))
+        self.kev_entries = []
+        for i in range(n_kev):
+            # Most KEV CVEs are old; a few were added in the last couple of days
+            if i < n_kev - 5:
+                cve_id = f"CVE-{2015 + i % 10}-{20000 + i}"
+                added = self.now - timedelta(days=rng.randint(3, 1500))
+            else:
+                cve_id = self.nvd[i % n_nvd]["cve"]["id"]
+                added = self.now - timedelta(days=rng.randint(0, 1))
+            vendor = rng.choice(VENDORS)
+            self.kev_entries.append({
+                "cveID": cve_id,
+                "vendorProject": vendor.title(),
+                "product": f"{vendor.title()} Product {i % 40}",
+                "vulnerabilityName": f"{vendor.title()} {self._phrase(4)} Vulnerability",
+                "dateAdded": added.date().isoformat(),
+                "shortDescription": self._phrase(int(40 * max(scale, 0.1))),
+                "requiredAction": "Apply mitigations per vendor instructions or discontinue use.",
+                "dueDate": (added + timedelta(days=21)).date().isoformat(),
+                "knownRansomwareCampaignUse": "Known" if rng.random() < 0.15 else "Unknown",
+                "notes": f"https://nvd.nist.gov/vuln/detail/{cve_id}",
+                "cwes": [f"CWE-{rng.choice([20, 22, 78, 79, 94, 287, 502, 787])}"],
+            })
+        for entry in self.kev_entries:
+            if entry["cveID"] not in self.nvd_by_id:
+                added = datetime.fromisoformat(entry["dateAdded"]).replace(tzinfo=timezone.utc)
+                item = self._cve(entry["cveID"], added - timedelta(days=30), added)
+                self.nvd_by_id[entry["cveID"]] = item
+        self.kev_ids = [e["cveID"] for e in self.kev_entries]
+
+    def _phrase(self, n: int) -> str:
+        return " ".join(self._rng.choice(WORDS) for _ in range(n))
+
+    def _cve(self, cve_id: str, published: datetime, modified: datetime) -> dict:
+        rng = self._rng
+        score = round(rng.uniform(4.0, 10.0), 1)
+        severity = "CRITICAL" if score >= 9 else "HIGH" if score >= 7 else "MEDIUM"
+        vendor = rng.choice(VENDORS)
+        return {"cve": {
+            "id": cve_id,
+            "published": published.strftime(NVD_DATE_FORMAT),
+            "lastModified": modified.strftime(NVD_DATE_FORMAT),
+            "vulnStatus": "Analyzed",
+            "descriptions": [{"lang": "en", "value": self._phrase(int(30 * max(self.scale, 0.1)))}],
+            "metrics": {"cvssMetricV31": [{"cvssData": {"baseScore": score,
+                                                        "baseSeverity": severity}}]},
+            "weaknesses": [{"description": [{"lang": "en", "value": f"CWE-{rng.randint(20, 900)}"}]}],
+            "configurations": [{"nodes": [{"cpeMatch": [{
+                "vulnerable": True,
+                "criteria": f"cpe:2.3:a:{vendor}:product_{rng.randint(1, 40)}:*:*:*:*:*:*:*:*",
+            }]}]}],
+        }}
+
+    # -- payloads ------------------------------------------------------------
+
+    def recorded(self, host: str, path: str) -> bytes | None:
+        if not self.fixtures_dir:
+            return None
+        candidate = self.fixtures_dir / host / path.lstrip("/")
+        if candidate.is_dir():
+            candidate = candidate / "index"
+        return candidate.read_bytes() if candidate.is_file() else None
+
+    def kev(self) -> bytes:
+        return json.dumps({
+            "title": "CISA Catalog of Known Exploited Vulnerabilities",
+            "catalogVersion": self.now.strftime("%Y.%m.%d"),
+            "dateReleased": self.now.strftime("%Y-%m-%dT%H:%M:%S.0000Z"),
+            "count": len(self.kev_entries),
+            "vulnerabilities": self.kev_entries,
+        }, indent=2).encode("utf-8")
+
+    def nvd_page(self, query: dict[str, list[str]], flags: set[str]) -> bytes:
+        if "cveId" in query:
+            items = [self.nvd_by_id[c] for c in query["cveId"][:1] if c in self.nvd_by_id]
+        elif "hasKev" in flags:
+            items = [self.nvd_by_id[c] for c in self.kev_ids if c in self.nvd_by_id]
+        else:
+            items = self.nvd
+            for field, key in (("lastMod", "lastModified"), ("pub", "published")):
+                start = query.get(f"{field}StartDate", [""])[0]
+                end = query.get(f"{field}EndDate", [""])[0]
+                if start and end:
+                    items = [i for i in items if start <= i["cve"][key] <= end]
+        start_index = int(query.get("startIndex", ["0"])[0])
+        per_page = int(query.get("resultsPerPage", ["2000"])[0])
+        return json.dumps({
+            "resultsPerPage": per_page,
+            "startIndex": start_index,
+            "totalResults": len(items),
+            "format": "NVD_CVE",
+            "version": "2.0",
+            "timestamp": self.now.strftime(NVD_DATE_FORMAT),
+            "vulnerabilities": items[start_index:start_index + per_page],
+        }).encode("utf-8")
+
+    def feed(self, kind: str, name: str) -> bytes:
+        rng = random.Random(name)
+        n = max(1, int(FEED_ITEMS * self.scale))
+        parts = []
+        for i in range(n):
+            when = self.now - timedelta(hours=i * 7)
+            title = f"{name} item {i}: {' '.join(rng.choice(WORDS) for _ in range(5))}"
+            body = " ".join(rng.choice(WORDS) for _ in range(int(120 * max(self.scale, 0.1))))
+            link = f"https://example.org/{name.lower().replace(' ', '-')}/{i}"
+            if kind == "atom":
+                parts.append(
+                    f"<entry><title>{title}</title><link rel=\"alternate\" href=\"{link}\"/>"
+                    f"<id>{link}</id><published>{when.isoformat()}</published>"
+                    f"<summary>{body}</summary></entry>")
+            else:
+                parts.append(
+                    f"<item><title>{title}</title><link>{link}</link>"
+                    f"<pubDate>{format_datetime(when)}</pubDate>"
+                    f"<description>{body}</description></item>")
+        if kind == "atom":
+            doc = ('<?xml version="1.0" encoding="UTF-8"?>'
+                   f'<feed xmlns="http://www.w3.org/2005/Atom"><title>{name}</title>'
+                   + "".join(parts) + "</feed>")
+        else:
+            doc = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                   f"<title>{name}</title>" + "".join(parts) + "</channel></rss>")
+        return doc.encode("utf-8")
+
+    def episodes(self, show_id: str, offset: int, limit: int, base: str) -> bytes:
+        rng = random.Random(show_id)
+        n = max(1, int(SHOW_EPISODES * self.scale))
+        every = rng.choice([1, 2, 3, 7])
+        items = []
+        for i in range(offset, min(offset + limit, n)):
+            items.append({
+                "id": f"{show_id[:10]}ep{i:04d}",
+                "name": f"Episode {n - i}: {' '.join(rng.choice(WORDS) for _ in range(4))}",
+                "description": " ".join(rng.choice(WORDS) for _ in range(60)),
+                "external_urls": {"spotify": f"https://open.spotify.com/episode/{show_id}{i}"},
+                "release_date": (self.now - timedelta(days=i * every)).date().isoformat(),
+                "release_date_precision": "day",
+                "duration_ms": 1800000 + i * 1000,
+            })
+        nxt = (f"{base}?offset={offset + limit}&limit={limit}&market=US"
+               if offset + limit < n else None)
+        return json.dumps({"items": items, "limit": limit, "offset": offset,
+                           "total": n, "next": nxt}).encode("utf-8")
+
+    def _feed_link(self, rng: random.Random) -> str:
+        """A link to a generated publisher feed item, as HN and Reddit posts often are."""
+        _, name = rng.choice([v for k, v in FEEDS.items() if k[0] in NEWS_FEED_HOSTS])
+        return f"https://example.org/{name.lower().replace(' ', '-')}/{rng.randint(0, 5)}"
+
+    def hn_search(self, query: dict[str, list[str]]) -> bytes:
+        text = query.get("query", [""])[0]
+        rng = random.Random(f"hn:{text}")
+        filters = dict(f.split(">", 1) for f in query.get("numericFilters", [""])[0].split(",")
+                       if ">" in f)
+        since = int(filters.get("created_at_i", "0") or 0)
+        min_points = int((filters.get("points") or "=0").lstrip("="))
+        hits = []
+        for i in range(int(20 * max(self.scale, 0.1))):
+            created = int((self.now - timedelta(hours=rng.uniform(0, 72))).timestamp())
+            points = rng.randint(5, 900)
+            if created <= since or points < min_points:
+                continue
+            object_id = str(40000000 + rng.randint(0, 99999))
+            hits.append({
+                "objectID": object_id,
+                "title": f"{text}: {' '.join(rng.choice(WORDS) for _ in range(6))}",
+                "url": self._feed_link(rng) if rng.random() < 0.2
+                else f"https://example.com/hn/{object_id}",
+                "points": points,
+                "num_comments": rng.randint(0, 400),
+                "author": f"user{i}",
+                "created_at_i": created,
+                "created_at": datetime.fromtimestamp(created, timezone.utc).isoformat(),
+            })
+        return json.dumps({"hits": hits, "nbHits": len(hits), "page": 0,
+                           "hitsPerPage": len(hits)}).encode("utf-8")
+
+    def reddit_listing(self, path: str) -> bytes:
+        rng = random.Random(f"reddit:{path}")
+        sub = path.split("/")[2] if path.count("/") >= 2 else "all"
+        children = []
+        for i in range(int(25 * max(self.scale, 0.1))):
+            post_id = f"{sub[:3].lower()}{i:04d}"
+            is_self = rng.random() < 0.4
+            permalink = f"/r/{sub}/comments/{post_id}/post_{i}/"
+            children.append({"kind": "t3", "data": {
+                "id": post_id,
+                "title": f"[{rng.choice(['R', 'D', 'P', 'N'])}] {' '.join(rng.choice(WORDS) for _ in range(7))}",
+                "subreddit": sub,
+                "permalink": permalink,
+                "url": f"https://www.reddit.com{permalink}" if is_self else self._feed_link(rng),
+                "is_self": is_self,
+                "selftext": " ".join(rng.choice(WORDS) for _ in range(40)) if is_self else "",
+                "score": rng.randint(1, 2000),
+                "num_comments": rng.randint(0, 300),
+                "created_utc": (self.now - timedelta(hours=rng.uniform(0, 30))).timestamp(),
+                "stickied": i == 0,
+                "over_18": False,
+            }})
+        return json.dumps({"kind": "Listing", "data": {"children": children,
+                                                       "after": None}}).encode("utf-8")
+
+    def devto_articles(self) -> bytes:
+        rng = random.Random("devto")
+        articles = [{
+            "id": 2000000 + i,
+            "title": f"Building with {' '.join(rng.choice(WORDS) for _ in range(5))}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(25)),
+            "url": f"https://dev.to/author{i}/article-{i}",
+            "published_at": (self.now - timedelta(hours=rng.uniform(0, 60))).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"),
+            "positive_reactions_count": rng.randint(0, 500),
+            "comments_count": rng.randint(0, 80),
+            "tag_list": ["ai"],
+            "user": {"name": f"Author {i}"},
+        } for i in range(int(30 * max(self.scale, 0.1)))]
+        return json.dumps(articles).encode("utf-8")
+
+    def github_search(self, query: dict[str, list[str]]) -> bytes:
+        rng = random.Random(f"github:{query.get('q', [''])[0]}")
+        per_page = int(query.get("per_page", ["30"])[0])
+        items = sorted(({
+            "full_name": f"org{i}/{rng.choice(WORDS)}-{rng.choice(WORDS)}",
+            "html_url": f"https://github.com/org{i}/repo{i}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(12)),
+            "stargazers_count": rng.randint(100, 9000),
+            "language": rng.choice(["Python", "Rust", "TypeScript", None]),
+            "created_at": (self.now - timedelta(days=rng.uniform(0, 7))).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"),
+        } for i in range(per_page)), key=lambda r: -r["stargazers_count"])
+        return json.dumps({"total_count": len(items), "incomplete_results": False,
+                           "items": items}).encode("utf-8")
+
+    def dead(self, host: str, path: str) -> bool:
+        """Whether an article link is dead: a fixed DEAD_LINK_RATE share of paths."""
+        return random.Random(f"dead:{host}{path}").random() < DEAD_LINK_RATE
+
+    def article(self, host: str, path: str) -> bytes:
+        """An HTML article page: navigation, share and related-link boilerplate
+        and a script bundle around the <article> body, at a typical page size."""
+        rng = random.Random(f"article:{host}{path}")
+
+        def words(n: int) -> str:
+            return " ".join(rng.choice(WORDS) for _ in range(n))
+
+        paragraphs = "".join(f"<p>{words(rng.randint(40, 90))}.</p>"
+                             for _ in range(max(1, int(ARTICLE_PARAGRAPHS * self.scale))))
+        related = "".join(f'<li><a href="/related/{i}">{words(6)}</a></li>' for i in range(8))
+        bundle = "var state=" + json.dumps({"k": words(800)}) + ";"
+        doc = (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{words(5)}</title>"
+               f"<meta name=\"description\" content=\"{words(20)}\"><script>{bundle}</script>"
+               f"<style>body{{font-family:sans-serif}}</style></head><body class=\"has-sidebar\">"
+               f"<header><nav><a href=\"/\">Home</a> <a href=\"/news\">News</a> "
+               f"<a href=\"/about\">About</a></nav></header>"
+               f"<div class=\"share-bar\"><a href=\"#\">Share</a> <a href=\"#\">Post</a></div>"
+               f"<main><article><h1>{words(7)}</h1>{paragraphs}"
+               f"<div class=\"related-posts\"><ul>{related}</ul></div></article></main>"
+               f"<aside>{words(30)}</aside><footer>{words(25)}</footer></body></html>")
+        return doc.encode("utf-8")
+
+    def charts(self) -> bytes:
+        results = [{
+            "id": str(1000000 + i),
+            "name": f"Tech Show {i}",
+            "artistName": f"Network {i % 7}",
+            "url": f"https://podcasts.apple.com/us/podcast/id{1000000 + i}",
+        } for i in range(CHART_SIZE)]
+        return json.dumps({"feed": {"title": "Top Technology Podcasts",
+                                    "results": results}}).encode("utf-8")
+
+
+class ReplayServer:
+    """Threaded keep-alive HTTP server answering for every upstream host."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, scale: float = 1.0, seed: int = 1,
+                 fixtures_dir: Path | None = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fixtures = Fixtures(scale=scale, seed=seed, fixtures_dir=fixtures_dir)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._static: dict[tuple[str, str], bytes] = {}
+        self.reset()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._handle(self, "GET")
+
+            def do_HEAD(self):
+                server._handle(self, "HEAD")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                server._handle(self, "POST")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> ReplayServer:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {"requests": 0, "bytes": 0, "errors": 0, "by_host": {}}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def _count(self, host: str, sent: int, error: bool = False) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["bytes"] += sent
+            self._stats["errors"] += int(error)
+            per = self._stats["by_host"].setdefault(host, {"requests": 0, "bytes": 0})
+            per["requests"] += 1
+            per["bytes"] += sent
+
+    # -- routing -------------------------------------------------------------
+
+    def _body(self, host: str, method: str, path: str, raw_query: str) -> tuple[int, bytes, str, bool]:
+        """Return (status, body, content type, cacheable) for a request."""
+        query = parse_qs(raw_query, keep_blank_values=True)
+        flags = {part for part in raw_query.split("&") if part and "=" not in part}
+        fx = self.fixtures
+
+        if host == SPOTIFY_ACCOUNTS_HOST and method == "POST":
+            token = {"access_token": "replay-token", "token_type": "Bearer", "expires_in": 3600}
+            return 200, json.dumps(token).encode(), "application/json", False
+        if host == NVD_HOST and path == NVD_PATH:
+            return 200, fx.nvd_page(query, flags), "application/json", True
+        if host == HN_HOST:
+            return 200, fx.hn_search(query), "application/json", True
+        if host == REDDIT_HOST and path.endswith(".json"):
+            return 200, fx.reddit_listing(path), "application/json", True
+        if host == DEVTO_HOST and path == "/api/articles":
+            return 200, fx.devto_articles(), "application/json", True
+        if host == GITHUB_API_HOST and path == "/search/repositories":
+            return 200, fx.github_search(query), "application/json", True
+        if host == ARXIV_HOST:
+            return 200, fx.feed("atom", "arXiv"), "application/atom+xml", True
+        if host == SPOTIFY_API_HOST and path.startswith("/v1/shows/") and path.endswith("/episodes"):
+            show_id = path.split("/")[3]
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", ["20"])[0])
+            base = f"https://{host}{path}"
+            return 200, fx.episodes(show_id, offset, limit, base), "application/json", True
+        if host in ARTICLE_HOSTS and method in ("GET", "HEAD"):
+            if fx.dead(host, path):
+                return 404, b"<h1>Not Found</h1>", "text/html; charset=utf-8", False
+            return 200, fx.article(host, path), "text/html; charset=utf-8", True
+
+        key = (host, path)
+        with self._lock:
+            cached = self._static.get(key)
+        if cached is None:
+            cached = fx.recorded(host, path)
+            if cached is None:
+                if key == (KEV_HOST, KEV_PATH):
+                    cached = fx.kev()
+                elif key in FEEDS:
+                    cached = fx.feed(*FEEDS[key])
+                elif host == APPLE_HOST:
+                    cached = fx.charts()
+            if cached is None:
+                return 404, b'{"error":"no fixture"}', "application/json", False
+            with self._lock:
+                self._static[key] = cached
+        ctype = "application/xml" if key in FEEDS else "application/json"
+        return 200, cached, ctype, True
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        host = (handler.headers.get("Host") or "").split(":")[0].lower()
+        parts = urlsplit(handler.path)
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            fail = self.error_rate and self._rng.random() < self.error_rate
+        if fail:
+            handler.send_response(503)
+            handler.send_header("Retry-After", "0")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            self._count(host, 0, error=True)
+            return
+
+        status, body, ctype, cacheable = self._body(host, method, parts.path, parts.query)
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"' if cacheable else None
+        if etag and handler.headers.get("If-None-Match") == etag:
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            self._count(host, 0)
+            return
+
+        if "gzip" in (handler.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body, compresslevel=6)
+            encoded = True
+        else:
+            encoded = False
+        handler.send_response(status)
+        handler.send_header("Content-Type", ctype)
+        if encoded:
+            handler.send_header("Content-Encoding", "gzip")
+        if etag:
+            handler.send_header("ETag", etag)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if method == "HEAD":
+            self._count(host, 0)
+            return
+        handler.wfile.write(body)
+        self._count(host, len(body))
+
+
+class SMTPStandIn:
+    """Minimal SMTP server: accepts EHLO/AUTH/MAIL/RCPT/DATA and counts messages.
+
+    `error_rate` answers that fraction of messages with a transient 451 after
+    DATA, so senders' retry paths can be exercised.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str) -> None:
+                self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+            def handle(self):
+                stand_in._count_session()
+                self.reply("220 replay ESMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    verb = line.decode("utf-8", "replace").strip().split(" ")[0].upper()
+                    if stand_in.latency:
+                        time.sleep(stand_in.latency)
+                    if verb == "EHLO":
+                        self.reply("250-replay")
+                        self.reply("250-AUTH PLAIN LOGIN")
+                        self.reply("250 SIZE 52428800")
+                    elif verb == "AUTH":
+                        self.reply("235 2.7.0 Accepted")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        size = 0
+                        while (data := self.rfile.readline()) not in (b".\r\n", b""):
+                            size += len(data)
+                        if stand_in._fail():
+                            self.reply("451 4.3.0 Temporary failure, try again later")
+                        else:
+                            stand_in._count(size)
+                            self.reply("250 2.0.0 Queued")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                        self.reply("250 OK")
+                    else:
+                        self.reply("502 Command not implemented")
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> SMTPStandIn:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {"messages": 0, "bytes": 0, "sessions": 0, "errors": 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, size: int) -> None:
+        with self._lock:
+            self._stats["messages"] += 1
+            self._stats["bytes"] += size
+
+    def _count_session(self) -> None:
+        with self._lock:
+            self._stats["sessions"] += 1
+
+    def _fail(self) -> bool:
+        with self._lock:
+            fail = bool(self.error_rate) and self._rng.random() < self.error_rate
+            if fail:
+                self._stats["errors"] += 1
+            return fail
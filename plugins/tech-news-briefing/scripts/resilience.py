@@ -0,0 +1,342 @@
+"""Run-wide deadline, circuit breakers and last-good fallback for the pre-fetch.
+
+Deadline: start() sets one process-wide budget (default 45s) for the whole
+pre-fetch phase. http_pool.py clamps every request's timeout to what is
+left of it and refuses to start requests, retries or reads once it has
+run out, raising DeadlineExceeded (a TimeoutError, so existing handlers
+treat it like any other timeout). The rate-limit waits in the NVD and
+Spotify clients give up at the deadline too. The pool also hedges slow
+GETs: if no response has arrived after `hedge_after` seconds, a duplicate
+request goes out and whichever answers first wins.
+
+Guard wraps each source's fetch:
+
+  - Circuit breaker: a source that fails `threshold` runs in a row (an
+    error, or missing the deadline) is kept offline for `cooldown` (doubling
+    while it keeps failing), then tried once again. State lives in
+    prefetch/breakers.json, so it survives runs.
+  - Last good: every successful result is saved to prefetch/last-good/.
+    When a source fails, misses the deadline or is skipped, its last good
+    result is served instead, every record marked "stale": true, and the
+    source's fetch_stats say since when. Sources that already fall back to
+    a local store (KEV, NVD) pass last_good=False: their handler's answer
+    from the store is served, marked stale, rather than yesterday's delta.
+  - Warm: warm() serves a source from disk alone (its store or last good
+    result) for snapshots of what the polling daemon (prefetch_daemon.py)
+    has collected. Data older than max_age since the source's last success
+    is marked stale.
+
+A source counts as failed if its fetch raised, or made requests and none
+succeeded. A source the deadline expired before it could start is served
+stale without counting against its breaker. "Offline" means the handler
+still runs but every request it makes fails at once with SourceUnavailable.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+from urllib.error import URLError
+
+from telemetry import SourceStats
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+
+DEFAULT_BUDGET = 45.0          # seconds for the whole pre-fetch phase
+HEDGE_AFTER = 4.0              # seconds without a response before hedging a GET
+MIN_TIMEOUT = 1.0              # never hand a request less than this
+BREAKER_THRESHOLD = 3          # consecutive failed runs before the breaker opens
+BREAKER_COOLDOWN = timedelta(hours=6)
+MAX_COOLDOWN = timedelta(days=2)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run-wide pre-fetch budget is spent."""
+
+
+class SourceUnavailable(URLError):
+    """A request was made for a source whose circuit breaker is open."""
+
+
+class Deadline:
+    """A fixed point in time by which the pre-fetch must finish."""
+
+    def __init__(self, budget: float, hedge_after: float | None = HEDGE_AFTER):
+        self.budget = budget
+        self.hedge_after = hedge_after
+        self.started = time.monotonic()
+        self.expires = self.started + budget
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_deadline: Deadline | None = None
+_offline: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "resilience_offline", default=None)
+
+
+def start(budget: float = DEFAULT_BUDGET, hedge_after: float | None = HEDGE_AFTER) -> Deadline:
+    """Start the process-wide deadline (replacing any earlier one)."""
+    global _deadline
+    _deadline = Deadline(budget, hedge_after)
+    print(f"Pre-fetch budget: {budget:.0f}s", file=sys.stderr)
+    return _deadline
+
+
+def active() -> Deadline | None:
+    return _deadline
+
+
+def remaining() -> float | None:
+    """Seconds left, or None when no deadline is set."""
+    return _deadline.remaining() if _deadline else None
+
+
+def expired() -> bool:
+    return bool(_deadline and _deadline.expired())
+
+
+def clamp(timeout: float) -> float:
+    """Shrink a timeout to the remaining budget; raise if nothing is left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("pre-fetch deadline reached")
+    return max(MIN_TIMEOUT, min(timeout, left))
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep() that refuses to sleep past the deadline."""
+    left = remaining()
+    if left is not None and seconds >= left:
+        raise DeadlineExceeded(f"pre-fetch deadline reached (wanted to wait {seconds:.0f}s)")
+    time.sleep(seconds)
+
+
+def hedge_after() -> float | None:
+    return _deadline.hedge_after if _deadline else None
+
+
+def check_online() -> None:
+    """Raise SourceUnavailable if the current source's breaker is open."""
+    reason = _offline.get()
+    if reason:
+        raise SourceUnavailable(reason)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Guard:
+    """Circuit breakers plus last-good fallback for a set of sources."""
+
+    def __init__(self, state_dir: Path = PREFETCH_DIR, threshold: int = BREAKER_THRESHOLD,
+                 cooldown: timedelta = BREAKER_COOLDOWN):
+        self.state_dir = state_dir
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.breakers_path = state_dir / "breakers.json"
+        self.last_good_dir = state_dir / "last-good"
+        self._abandoned: set[str] = set()
+        self._lock = threading.Lock()
+        try:
+            self._breakers: dict[str, dict] = json.loads(
+                self.breakers_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self._breakers = {}
+
+    # -- breakers ----------------------------------------------------------
+
+    def is_open(self, source_id: str) -> bool:
+        with self._lock:
+            until = self._breakers.get(source_id, {}).get("open_until")
+        return bool(until) and _now() < datetime.fromisoformat(until)
+
+    def _failure(self, source_id: str, reason: str) -> None:
+        with self._lock:
+            entry = self._breakers.setdefault(source_id, {})
+            entry["failures"] = entry.get("failures", 0) + 1
+            entry["last_error"] = reason[:200]
+            entry["last_failure"] = _now().isoformat()
+            over = entry["failures"] - self.threshold
+            if over >= 0:
+                cooldown = min(self.cooldown * (2 ** over), MAX_COOLDOWN)
+                entry["open_until"] = (_now() + cooldown).isoformat()
+                print(f"  WARN: {source_id} failed {entry['failures']} runs in a row; "
+                      f"skipping it for {cooldown}", file=sys.stderr)
+
+    def _success(self, source_id: str) -> None:
+        with self._lock:
+            self._breakers[source_id] = {"failures": 0, "last_success": _now().isoformat()}
+
+    def save(self) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = json.dumps(self._breakers, indent=2)
+        tmp = self.breakers_path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, self.breakers_path)
+
+    # -- last good ---------------------------------------------------------
+
+    def _last_good_path(self, source_id: str) -> Path:
+        return self.last_good_dir / f"{source_id}.json"
+
+    def last_good(self, source_id: str) -> tuple[Any, str] | None:
+        """(value, fetched_at) of the source's last good result, if one was saved."""
+        try:
+            saved = json.loads(self._last_good_path(source_id).read_text(encoding="utf-8"))
+            return saved["value"], saved["fetched_at"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            return None
+
+    def last_success(self, source_id: str) -> str | None:
+        with self._lock:
+            return self._breakers.get(source_id, {}).get("last_success")
+
+    def _save_last_good(self, source_id: str, value: Any) -> None:
+        self.last_good_dir.mkdir(parents=True, exist_ok=True)
+        path = self._last_good_path(source_id)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"fetched_at": _now().isoformat(), "value": value},
+                                  ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def stale(self, source_id: str, reason: str, stats: SourceStats | None = None,
+              value: Any = None, last_good: bool = True) -> Any:
+        """Serve `value` (a handler's own fallback) if non-empty, else the last good result.
+
+        List records are marked "stale": true; stats, if given, record why.
+        """
+        as_of = None
+        served = "local data"
+        if not value and last_good:
+            served = "last good data"
+            saved = self.last_good(source_id)
+            if saved is not None:
+                value, as_of = saved
+        if as_of is None:
+            as_of = self.last_success(source_id)
+        if stats is not None:
+            stats.stale_as_of = as_of or "unknown"
+            stats.stale_reason = reason
+        print(f"  WARN: {source_id}: {reason}; serving {served} "
+              f"(as of {as_of or 'unknown'})", file=sys.stderr)
+        if isinstance(value, list):
+            return [{**item, "stale": True} if isinstance(item, dict) else item for item in value]
+        return value
+
+    # -- entry point -------------------------------------------------------
+
+    def offline(self, source_id: str, fetch: Callable[[], Any], reason: str,
+                stats: SourceStats | None = None, last_good: bool = True) -> Any:
+        """Serve a source without the network.
+
+        With last_good=False the fetch runs with every request failing at once
+        (SourceUnavailable), so a handler with a local store answers from it;
+        otherwise the last good result is served.
+        """
+        value = None
+        if not last_good:
+            token = _offline.set(f"{source_id}: {reason}")
+            try:
+                value, _ = _attempt(fetch)
+            finally:
+                _offline.reset(token)
+        return self.stale(source_id, reason, stats, value, last_good)
+
+    def warm(self, source_id: str, read: Callable[[], Any] | None = None,
+             stats: SourceStats | None = None, last_good: bool = True,
+             max_age: float | None = None) -> Any:
+        """Serve a source from what is already on disk, without the network.
+
+        Sources with last_good=False answer from their local store through
+        `read`; the rest get their last good result. Either way the data is
+        as fresh as the source's last success, whoever fetched it (the polling
+        daemon or an earlier run); past max_age seconds it is served stale.
+        """
+        as_of = self.last_success(source_id)
+        age = (_now() - datetime.fromisoformat(as_of)).total_seconds() if as_of else None
+        if age is None or (max_age is not None and age > max_age):
+            reason = ("never fetched" if age is None
+                      else f"last fetched {age / 60:.0f} min ago")
+            value = read() if read is not None and not last_good else None
+            return self.stale(source_id, reason, stats, value, last_good)
+        if not last_good:
+            return read() if read is not None else None
+        saved = self.last_good(source_id)
+        return saved[0] if saved is not None else None
+
+    def abandon(self, source_id: str, fetch: Callable[[], Any],
+                stats: SourceStats | None = None, last_good: bool = True,
+                started: bool = True) -> Any:
+        """Give up on a source unfinished at the deadline and serve it offline.
+
+        A source that had started counts as failed. Whatever the abandoned
+        fetch does later is ignored.
+        """
+        with self._lock:
+            self._abandoned.add(source_id)
+        if started:
+            self._failure(source_id, "missed the deadline")
+        return self.offline(source_id, fetch, "missed the deadline", stats, last_good)
+
+    def run(self, source_id: str, fetch: Callable[[], Any],
+            stats: SourceStats | None = None, last_good: bool = True) -> Any:
+        """Run one source's fetch behind its breaker, falling back to last good."""
+        if self.is_open(source_id):
+            if stats is not None:
+                stats.breaker = "open"
+            return self.offline(source_id, fetch, "circuit open", stats, last_good)
+        if expired():
+            return self.offline(source_id, fetch, "deadline reached before start", stats,
+                                last_good)
+
+        value, error = _attempt(fetch)
+        with self._lock:
+            if source_id in self._abandoned:
+                return value
+        if error is None and stats is not None and stats.requests and not stats.succeeded():
+            error = f"{stats.errors} failed request(s)"
+        if error is not None:
+            reason = "deadline reached" if expired() else f"fetch failed: {error}"
+            self._failure(source_id, reason)
+            return self.stale(source_id, reason, stats, value, last_good)
+
+        self._success(source_id)
+        if value is not None and last_good:
+            self._save_last_good(source_id, value)
+        return value
+
+
+def _attempt(fetch: Callable[[], Any]) -> tuple[Any, Exception | None]:
+    try:
+        return fetch(), None
+    except Exception as e:
+        return None, e
+
+
+_shared: Guard | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_guard(state_dir: Path = PREFETCH_DIR) -> Guard:
+    """Process-wide guard, so concurrent collectors share one breakers.json."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Guard(state_dir)
+        return _shared
@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 """Send tech news briefing via Google Workspace SMTP.
 
-Usage: python3 send-email.py /path/to/YYYY-MM-DD.md
+Usage:
+    python3 send-email.py /path/to/YYYY-MM-DD.md [--per-recipient] [--workers N]
+    python3 send-email.py --flush      # retry whatever is still in the outbox
 
 Credentials are read from macOS Keychain:
   - Service "tech-news-briefing-smtp": account = FROM email, password = app password
   - Service "tech-news-briefing-to": account = "tech-news-briefing", password = comma-separated TO emails
+TECH_NEWS_BRIEFING_TO (comma-separated) overrides the recipient list.
+
+The HTML part is rendered by md_render.py. The message is spooled to the
+outbox (outbox.py) and sent from there by a few workers, each reusing one
+logged-in SMTP session; above outbox.GROUP_MAX recipients every subscriber
+gets their own copy. Sends that fail transiently stay in the outbox and are
+retried with backoff, in this run while --max-time allows and otherwise by
+the next --flush. Exits 1 if the briefing was not delivered to everyone yet.
+
+Setting TECH_NEWS_BRIEFING_SMTP=host:port delivers to a local SMTP stand-in
+instead (plain SMTP, no STARTTLS or Keychain lookup) — used by bench.py.
 """
 
-import re
+import os
 import sys
 import subprocess
 import smtplib
@@ -16,6 +29,14 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from pathlib import Path
 
+from md_render import render_cached
+from outbox import DEFAULT_MAX_TIME, DEFAULT_WORKERS, Outbox
+
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_TIMEOUT = 30
+STAND_IN_SMTP = os.environ.get("TECH_NEWS_BRIEFING_SMTP", "")
+
 
 def get_keychain_password(service, account):
     """Retrieve a password from macOS Keychain."""
@@ -54,99 +75,15 @@ def get_smtp_credentials():
 
 
 def get_to_emails():
-    """Get TO email addresses from Keychain (comma-separated)."""
-    raw = get_keychain_password("tech-news-briefing-to", "tech-news-briefing")
+    """Get TO email addresses from the environment or Keychain (comma-separated)."""
+    raw = os.environ.get("TECH_NEWS_BRIEFING_TO", "").strip()
+    if not raw and STAND_IN_SMTP:
+        raw = "reader@localhost"
+    if not raw:
+        raw = get_keychain_password("tech-news-briefing-to", "tech-news-briefing")
     return [addr.strip() for addr in raw.split(",") if addr.strip()]
 
 
-def markdown_to_html(md):
-    """Convert briefing markdown to simple HTML for email rendering."""
-    lines = md.split("\n")
-    html_lines = []
-    in_list = False
-
-    for line in lines:
-        stripped = line.strip()
-
-        # Skip tab markers
-        if stripped.startswith("<!-- tab:"):
-            continue
-
-        # Horizontal rules
-        if stripped == "---":
-            if in_list:
-                html_lines.append("</ul>")
-                in_list = False
-            html_lines.append('<hr style="border:none;border-top:1px solid #e4e4e7;margin:24px 0;">')
-            continue
-
-        # H1
-        if stripped.startswith("# "):
-            html_lines.append(f'<h1 style="font-size:1.5em;font-weight:700;margin:0 0 8px;">{stripped[2:]}</h1>')
-            continue
-
-        # H2
-        if stripped.startswith("## "):
-            if in_list:
-                html_lines.append("</ul>")
-                in_list = False
-            html_lines.append(f'<h2 style="font-size:1.2em;font-weight:600;margin:24px 0 12px;color:#3f3f46;">{stripped[3:]}</h2>')
-            continue
-
-        # List items with markdown links/bold
-        if stripped.startswith("- "):
-            if not in_list:
-                html_lines.append('<ul style="padding-left:20px;margin:0;">')
-                in_list = True
-            item = stripped[2:]
-            # Convert **[text](url)** to <a><strong>
-            item = re.sub(
-                r'\*\*\[(.+?)\]\((.+?)\)\*\*',
-                r'<a href="\2" style="color:#2563eb;text-decoration:none;font-weight:600;">\1</a>',
-                item
-            )
-            # Convert remaining **text** to <strong>
-            item = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', item)
-            # Convert *text* to <em>
-            item = re.sub(r'\*(.+?)\*', r'<em>\1</em>', item)
-            html_lines.append(f'<li style="margin:12px 0;line-height:1.6;">{item}</li>')
-            continue
-
-        # Bold metadata line
-        if stripped.startswith("**") and "|" in stripped:
-            text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', stripped)
-            html_lines.append(f'<p style="color:#71717a;margin:0 0 16px;">{text}</p>')
-            continue
-
-        # Italic footer lines
-        if stripped.startswith("*") and stripped.endswith("*") and not stripped.startswith("**"):
-            text = stripped.strip("*")
-            html_lines.append(f'<p style="font-size:0.85em;color:#a1a1aa;margin:4px 0;"><em>{text}</em></p>')
-            continue
-
-        # Empty lines
-        if not stripped:
-            if in_list:
-                html_lines.append("</ul>")
-                in_list = False
-            continue
-
-        # Fallback paragraph
-        html_lines.append(f'<p style="margin:8px 0;line-height:1.6;">{stripped}</p>')
-
-    if in_list:
-        html_lines.append("</ul>")
-
-    body = "\n".join(html_lines)
-    return f"""<!DOCTYPE html>
-<html>
-<head><meta charset="utf-8"></head>
-<body style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;font-size:20px;color:#18181b;max-width:680px;margin:0 auto;padding:24px;line-height:1.6;">
-{body}
-</body>
-</html>"""
-
-
 def detect_cadence(content):
     """Detect briefing cadence from content."""
     if "| Weekly |" in content:
@@ -156,51 +93,124 @@ def detect_cadence(content):
     return "Daily"
 
 
-def send_briefing(briefing_path):
-    """Read briefing and send via SMTP."""
-    path = Path(briefing_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Briefing file not found: {briefing_path}")
-
+def get_sender():
+    """(FROM email, password) for the configured SMTP server."""
+    if STAND_IN_SMTP:
+        return "briefing@localhost", ""
+    return get_smtp_credentials()
+
+
+def smtp_connector(from_email, password):
+    """Return a function that opens one logged-in SMTP session."""
+    def connect():
+        if STAND_IN_SMTP:
+            host, _, port = STAND_IN_SMTP.rpartition(":")
+            return smtplib.SMTP(host, int(port), timeout=SMTP_TIMEOUT)
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            server.ehlo()
+            server.starttls()
+            server.ehlo()
+            server.login(from_email, password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    return connect
+
+
+def build_message(path, from_email):
+    """Render a briefing file into a MIME message (no To header yet)."""
     content = path.read_text(encoding="utf-8")
     date_str = path.stem  # e.g., "2026-02-21" or "week-08-recap"
     cadence = detect_cadence(content)
-    subject = f"{cadence} Tech Briefing -- {date_str}"
-
-    from_email, password = get_smtp_credentials()
-    to_emails = get_to_emails()
 
     msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
+    msg["Subject"] = f"{cadence} Tech Briefing -- {date_str}"
     msg["From"] = f"BPG Tech News <{from_email}>"
-    msg["To"] = ", ".join(to_emails)
 
     # Plain text fallback
     text_part = MIMEText(content, "plain", "utf-8")
     msg.attach(text_part)
 
-    # HTML version with larger font
-    html_content = markdown_to_html(content)
+    # HTML version with larger font (see md_render.py; cached by content hash)
+    html_content = render_cached(content)
     html_part = MIMEText(html_content, "html", "utf-8")
     msg.attach(html_part)
+    return msg, cadence
 
-    with smtplib.SMTP("smtp.gmail.com", 587) as server:
-        server.ehlo()
-        server.starttls()
-        server.ehlo()
-        server.login(from_email, password)
-        server.send_message(msg)
-
-    print(f"{cadence} briefing emailed to {', '.join(to_emails)}", file=sys.stderr)
 
+def send_briefing(briefing_path, per_recipient=None, workers=DEFAULT_WORKERS,
+                  max_time=DEFAULT_MAX_TIME):
+    """Read a briefing, spool it for every recipient and deliver the outbox."""
+    path = Path(briefing_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Briefing file not found: {briefing_path}")
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <briefing-file-path>", file=sys.stderr)
-        sys.exit(1)
+    from_email, password = get_sender()
+    to_emails = get_to_emails()
+    msg, cadence = build_message(path, from_email)
+
+    outbox = Outbox()
+    ids = outbox.enqueue(msg, from_email, to_emails, per_recipient)
+    report = outbox.deliver(smtp_connector(from_email, password), workers, max_time)
+    states = outbox.states(ids)
+
+    sessions = f"{report.sessions} SMTP session{'s' if report.sessions != 1 else ''}"
+    if len(to_emails) <= 3:
+        recipients = ", ".join(to_emails)
+    else:
+        recipients = f"{len(to_emails)} recipients"
+    if states["sent"] == len(ids):
+        print(f"{cadence} briefing emailed to {recipients} "
+              f"({len(ids)} message{'s' if len(ids) != 1 else ''}, {sessions})", file=sys.stderr)
+        return
+    raise RuntimeError(
+        f"{cadence} briefing: {states['sent']} of {len(ids)} message(s) sent, "
+        f"{states['pending'] + states['inflight']} queued for retry, {states['failed']} failed"
+        + (f" ({report.errors[0]})" if report.errors else ""))
+
+
+def flush(workers=DEFAULT_WORKERS, max_time=DEFAULT_MAX_TIME):
+    """Deliver whatever is due in the outbox."""
+    outbox = Outbox()
+    if not outbox.counts()["pending"]:
+        print("Outbox empty", file=sys.stderr)
+        return
+    from_email, password = get_sender()
+    report = outbox.deliver(smtp_connector(from_email, password), workers, max_time)
+    print(f"Outbox: {report.sent} sent, {report.retrying} waiting for retry, "
+          f"{report.failed} failed", file=sys.stderr)
+    if report.retrying or report.failed:
+        raise RuntimeError(f"{report.retrying + report.failed} message(s) not delivered")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Email a tech news briefing")
+    parser.add_argument("briefing", nargs="?", help="Briefing Markdown file")
+    parser.add_argument("--flush", action="store_true",
+                        help="Only retry messages waiting in the outbox")
+    parser.add_argument("--per-recipient", action="store_true", default=None,
+                        help="One message per recipient (automatic above "
+                             "outbox.GROUP_MAX recipients)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent SMTP sessions")
+    parser.add_argument("--max-time", type=float, default=DEFAULT_MAX_TIME,
+                        help="Seconds to spend delivering before leaving the rest queued")
+    args = parser.parse_args()
+    if not args.flush and not args.briefing:
+        parser.error("a briefing file is required (or --flush)")
 
     try:
-        send_briefing(sys.argv[1])
+        if args.flush:
+            flush(args.workers, args.max_time)
+        else:
+            send_briefing(args.briefing, args.per_recipient, args.workers, args.max_time)
     except Exception as e:
         print(f"Email delivery failed: {e}", file=sys.stderr)
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Concurrent, incremental Spotify episode collection.
+
+SpotifyClient covers the three costs of the old one-show-at-a-time loop:
+
+  - Token: client-credentials tokens live an hour, so the token is cached
+    on disk (prefetch/spotify-token.json, mode 0600) until shortly before
+    its `expires_in` runs out, instead of re-authenticating every run.
+  - Throughput: shows are fetched concurrently on a small worker pool. A
+    429 makes every worker wait out its Retry-After before the next
+    request, so the app backs off as a whole rather than each thread
+    hammering the limit on its own.
+  - Coverage: episodes are paged (50 per request) until the look-back
+    window is covered, so a show that publishes more than a page a week is
+    no longer truncated.
+
+Per-show high-water marks live in prefetch/spotify-shows.json, together
+with the in-window episodes already seen. Spotify lists a show's episodes
+newest first, so a later run stops paging at the first episode it already
+has and merges the stored ones back in; a typical week costs one request
+per show. A run that asks for a longer window than a show's state covers
+pages that show from scratch. stored_episodes() answers from that state
+alone, without the network.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+
+from http_cache import HTTPCache, shared_cache
+from http_pool import shared_pool
+import resilience
+import telemetry
+from resilience import DeadlineExceeded, SourceUnavailable
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+TOKEN_PATH = PREFETCH_DIR / "spotify-token.json"
+STATE_PATH = PREFETCH_DIR / "spotify-shows.json"
+API_URL = "https://api.spotify.com/v1"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+PAGE_SIZE = 50          # Spotify's `limit` ceiling for show episodes
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 5
+TOKEN_MARGIN = 60       # seconds: refresh a token this long before it expires
+RETAIN_DAYS = 31        # stored episodes older than this are dropped
+DESCRIPTION_CHARS = 300
+
+
+def parse_release(ep: dict) -> datetime | None:
+    """Release date as a UTC datetime; year/month precision dates map to the first day."""
+    release = ep.get("release_date", "")
+    for fmt in ("%Y-%m-%d", "%Y-%m", "%Y"):
+        try:
+            return datetime.strptime(release, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+
+def stored_episodes(shows: dict[str, str], since: datetime,
+                    state_path: Path = STATE_PATH) -> dict[str, list[dict]]:
+    """{show_id: stored episodes released since `since`, newest first}, no requests."""
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        state = {}
+    now = datetime.now(timezone.utc)
+    return {
+        show_id: [{**ep, "show": name} for ep in state.get(show_id, {}).get("episodes", [])
+                  if (parse_release(ep) or now) >= since]
+        for show_id, name in shows.items()
+    }
+
+
+def episode_record(ep: dict, show_id: str, show_name: str) -> dict:
+    return {
+        "show": show_name,
+        "show_id": show_id,
+        "id": ep.get("id", ""),
+        "title": ep.get("name", ""),
+        "description": (ep.get("description") or "")[:DESCRIPTION_CHARS],
+        "url": ep.get("external_urls", {}).get("spotify", ""),
+        "release_date": ep.get("release_date", ""),
+        "duration_ms": ep.get("duration_ms", 0),
+    }
+
+
+class SpotifyClient:
+    """Client-credentials Spotify client with a cached token and shared 429 backoff."""
+
+    def __init__(self, client_id: str, client_secret: str, market: str = "US",
+                 max_workers: int = MAX_WORKERS, timeout: float = 15,
+                 api_url: str = API_URL, token_url: str = TOKEN_URL,
+                 token_path: Path = TOKEN_PATH, state_path: Path = STATE_PATH,
+                 cache: HTTPCache | None = None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.market = market
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.api_url = api_url
+        self.token_url = token_url
+        self.token_path = token_path
+        self.state_path = state_path
+        self.cache = cache or shared_cache(PREFETCH_DIR / "http-cache")
+        self.requests = 0
+        self._token: str | None = None
+        self._lock = threading.Lock()
+        self._resume_at = 0.0   # monotonic time before which no request may start
+
+    # -- token ---------------------------------------------------------------
+
+    def _load_token(self) -> str | None:
+        try:
+            cached = json.loads(self.token_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        if cached.get("client_id") != self.client_id:
+            return None
+        if cached.get("expires_at", 0) - TOKEN_MARGIN <= time.time():
+            return None
+        return cached.get("access_token")
+
+    def _request_token(self) -> str:
+        auth = b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        headers = {
+            "Authorization": f"Basic {auth}",
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        data = urlencode({"grant_type": "client_credentials"}).encode()
+        with shared_pool().request("POST", self.token_url, headers=headers, data=data,
+                                   timeout=self.timeout) as resp:
+            body = json.loads(resp.content().decode("utf-8"))
+        token = body["access_token"]
+
+        self.token_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.token_path.with_suffix(".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            json.dump({
+                "client_id": self.client_id,
+                "access_token": token,
+                "expires_at": time.time() + int(body.get("expires_in", 3600)),
+            }, fp)
+        os.replace(tmp, self.token_path)
+        return token
+
+    def token(self, refresh: bool = False) -> str:
+        """Return a valid access token, from disk when possible.
+
+        Raises URLError/HTTPError/KeyError if authentication fails.
+        """
+        with self._lock:
+            if refresh or not self._token:
+                self._token = (None if refresh else self._load_token()) or self._request_token()
+            return self._token
+
+    # -- requests ------------------------------------------------------------
+
+    def _wait_turn(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            resilience.sleep(delay)
+
+    def get_json(self, url: str) -> dict:
+        """GET an API URL, honouring 429 Retry-After and refreshing an expired token."""
+        refreshed = False
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self._wait_turn()
+            token = self.token()
+            with self._lock:
+                self.requests += 1
+            try:
+                body = self.cache.get(url, headers={"Authorization": f"Bearer {token}"},
+                                      timeout=self.timeout, retries=0)
+                with telemetry.parsing():
+                    return json.loads(body.decode("utf-8"))
+            except (DeadlineExceeded, SourceUnavailable):
+                raise
+            except HTTPError as e:
+                if e.code == 401 and not refreshed:
+                    refreshed = True
+                    self.token(refresh=True)
+                    continue
+                if e.code not in (429, 500, 502, 503, 504) or attempt == MAX_ATTEMPTS:
+                    raise
+                telemetry.add_retry()
+                retry_after = e.headers.get("Retry-After", "") if e.headers else ""
+                delay = float(retry_after) if retry_after.isdigit() else 2.0 * attempt
+                if e.code == 429:
+                    # Rate limits are per app: pause every worker, not just this one
+                    with self._lock:
+                        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                    print(f"  Spotify rate limited, pausing {delay:.0f}s", file=sys.stderr)
+                else:
+                    resilience.sleep(delay)
+            except (URLError, TimeoutError):
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                telemetry.add_retry()
+                resilience.sleep(2.0 * attempt)
+        raise RuntimeError("unreachable")
+
+    # -- episodes ------------------------------------------------------------
+
+    def show_episodes(self, show_id: str, show_name: str, since: datetime,
+                      known: set[str] | None = None) -> tuple[list[dict], bool]:
+        """Page a show's episodes newest-first down to `since` or a known episode.
+
+        Returns (new records, reached_known). Stops at the first episode
+        older than since or whose ID is in `known`.
+        """
+        known = known or set()
+        url = (f"{self.api_url}/shows/{show_id}/episodes?"
+               f"{urlencode({'limit': PAGE_SIZE, 'market': self.market})}")
+        records: list[dict] = []
+        while url:
+            page = self.get_json(url)
+            for ep in page.get("items") or []:
+                if not ep:
+                    continue
+                if ep.get("id") in known:
+                    return records, True
+                released = parse_release(ep)
+                if released is None:
+                    continue
+                if released < since:
+                    return records, False
+                records.append(episode_record(ep, show_id, show_name))
+            url = page.get("next")
+        return records, False
+
+    def collect(self, shows: dict[str, str], since: datetime) -> dict[str, list[dict]]:
+        """Fetch in-window episodes for every show concurrently.
+
+        Returns {show_id: records newest first}. A show that fails keeps its
+        stored episodes and logs a WARN. High-water state is saved at the end.
+        """
+        state = self._load_state()
+        now = datetime.now(timezone.utc)
+        retain_from = now - timedelta(days=RETAIN_DAYS)
+
+        def one(show_id: str, show_name: str) -> list[dict]:
+            entry = state.get(show_id, {})
+            stored = entry.get("episodes", [])
+            covered = entry.get("covered_since")
+            incremental = bool(covered) and datetime.fromisoformat(covered) <= since
+            known = {ep["id"] for ep in stored if ep.get("id")} if incremental else set()
+            if incremental and entry.get("latest_id"):
+                known.add(entry["latest_id"])
+
+            try:
+                fresh, _ = self.show_episodes(show_id, show_name, since, known)
+            except (URLError, TimeoutError, json.JSONDecodeError) as e:
+                print(f"  WARN: Failed to fetch episodes for {show_name}: {e}", file=sys.stderr)
+                fresh, incremental = [], True
+
+            merged = {ep["id"]: {**ep, "show": show_name} for ep in (stored if incremental else [])}
+            merged.update({ep["id"]: ep for ep in fresh})
+            episodes = sorted(merged.values(), key=lambda ep: ep["release_date"], reverse=True)
+
+            floor = max(datetime.fromisoformat(covered) if incremental and covered else since,
+                        retain_from)
+            kept = [ep for ep in episodes if (parse_release(ep) or now) >= floor]
+            with self._lock:
+                state[show_id] = {
+                    "latest_id": episodes[0]["id"] if episodes else entry.get("latest_id"),
+                    "latest_release": (episodes[0]["release_date"] if episodes
+                                       else entry.get("latest_release")),
+                    "covered_since": floor.isoformat(),
+                    "episodes": kept,
+                }
+            if fresh:
+                print(f"  {show_name}: {len(fresh)} new episodes", file=sys.stderr)
+            return [ep for ep in episodes if (parse_release(ep) or now) >= since]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {show_id: telemetry.submit(pool, one, show_id, name)
+                       for show_id, name in shows.items()}
+            results = {show_id: future.result() for show_id, future in futures.items()}
+
+        self._save_state(state)
+        return results
+
+    # -- state ---------------------------------------------------------------
+
+    def _load_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state: dict) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.state_path)
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""Cross-day story fingerprint index: what has already been reported or seen.
+
+Instead of having the model re-read yesterday's briefing to drop repeats,
+the pre-fetch scripts look every record up in a local SQLite index
+(~/.config/tech-news-briefing/prefetch/stories.db) and mark the ones that
+were already covered:
+
+  reported_on  date of the earliest briefing in BRIEFING_DIR that linked the
+               same URL, named the same CVE or carried a near-identical title
+  seen_on      date of the earliest earlier pre-fetch (osint-*.json,
+               news-*.json) that emitted it (the 48-hour windows overlap,
+               so most items show up twice)
+
+Registry "dedup" can drop reported items from whole sections instead.
+
+Fingerprints, each stored as an indexed key so a lookup is a B-tree probe:
+
+  - URL: url_check.normalize_url(): scheme- and www-insensitive, fragment
+    and tracking parameters (utm_*, fbclid, ...) removed, remaining query
+    sorted, trailing / dropped
+  - CVE IDs anywhere in the title, URL or record
+  - Title: a 16-value MinHash over stemmed, stopword-free words, split into
+    8 LSH bands of 2. Titles with Jaccard similarity >= 0.5 share a band
+    with ~90% probability (>= 0.7: 99.5%); candidates sharing a band are
+    confirmed against min_similarity (0.6) on their stored word sets.
+
+The index syncs incrementally: briefing Markdown (every "[title](url)" link
+and CVE ID, dated by file name) and pre-fetch files are re-read only when
+their size or mtime changes. "seen" entries older than SEEN_RETAIN_DAYS are
+pruned; briefing entries are kept.
+
+BRIEFING_DIR defaults to the archive the commands write to; override with
+TECH_NEWS_BRIEFING_DIR.
+
+Usage:
+    python3 story_index.py sync [--archive DIR] [--rebuild]
+    python3 story_index.py check [--day YYYY-MM-DD] "Title<TAB>URL" ...   (or lines on stdin)
+    python3 story_index.py stats
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from payload import expand
+from url_check import LINK, normalize_url
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+DB_PATH = PREFETCH_DIR / "stories.db"
+BRIEFING_DIR = Path(os.environ.get("TECH_NEWS_BRIEFING_DIR",
+                                   "/Users/benjamingiordano/BPG_Tech-News"))
+
+MIN_SIMILARITY = 0.6
+SEEN_RETAIN_DAYS = 30
+NUM_HASHES = 16
+BAND_ROWS = 2
+
+STOPWORDS = set("""a an and are as at be by for from has have how in into is it its new of
+on or our over says that the this to up was what when why will with you your after about
+more than just now""".split())
+
+CVE = re.compile(r"\bCVE-\d{4}-\d{4,}\b", re.I)
+WORD = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+DAY = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_HASHES)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    id     INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,           -- reported | seen
+    day    TEXT NOT NULL,           -- YYYY-MM-DD
+    ref    TEXT NOT NULL,           -- file it came from
+    title  TEXT,
+    url    TEXT,
+    cves   TEXT,                    -- space-joined CVE IDs
+    words  TEXT                     -- space-joined title word set
+);
+CREATE UNIQUE INDEX IF NOT EXISTS stories_unique ON stories (ref, status, title, url, cves);
+CREATE INDEX IF NOT EXISTS stories_day ON stories (status, day);
+
+CREATE TABLE IF NOT EXISTS fingerprints (
+    key      TEXT NOT NULL,         -- u:<url> | c:<CVE> | b<n>:<band hash>
+    story_id INTEGER NOT NULL REFERENCES stories (id) ON DELETE CASCADE,
+    PRIMARY KEY (key, story_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fingerprints_story ON fingerprints (story_id);
+
+CREATE TABLE IF NOT EXISTS files (
+    path  TEXT PRIMARY KEY,
+    size  INTEGER,
+    mtime REAL
+);
+"""
+
+
+# -- fingerprints --------------------------------------------------------------
+
+def title_words(title: str) -> set[str]:
+    """Lower-case, stopword-free, lightly stemmed words of a title."""
+    words = set()
+    for word in WORD.findall(title.lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+
+def _hash64(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")
+
+
+def minhash_bands(words: set[str]) -> list[str]:
+    """LSH band keys of the title's MinHash signature ([] for < 2 words)."""
+    if len(words) < 2:
+        return []
+    hashes = [_hash64(w) for w in words]
+    signature = [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS]
+    bands = []
+    for n in range(0, NUM_HASHES, BAND_ROWS):
+        band = hashlib.blake2b(repr(signature[n:n + BAND_ROWS]).encode(),
+                               digest_size=8).hexdigest()
+        bands.append(f"b{n // BAND_ROWS}:{band}")
+    return bands
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def fingerprints(title: str = "", url: str = "", extra: str = "") -> tuple[list[str], set[str]]:
+    """(index keys, title word set) for one story."""
+    keys = []
+    norm = normalize_url(url) if url else ""
+    if norm:
+        keys.append(f"u:{norm}")
+    keys.extend(f"c:{c.upper()}" for c in sorted(set(CVE.findall(f"{title} {url} {extra}"))))
+    words = title_words(title) if title else set()
+    keys.extend(minhash_bands(words))
+    return list(dict.fromkeys(keys)), words
+
+
+# -- store ---------------------------------------------------------------------
+
+class StoryIndex:
+    """SQLite fingerprint index of reported and seen stories. One per thread."""
+
+    def __init__(self, path: Path = DB_PATH, min_similarity: float = MIN_SIMILARITY):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.min_similarity = min_similarity
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> StoryIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    # -- writing -----------------------------------------------------------
+
+    def add(self, status: str, day: str, ref: str, title: str = "", url: str = "",
+            extra: str = "") -> None:
+        keys, words = fingerprints(title, url, extra)
+        if not keys:
+            return
+        cves = " ".join(k[2:] for k in keys if k.startswith("c:"))
+        cur = self.db.execute(
+            "INSERT OR IGNORE INTO stories (status, day, ref, title, url, cves, words) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (status, day, ref, title[:300], url, cves, " ".join(sorted(words))))
+        if cur.rowcount:
+            self.db.executemany("INSERT OR IGNORE INTO fingerprints VALUES (?, ?)",
+                                [(k, cur.lastrowid) for k in keys])
+
+    def _forget(self, ref: str) -> None:
+        self.db.execute("DELETE FROM stories WHERE ref = ?", (ref,))
+
+    def _changed(self, path: Path, ref: str) -> bool:
+        st = path.stat()
+        row = self.db.execute("SELECT size, mtime FROM files WHERE path = ?", (ref,)).fetchone()
+        if row and row["size"] == st.st_size and row["mtime"] == st.st_mtime:
+            return False
+        self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                        (ref, st.st_size, st.st_mtime))
+        return True
+
+    def index_briefing(self, path: Path, ref: str) -> int:
+        """Index every linked story and CVE in one briefing file."""
+        match = DAY.search(path.name)
+        day = match.group(1) if match else date.fromtimestamp(path.stat().st_mtime).isoformat()
+        self._forget(ref)
+        count = 0
+        for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+            links = LINK.findall(line)
+            # The first link on a story line is the story; later ones are sources
+            if links:
+                title, url = links[0]
+                self.add("reported", day, ref, re.sub(r"[*_`]", "", title), url, line)
+                count += 1
+                for _, url in links[1:]:
+                    self.add("reported", day, ref, "", url)
+            elif CVE.search(line):
+                self.add("reported", day, ref, extra=line)
+                count += 1
+        return count
+
+    def index_prefetch(self, path: Path, ref: str) -> int:
+        """Index the records of one osint-*.json payload as seen on its date."""
+        match = DAY.search(path.name)
+        if not match:
+            return 0
+        try:
+            doc = expand(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, json.JSONDecodeError):
+            return 0
+        return self.index_records(doc, match.group(1), ref)
+
+    def index_records(self, result: dict, day: str, ref: str) -> int:
+        """Index a pre-fetch result's records as seen on day, replacing ref's."""
+        self._forget(ref)
+        count = 0
+        for record in iter_records(result):
+            self.add("seen", day, ref, record_title(record), record.get("url", ""),
+                     record.get("cve_id", ""))
+            count += 1
+        return count
+
+    def sync(self, archive: Path | None = BRIEFING_DIR,
+             prefetch_dir: Path = PREFETCH_DIR) -> dict[str, int]:
+        """Index new or changed briefings and pre-fetch files; prune old entries."""
+        counts = {"briefings": 0, "prefetch": 0, "stories": 0}
+        if archive and archive.is_dir():
+            for path in sorted(archive.glob("[0-9][0-9][0-9][0-9]/**/*.md")):
+                ref = f"briefing:{path.relative_to(archive)}"
+                if self._changed(path, ref):
+                    counts["stories"] += self.index_briefing(path, ref)
+                    counts["briefings"] += 1
+        if prefetch_dir.is_dir():
+            for path in sorted(p for pattern in PREFETCH_GLOBS for p in prefetch_dir.glob(pattern)):
+                if path.name.endswith(".full.json") or not DAY.search(path.name):
+                    continue
+                # Prefer the untrimmed sidecar, which has every record
+                full = path.with_name(f"{path.stem}.full.json")
+                source = full if full.exists() else path
+                ref = f"prefetch:{path.name}"
+                if self._changed(source, ref):
+                    counts["stories"] += self.index_prefetch(source, ref)
+                    counts["prefetch"] += 1
+        cutoff = (date.today() - timedelta(days=SEEN_RETAIN_DAYS)).isoformat()
+        self.db.execute("DELETE FROM stories WHERE status = 'seen' AND day < ?", (cutoff,))
+        self.db.commit()
+        return counts
+
+    # -- lookup ------------------------------------------------------------
+
+    def lookup(self, title: str = "", url: str = "", extra: str = "",
+               before: str | None = None) -> dict[str, dict]:
+        """Earliest matching story per status ({"reported": ..., "seen": ...}).
+
+        Only stories dated before `before` (YYYY-MM-DD) count. Each match
+        is {"day", "ref", "match": "url" | "cve" | "title", "title"}.
+        """
+        keys, words = fingerprints(title, url, extra)
+        if not keys:
+            return {}
+        marks = ",".join("?" * len(keys))
+        rows = self.db.execute(
+            f"SELECT f.key, s.* FROM fingerprints f JOIN stories s ON s.id = f.story_id "
+            f"WHERE f.key IN ({marks}) AND s.day < ? ORDER BY s.day",
+            (*keys, before or "9999-12-31")).fetchall()
+        found: dict[str, dict] = {}
+        for row in rows:
+            kind = {"u": "url", "c": "cve"}.get(row["key"][0], "title")
+            if kind == "title" and jaccard(words, set(row["words"].split())) < self.min_similarity:
+                continue
+            best = found.get(row["status"])
+            # Earliest day wins; on the same day an exact URL/CVE match beats a title
+            if best is None or (row["day"], kind == "title") < (best["day"],
+                                                                 best["match"] == "title"):
+                found[row["status"]] = {"day": row["day"], "ref": row["ref"], "match": kind,
+                                        "title": row["title"]}
+        return found
+
+    def annotate(self, result: dict, day: str, drop: tuple[str, ...] = ()) -> dict[str, int]:
+        """Mark records in a fetch-osint result with reported_on / seen_on.
+
+        Records already reported in a briefing are removed from the sections
+        named in `drop`. Returns counts of marked and dropped records.
+        """
+        counts = {"reported": 0, "seen": 0, "dropped": 0}
+
+        def mark(records: list[dict], droppable: bool) -> list[dict]:
+            kept = []
+            for record in records:
+                if not isinstance(record, dict):
+                    kept.append(record)
+                    continue
+                hits = self.lookup(record_title(record), record.get("url", ""),
+                                   record.get("cve_id", ""), before=day)
+                if "reported" in hits:
+                    counts["reported"] += 1
+                    if droppable:
+                        counts["dropped"] += 1
+                        continue
+                    record["reported_on"] = hits["reported"]["day"]
+                if "seen" in hits:
+                    counts["seen"] += 1
+                    record["seen_on"] = hits["seen"]["day"]
+                kept.append(record)
+            return kept
+
+        for key, value in result.items():
+            if key not in RECORD_SECTIONS:
+                continue
+            if isinstance(value, dict):
+                result[key] = {name: mark(items, key in drop) for name, items in value.items()}
+            elif isinstance(value, list):
+                result[key] = mark(value, key in drop)
+        return counts
+
+    def stats(self) -> dict:
+        q = self.db.execute
+        return {
+            "stories": {r["status"]: r["n"] for r in q(
+                "SELECT status, COUNT(*) AS n FROM stories GROUP BY status")},
+            "fingerprints": q("SELECT COUNT(*) FROM fingerprints").fetchone()[0],
+            "files": q("SELECT COUNT(*) FROM files").fetchone()[0],
+            "days": dict(q("SELECT MIN(day) AS first, MAX(day) AS last FROM stories").fetchone()),
+        }
+
+
+RECORD_SECTIONS = ("cisa_kev", "nvd_cves", "rss_feeds", "ai_news", "breakthroughs")
+PREFETCH_GLOBS = ("osint-*.json", "news-*.json")
+
+
+def record_title(record: dict) -> str:
+    """Title to fingerprint; none for CVE records, whose KEV names are generic."""
+    if record.get("cve_id"):
+        return ""
+    return record.get("title") or record.get("name") or ""
+
+
+def iter_records(result: dict):
+    for key in RECORD_SECTIONS:
+        value = result.get(key)
+        if isinstance(value, dict):
+            for items in value.values():
+                yield from (r for r in items if isinstance(r, dict))
+        elif isinstance(value, list):
+            yield from (r for r in value if isinstance(r, dict))
+
+
+def mark_repeats(result: dict, target_date: str, settings: dict,
+                 prefetch_dir: Path = PREFETCH_DIR) -> None:
+    """Mark (or drop) records already reported in a briefing or seen in a pre-fetch.
+
+    The pre-fetch scripts call this on their result before writing it;
+    settings is their registry's "dedup" block.
+    """
+    mark_repeats_days({target_date: result}, settings, prefetch_dir)
+
+
+def mark_repeats_days(results: dict[str, dict], settings: dict,
+                      prefetch_dir: Path = PREFETCH_DIR, name: str | None = None) -> None:
+    """mark_repeats() for several days' results ({day: result}), in day order.
+
+    With name (a backfill's "osint"), each day's records are indexed as seen
+    in name-<day>.json before the next day is marked, so the days of one
+    backfill see each other as earlier pre-fetches.
+    """
+    if not settings.get("enabled", True):
+        return
+    started = time.perf_counter()
+    counts = {"reported": 0, "seen": 0, "dropped": 0}
+    drop = tuple(settings.get("drop_reported", ()))
+    try:
+        with StoryIndex(prefetch_dir / "stories.db",
+                        float(settings.get("min_similarity", MIN_SIMILARITY))) as index:
+            synced = index.sync(Path(settings.get("archive") or BRIEFING_DIR), prefetch_dir)
+            for day in sorted(results):
+                for key, n in index.annotate(results[day], day, drop).items():
+                    counts[key] += n
+                if name:
+                    index.index_records(results[day], day, f"prefetch:{name}-{day}.json")
+    except (sqlite3.Error, OSError) as e:
+        print(f"  WARN: Story index unavailable, repeats not marked: {e}", file=sys.stderr)
+        return
+    print(f"Repeats: {counts['reported']} already reported ({counts['dropped']} dropped), "
+          f"{counts['seen']} seen in earlier pre-fetches; indexed {synced['briefings']} "
+          f"briefings, {synced['prefetch']} pre-fetch files "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Cross-day story fingerprint index")
+    parser.add_argument("--db", help="Index path", type=Path, default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync", help="Index new or changed briefings and pre-fetch files")
+    sync.add_argument("--archive", type=Path, default=BRIEFING_DIR, help="Briefing archive")
+    sync.add_argument("--rebuild", action="store_true", help="Drop the index and start over")
+    check = sub.add_parser("check", help="Look up stories (\"title<TAB>url\" per argument or stdin line)")
+    check.add_argument("stories", nargs="*")
+    check.add_argument("--day", default=date.today().isoformat(),
+                       help="Only match stories dated before this day")
+    sub.add_parser("stats", help="Index size")
+    args = parser.parse_args()
+
+    if args.command == "sync" and args.rebuild:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{args.db}{suffix}").unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    with StoryIndex(args.db) as index:
+        if args.command == "sync":
+            counts = index.sync(args.archive)
+            print(f"Indexed {counts['stories']} stories from {counts['briefings']} briefings "
+                  f"and {counts['prefetch']} pre-fetch files", file=sys.stderr)
+        elif args.command == "check":
+            lines = args.stories or [line.rstrip("\n") for line in sys.stdin if line.strip()]
+            results = []
+            for line in lines:
+                title, _, url = line.partition("\t")
+                if not url and title.startswith(("http://", "https://")):
+                    title, url = "", title
+                results.append({"title": title, "url": url,
+                                **index.lookup(title, url, before=args.day)})
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            print(json.dumps(index.stats(), indent=2))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{args.command} took {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
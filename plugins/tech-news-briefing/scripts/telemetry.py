@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Per-source fetch telemetry for the pre-fetch scripts.
+
+A fetch runs inside `with recorder.source("nvd") as stats:`; every HTTP
+request made under it — including ones on worker threads started with
+telemetry.submit() — is attributed to that source by http_pool.py, which
+reports DNS, TCP connect, TLS, time-to-first-byte and total time, wire
+bytes and status. Retries are counted by whoever retries (the pool, the
+NVD and Spotify clients). Callers add parse time and item counts:
+
+    with recorder.source("sans-isc") as stats:
+        with stats.parsing():
+            items = parse(...)
+        stats.items = len(items)
+
+Latencies are summed over the source's requests, so for sources that fetch
+pages in parallel they can exceed wall_ms (the source's elapsed time).
+
+Each script puts Recorder.snapshot() into its output JSON as `fetch_stats`
+and calls Recorder.export(), which appends one line per source to
+prefetch/metrics/fetch-metrics.jsonl and rewrites a Prometheus textfile
+(prefetch/metrics/tech_news_prefetch_<script>.prom) for node_exporter's
+textfile collector.
+
+Usage: python3 telemetry.py [--days 28]   # p50/p95 wall time per source
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+METRICS_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch" / "metrics"
+METRICS_LOG = "fetch-metrics.jsonl"
+PROM_PREFIX = "tech_news_prefetch"
+
+_current: contextvars.ContextVar[SourceStats | None] = contextvars.ContextVar(
+    "telemetry_source", default=None)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class SourceStats:
+    """Counters for one source within one run. Thread-safe."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.bytes = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.statuses: Counter[int] = Counter()
+        self.items: int | None = None
+        self.dns = self.connect = self.tls = self.ttfb = self.total = 0.0
+        self.parse = 0.0
+        self.wall = 0.0
+        # Set by resilience.Guard when the source served last-good data
+        self.breaker: str | None = None
+        self.stale_as_of: str | None = None
+        self.stale_reason: str | None = None
+        self._lock = threading.Lock()
+
+    def record_request(self, status: int, nbytes: int, dns: float = 0.0, connect: float = 0.0,
+                       tls: float = 0.0, ttfb: float = 0.0, total: float = 0.0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.statuses[status] += 1
+            if status == 304:
+                self.not_modified += 1
+            elif status == 0 or status >= 400:
+                self.errors += 1
+            self.dns += dns
+            self.connect += connect
+            self.tls += tls
+            self.ttfb += ttfb
+            self.total += total
+
+    def add_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def add_hedge(self) -> None:
+        with self._lock:
+            self.hedges += 1
+
+    def succeeded(self) -> bool:
+        """True if any request got a 2xx or 304."""
+        with self._lock:
+            return any(200 <= status < 300 or status == 304 for status in self.statuses)
+
+    def add_parse(self, seconds: float) -> None:
+        with self._lock:
+            self.parse += seconds
+
+    @contextmanager
+    def parsing(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_parse(time.perf_counter() - started)
+
+    def timed_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Wrap a streaming body so time spent consuming it counts as parse time.
+
+        Time spent waiting for the next chunk is excluded.
+        """
+        for chunk in chunks:
+            resumed = time.perf_counter()
+            yield chunk
+            self.add_parse(time.perf_counter() - resumed)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            extra = {}
+            if self.stale_as_of is not None:
+                extra = {"stale_as_of": self.stale_as_of, "stale_reason": self.stale_reason}
+            if self.breaker is not None:
+                extra["breaker"] = self.breaker
+            return {
+                "wall_ms": _ms(self.wall),
+                "requests": self.requests,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "status": {str(k): v for k, v in sorted(self.statuses.items())},
+                "not_modified": self.not_modified,
+                "errors": self.errors,
+                "bytes": self.bytes,
+                "dns_ms": _ms(self.dns),
+                "connect_ms": _ms(self.connect),
+                "tls_ms": _ms(self.tls),
+                "ttfb_ms": _ms(self.ttfb),
+                "total_ms": _ms(self.total),
+                "parse_ms": _ms(self.parse),
+                "items": self.items,
+                "stale": self.stale_as_of is not None,
+                **extra,
+            }
+
+
+class Recorder:
+    """All sources' stats for one script run."""
+
+    def __init__(self, script: str):
+        self.script = script
+        self.started = datetime.now(timezone.utc)
+        self.sources: dict[str, SourceStats] = {}
+        self._lock = threading.Lock()
+
+    def stats(self, name: str) -> SourceStats:
+        with self._lock:
+            if name not in self.sources:
+                self.sources[name] = SourceStats(name)
+            return self.sources[name]
+
+    @contextmanager
+    def source(self, name: str) -> Iterator[SourceStats]:
+        """Attribute everything fetched in this block (and its submit()ed work) to name."""
+        stats = self.stats(name)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall += time.perf_counter() - started
+            _current.reset(token)
+
+    def snapshot(self) -> dict:
+        """The `fetch_stats` block for the output JSON."""
+        with self._lock:
+            sources = dict(self.sources)
+        return {name: s.as_dict() for name, s in sorted(sources.items())}
+
+    def export(self, target_date: str, metrics_dir: Path = METRICS_DIR) -> None:
+        """Append this run to the JSONL log and rewrite the Prometheus textfile."""
+        snapshot = self.snapshot()
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        run_at = self.started.isoformat()
+        with open(metrics_dir / METRICS_LOG, "a", encoding="utf-8") as log:
+            for name, stats in snapshot.items():
+                log.write(json.dumps({"run_at": run_at, "script": self.script,
+                                      "date": target_date, "source": name, **stats}) + "\n")
+
+        lines = []
+        gauges = [
+            ("wall_seconds", "wall_ms", 0.001, "Elapsed time fetching the source"),
+            ("ttfb_seconds", "ttfb_ms", 0.001, "Summed time to first byte"),
+            ("dns_seconds", "dns_ms", 0.001, "Summed DNS resolution time"),
+            ("connect_seconds", "connect_ms", 0.001, "Summed TCP connect time"),
+            ("tls_seconds", "tls_ms", 0.001, "Summed TLS handshake time"),
+            ("parse_seconds", "parse_ms", 0.001, "Time spent parsing responses"),
+            ("bytes", "bytes", 1, "Wire bytes received"),
+            ("requests", "requests", 1, "HTTP requests made"),
+            ("retries", "retries", 1, "Retried requests"),
+            ("hedges", "hedges", 1, "Hedged (duplicated) slow requests"),
+            ("errors", "errors", 1, "Failed requests"),
+            ("items", "items", 1, "Items produced"),
+            ("stale", "stale", 1, "1 if last-good data was served instead of a fresh fetch"),
+        ]
+        for metric, key, factor, help_text in gauges:
+            name = f"{PROM_PREFIX}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for source, stats in snapshot.items():
+                value = stats.get(key)
+                if value is None:
+                    continue
+                lines.append(f'{name}{{script="{self.script}",source="{source}"}} '
+                             f"{round(float(value) * factor, 6)}")
+        name = f"{PROM_PREFIX}_last_run_timestamp_seconds"
+        lines += [f"# HELP {name} When the script last ran", f"# TYPE {name} gauge",
+                  f'{name}{{script="{self.script}"}} {int(self.started.timestamp())}']
+
+        prom = metrics_dir / f"{PROM_PREFIX}_{self.script}.prom"
+        tmp = prom.with_suffix(".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, prom)
+
+
+def current() -> SourceStats | None:
+    """The source the calling context is fetching for, if any."""
+    return _current.get()
+
+
+def add_retry() -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.add_retry()
+
+
+def add_hedge() -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.add_hedge()
+
+
+@contextmanager
+def parsing() -> Iterator[None]:
+    """Count the block as parse time for the current source, if any."""
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.add_parse(time.perf_counter() - started)
+
+
+def submit(executor: Executor, fn, *args, **kwargs) -> Future:
+    """executor.submit() that carries the current source into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(days: int, metrics_dir: Path = METRICS_DIR) -> dict[str, dict]:
+    """p50/p95 wall and TTFB per script/source over the last `days` days of runs."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    walls: dict[str, list[float]] = defaultdict(list)
+    ttfbs: dict[str, list[float]] = defaultdict(list)
+    errors: Counter[str] = Counter()
+    try:
+        log = open(metrics_dir / METRICS_LOG, encoding="utf-8")
+    except OSError:
+        return {}
+    with log:
+        for line in log:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("run_at", "") < since:
+                continue
+            key = f"{row.get('script')}/{row.get('source')}"
+            walls[key].append(row.get("wall_ms", 0.0))
+            ttfbs[key].append(row.get("ttfb_ms", 0.0))
+            errors[key] += int(bool(row.get("errors")))
+    return {
+        key: {
+            "runs": len(values),
+            "wall_p50_ms": percentile(values, 50),
+            "wall_p95_ms": percentile(values, 95),
+            "ttfb_p95_ms": percentile(ttfbs[key], 95),
+            "runs_with_errors": errors[key],
+        }
+        for key, values in sorted(walls.items())
+    }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize pre-fetch telemetry")
+    parser.add_argument("--days", type=int, default=28, help="Look back N days of runs")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    summary = summarize(args.days)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    if not summary:
+        print(f"No telemetry in {METRICS_DIR / METRICS_LOG}", file=sys.stderr)
+        return
+    print(f"{'source':<28} {'runs':>5} {'p50 wall':>10} {'p95 wall':>10} {'p95 ttfb':>10} {'errored':>8}")
+    for key, row in summary.items():
+        print(f"{key:<28} {row['runs']:>5} {row['wall_p50_ms']:>8.0f}ms {row['wall_p95_ms']:>8.0f}ms "
+              f"{row['ttfb_p95_ms']:>8.0f}ms {row['runs_with_errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""Bulk URL canonicalization and validation with a persistent verdict cache.
+
+The research skill's URL rules reject homepage and section links, and every
+bad link the model notices costs it another search. This checks links
+locally instead, hundreds in a couple of seconds: on the pre-fetch records
+before the model sees them (fetch-news.py, fetch-osint.py), on the merged
+briefing before it is saved and emailed (briefing_tabs.py), and from the
+command line on any pre-fetch file or briefing.
+
+For each link:
+
+  canonical  fetchable form: fragment and tracking parameters (utm_*,
+             fbclid, ...) removed, host lower-cased, default port dropped;
+             after a check, the URL its redirects end at, cleaned the same way
+  kind       "root" for a bare domain, "section" for a category or listing
+             path (/security/, /ai/, /tag/x, /category/x/, /page/2,
+             /2026/10/), "article" otherwise. Decided from the path alone
+             (classify()), so it needs no request and never varies.
+  status     "ok"; "dead" for 404/410 or a host name that does not exist;
+             "blocked" for 401/403/451 (bot walls: the page exists);
+             "error" for timeouts, 429, 5xx and resolver failures;
+             "unchecked" offline or past the run's deadline
+
+A missing host name only counts as dead when the resolver is known to work
+in the same run: another link got an HTTP answer, or RESOLVER_CANARY
+resolves. Offline, macOS answers every lookup with EAI_NONAME too, so
+otherwise it is an error.
+
+A link is bad when its kind is not "article" or it is dead; a redirect
+that lands on a homepage (a soft 404) is bad too. Transient errors are not.
+
+Checks send HEAD, then GET (first byte only) when HEAD is refused or
+fails, with redirects followed and no retries. Links are grouped by host
+into at most `per_host` lanes, `max_workers` lanes at once.
+
+Verdicts are cached in prefetch/url-verdicts.json by normalized URL
+(normalize_url(), also the story index's URL fingerprint): ok and blocked
+links for `ttl_days`, dead ones for `dead_hours`, errors and missing hosts
+for `error_hours`.
+
+Settings come from the registry's "links" block:
+
+  {"enabled": true, "per_host": 4, "max_workers": 32, "timeout": 8,
+   "ttl_days": 7, "dead_hours": 24, "error_hours": 1}
+
+Usage:
+    python3 url_check.py FILE|URL ... [--fix] [--offline]
+        FILE is a briefing (.md: every [title](url) link; the first link of
+        each list item is the story's and must be an article) or a
+        pre-fetch file (.json, either format: every "url" field). Prints
+        the bad links and exits 1 if there are any. --fix rewrites
+        Markdown links to their canonical URL in place.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from fetch_engine import host_lanes
+from http_pool import USER_AGENT, shared_pool
+from payload import Section, expand
+from resilience import DeadlineExceeded
+import telemetry
+
+PREFETCH_DIR = Path.home() / ".config" / "tech-news-briefing" / "prefetch"
+VERDICTS_PATH = PREFETCH_DIR / "url-verdicts.json"
+DEFAULT_PER_HOST = 4
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_TIMEOUT = 8
+DEFAULT_TTL_DAYS = 7
+DEFAULT_DEAD_HOURS = 24
+DEFAULT_ERROR_HOURS = 1
+
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+                   "ref", "ref_src", "ref_url", "cmpid", "ncid", "guccounter",
+                   "__twitter_impression", "sr_share", "taid", "spm"}
+DEAD_CODES = {404, 410}
+BLOCKED_CODES = {401, 403, 451}
+# Resolver answers meaning the name does not exist; others (EAI_AGAIN) are transient
+DEAD_DNS_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+RESOLVER_CANARY = "example.com"    # always resolves while DNS works
+LINK = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+
+# Path segments that name a listing, not an article: /tag/x, /category/x/, /page/2
+LISTING = {"tag", "tags", "category", "categories", "topic", "topics", "author", "authors",
+           "section", "sections", "archive", "archives", "search", "page", "label", "labels",
+           "series", "collection", "collections"}
+# Segments that, when they are all a path has, make it a section front
+SECTION_WORDS = {
+    "news", "blog", "blogs", "articles", "posts", "stories", "latest", "home", "index",
+    "all", "feed", "rss", "updates", "announcements", "newsroom", "press", "insights",
+    "features", "reviews", "opinion", "analysis", "research", "resources", "trending",
+    "security", "cybersecurity", "threats", "vulnerabilities", "malware", "privacy",
+    "ai", "artificial-intelligence", "ai-artificial-intelligence", "machine-learning", "ml",
+    "llm", "genai", "cyber-security", "data-science",
+    "tech", "technology", "science", "business", "world", "policy", "gadgets", "apps",
+    "startups", "enterprise", "cloud", "hardware", "software", "gaming", "podcasts",
+    "podcast", "videos", "video", "events", "topics", "categories", "tags", "sections",
+    "archive", "archives"}
+INDEX_FILES = {"index.html", "index.htm", "index.php", "index.shtml", "default.aspx"}
+LOCALE = re.compile(r"^[a-z]{2}(?:[-_][a-z]{2})?$")
+DATE_PART = re.compile(r"^(?:(?:19|20)\d{2}|\d{1,2})$")
+
+
+# -- canonical form and classification ------------------------------------------
+
+def _tracking(key: str) -> bool:
+    key = key.lower()
+    return key.startswith("utm_") or key in TRACKING_PARAMS
+
+
+def normalize_url(url: str) -> str:
+    """A comparison key for a URL (not a fetchable URL)."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return ""
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if not host:
+        return ""
+    port = f":{parts.port}" if parts.port and parts.port not in (80, 443) else ""
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not _tracking(k))
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    return f"{host}{port}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def canonical_url(url: str) -> str:
+    """The fetchable form of url: no fragment or tracking parameters ("" if not http(s))."""
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return ""
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return ""
+    host = parts.hostname.lower()
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not _tracking(k)]
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def classify(url: str) -> str:
+    """"root", "section" or "article", from the URL's path and query alone."""
+    parts = urlsplit(url)
+    segments = [s.lower() for s in parts.path.split("/") if s]
+    if segments and segments[-1] in INDEX_FILES:
+        segments.pop()
+    if not segments:
+        return "article" if parts.query else "root"
+    for i, segment in enumerate(segments):
+        if segment in LISTING and len(segments) - i <= 2:
+            return "section"
+    if parts.query:
+        return "article"
+    if all(s in SECTION_WORDS or LOCALE.match(s) or DATE_PART.match(s) for s in segments):
+        return "section"
+    return "article"
+
+
+# -- verdicts ---------------------------------------------------------------------
+
+@dataclass
+class Verdict:
+    """What is known about one link."""
+    url: str
+    canonical: str
+    kind: str                  # article | root | section
+    status: str                # ok | dead | blocked | error | unchecked
+    code: int | None = None
+    reason: str = ""
+    checked: float = 0.0
+
+    @property
+    def bad(self) -> bool:
+        return self.kind != "article" or self.status == "dead"
+
+    @property
+    def label(self) -> str:
+        """One word for reports: dead, homepage, section, or the status."""
+        if self.kind == "root":
+            return "homepage"
+        if self.kind == "section":
+            return "section"
+        return self.status
+
+
+def probe(url: str, timeout: float = DEFAULT_TIMEOUT) -> tuple[str, int | None, str, str]:
+    """Check one link: (status, HTTP code, final URL, reason)."""
+    headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,*/*"}
+    refused: HTTPError | None = None
+    for method in ("HEAD", "GET"):
+        try:
+            with shared_pool().request(method, url, headers=headers, timeout=timeout,
+                                       retries=0) as resp:
+                # A GET only needs its status line; the connection is not reused
+                resp.read(1 if method == "GET" else None)
+                return "ok", resp.status, resp.url, ""
+        except HTTPError as e:
+            refused = e
+        except DeadlineExceeded:
+            return "unchecked", None, url, "deadline"
+        except (URLError, TimeoutError, OSError) as e:
+            reason = getattr(e, "reason", e)
+            if isinstance(reason, socket.gaierror) and reason.errno in DEAD_DNS_ERRORS:
+                return "dead", None, url, f"host not found ({reason})"
+            return "error", None, url, str(reason)
+    code = refused.code
+    status = "dead" if code in DEAD_CODES else "blocked" if code in BLOCKED_CODES else "error"
+    return status, code, refused.filename or url, f"HTTP {code}"
+
+
+def resolver_works(host: str = RESOLVER_CANARY) -> bool:
+    """Whether DNS lookups succeed at all (a host name that surely exists resolves)."""
+    try:
+        socket.getaddrinfo(host, 443)
+        return True
+    except OSError:
+        return False
+
+
+_shared: dict[Path, "LinkChecker"] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_checker(path: Path = VERDICTS_PATH) -> LinkChecker:
+    """Process-wide checker for a verdict file (the collectors in prefetch.py share one)."""
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = LinkChecker(path)
+        return _shared[path]
+
+
+class LinkChecker:
+    """Concurrent link checks behind a TTL'd verdict cache."""
+
+    def __init__(self, path: Path = VERDICTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cache: dict[str, dict] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self._cache = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self._cache = {}
+
+    @staticmethod
+    def _ttl(entry: dict, settings: dict) -> float:
+        # A dead verdict without an HTTP code is a missing host: DNS may just be down
+        if entry["status"] == "dead" and entry.get("code") is not None:
+            return float(settings.get("dead_hours", DEFAULT_DEAD_HOURS)) * 3600
+        if entry["status"] in ("dead", "error"):
+            return float(settings.get("error_hours", DEFAULT_ERROR_HOURS)) * 3600
+        return float(settings.get("ttl_days", DEFAULT_TTL_DAYS)) * 86400
+
+    def _cached(self, url: str, settings: dict) -> Verdict | None:
+        with self._lock:
+            self._load()
+            entry = self._cache.get(normalize_url(url))
+        if not entry or time.time() - entry["checked"] >= self._ttl(entry, settings):
+            return None
+        return Verdict(**{**entry, "url": url})
+
+    def _store(self, verdict: Verdict) -> None:
+        with self._lock:
+            self._load()
+            self._cache[normalize_url(verdict.url)] = asdict(verdict)
+
+    def check(self, urls: list[str], settings: dict | None = None,
+              offline: bool = False) -> dict[str, Verdict]:
+        """Verdicts for urls (non-http(s) ones are left out), fetching what is not cached.
+
+        offline=True makes no requests: uncached links come back "unchecked".
+        """
+        settings = settings or {}
+        verdicts: dict[str, Verdict] = {}
+        missing: list[str] = []
+        for url in dict.fromkeys(urls):
+            canonical = canonical_url(url)
+            if not canonical:
+                continue
+            kind = classify(canonical)
+            if kind != "article":
+                verdicts[url] = Verdict(url, canonical, kind, "unchecked")
+            elif (cached := self._cached(url, settings)) is not None:
+                verdicts[url] = cached
+            elif offline:
+                verdicts[url] = Verdict(url, canonical, kind, "unchecked")
+            else:
+                missing.append(url)
+        with self._lock:
+            self.hits += sum(1 for v in verdicts.values() if v.checked)
+            self.misses += len(missing)
+
+        timeout = float(settings.get("timeout", DEFAULT_TIMEOUT))
+
+        probed: list[Verdict] = []
+
+        def run_lane(lane: list[str]) -> None:
+            for url in lane:
+                canonical = canonical_url(url)
+                status, code, final, reason = probe(canonical, timeout)
+                final = canonical_url(final) or canonical
+                verdict = Verdict(url, final, classify(final), status, code, reason, time.time())
+                with self._lock:
+                    probed.append(verdict)
+
+        if missing:
+            lanes = host_lanes(missing, int(settings.get("per_host", DEFAULT_PER_HOST)),
+                               host=lambda url: urlsplit(url).netloc.lower())
+            workers = min(int(settings.get("max_workers", DEFAULT_MAX_WORKERS)), len(lanes))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for future in [telemetry.submit(pool, run_lane, lane) for lane in lanes]:
+                    future.result()
+
+        unresolved = [v for v in probed if v.status == "dead" and v.code is None]
+        if unresolved and not any(v.code is not None for v in probed) and not resolver_works():
+            print(f"  WARN: DNS is not resolving; {len(unresolved)} links left unverified",
+                  file=sys.stderr)
+            for verdict in unresolved:
+                verdict.status, verdict.reason = "error", f"resolver down ({verdict.reason})"
+        for verdict in probed:
+            if verdict.status != "unchecked":
+                self._store(verdict)
+            verdicts[verdict.url] = verdict
+        return verdicts
+
+    def save(self, settings: dict | None = None) -> None:
+        """Drop expired verdicts and write the cache."""
+        settings = settings or {}
+        with self._lock:
+            if not self._loaded:
+                return
+            now = time.time()
+            self._cache = {k: e for k, e in self._cache.items()
+                           if now - e["checked"] < self._ttl(e, settings)}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._cache), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def report(self, label: str = "Link checks") -> None:
+        """Print cached/checked counters to stderr."""
+        print(f"{label}: {self.hits} cached, {self.misses} checked", file=sys.stderr)
+
+
+# -- pre-fetch records ------------------------------------------------------------
+
+def check_links(result: dict, sections: dict[str, Section], settings: dict | None = None,
+                offline: bool = False) -> int:
+    """The collectors' link stage: canonical URLs for result's story records, bad ones dropped.
+
+    Returns the number of links checked.
+    """
+    return check_links_days([result], sections, settings, offline)
+
+
+def check_links_days(results: list[dict], sections: dict[str, Section],
+                     settings: dict | None = None, offline: bool = False) -> int:
+    """check_links() for several results at once (backfill)."""
+    settings = settings or {}
+    if not settings.get("enabled", True):
+        return 0
+    tables: list[list[dict]] = []
+    for result in results:
+        for key, section in sections.items():
+            value = result.get(key)
+            if section.key != "url":
+                continue
+            if isinstance(value, dict):
+                tables.extend(value.values())
+            elif isinstance(value, list):
+                tables.append(value)
+
+    started = time.monotonic()
+    urls = [r["url"] for table in tables for r in table if isinstance(r.get("url"), str)]
+    verdicts = shared_checker().check(urls, settings, offline)
+    dropped: Counter[str] = Counter()
+    rewritten = 0
+    for table in tables:
+        kept = []
+        for record in table:
+            verdict = verdicts.get(record.get("url"))
+            if verdict is not None and verdict.bad:
+                dropped[verdict.label] += 1
+                continue
+            if verdict is not None and verdict.canonical != record["url"]:
+                record["url"] = verdict.canonical
+                rewritten += 1
+            kept.append(record)
+        table[:] = kept
+    detail = ", ".join(f"{n} {label}" for label, n in sorted(dropped.items()))
+    print(f"Links: {len(verdicts)} checked in {time.monotonic() - started:.1f}s, "
+          f"{rewritten} rewritten to canonical, dropped {sum(dropped.values())}"
+          + (f" ({detail})" if detail else ""), file=sys.stderr)
+    return len(verdicts)
+
+
+# -- files ------------------------------------------------------------------------
+
+def markdown_links(text: str) -> list[tuple[str, bool]]:
+    """Every link in a briefing as (url, is the story link of a list item)."""
+    # Imported here: archive_index imports story_index, which imports this module
+    from archive_index import ITEM
+
+    links = []
+    for line in text.splitlines():
+        story = ITEM.match(line) is not None
+        for i, (label, url) in enumerate(LINK.findall(line)):
+            # A list item's first link is its story's, unless it is only a source credit
+            links.append((url, story and i == 0 and label.strip().lower() != "source"))
+    return links
+
+
+def json_urls(value) -> list[str]:
+    """Every "url" field in a pre-fetch document (compact tables expanded)."""
+    if isinstance(value, dict):
+        urls = [value["url"]] if isinstance(value.get("url"), str) else []
+        return urls + [u for v in value.values() for u in json_urls(v)]
+    if isinstance(value, list):
+        return [u for v in value for u in json_urls(v)]
+    return []
+
+
+def check_file(path: Path, fix: bool = False, offline: bool = False,
+               checker: LinkChecker | None = None) -> list[Verdict]:
+    """Check every link in a briefing or pre-fetch file; returns the bad ones.
+
+    In a briefing only list items' story links must be articles; other
+    links (e.g. a source's home page) only need to be alive. fix=True
+    rewrites a briefing's links to their canonical URL.
+    """
+    checker = checker or shared_checker()
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        links = [(url, True) for url in json_urls(expand(json.loads(text)))]
+    else:
+        links = markdown_links(text)
+    verdicts = checker.check([url for url, _ in links], offline=offline)
+
+    bad: dict[str, Verdict] = {}
+    for url, story in links:
+        verdict = verdicts.get(url)
+        if verdict is not None and (verdict.status == "dead" or (story and verdict.bad)):
+            bad[url] = verdict
+    if fix and path.suffix != ".json":
+        fixed = LINK.sub(lambda m: f"[{m.group(1)}]("
+                         f"{verdicts[m.group(2)].canonical if m.group(2) in verdicts else m.group(2)})",
+                         text)
+        if fixed != text:
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(fixed, encoding="utf-8")
+            os.replace(tmp, path)
+            print(f"  Rewrote links in {path} to their canonical URLs", file=sys.stderr)
+    return list(bad.values())
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Canonicalize and validate links")
+    parser.add_argument("targets", nargs="+", help="Briefing (.md) or pre-fetch (.json) files, "
+                                                   "or URLs")
+    parser.add_argument("--fix", action="store_true",
+                        help="Rewrite briefing links to their canonical URLs in place")
+    parser.add_argument("--offline", action="store_true",
+                        help="No requests: classify, and use cached verdicts only")
+    args = parser.parse_args()
+
+    checker = shared_checker()
+    started = time.monotonic()
+    bad: list[Verdict] = []
+    urls = [t for t in args.targets if t.startswith(("http://", "https://"))]
+    if urls:
+        verdicts = checker.check(urls, offline=args.offline)
+        for url in urls:
+            verdict = verdicts.get(url)
+            if verdict is not None:
+                print(f"{verdict.label:<9} {url}"
+                      + (f" -> {verdict.canonical}" if verdict.canonical != url else "")
+                      + (f" ({verdict.reason})" if verdict.reason else ""))
+                if verdict.bad:
+                    bad.append(verdict)
+    for target in args.targets:
+        if target in urls:
+            continue
+        path = Path(target)
+        if not path.is_file():
+            parser.error(f"not a file or URL: {target}")
+        found = check_file(path, args.fix, args.offline, checker)
+        for verdict in found:
+            print(f"{verdict.label:<9} {verdict.url}"
+                  + (f" ({verdict.reason})" if verdict.reason else "") + f"  [{path.name}]")
+        bad += found
+    checker.save()
+    print(f"{len(bad)} bad links ({checker.misses} checked, {checker.hits} cached verdicts) in "
+          f"{time.monotonic() - started:.1f}s", file=sys.stderr)
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
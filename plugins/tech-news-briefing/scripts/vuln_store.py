@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""Local SQLite vulnerability store kept current from NVD and CISA KEV.
+
+Instead of re-querying NVD and KEV from scratch each run, fetch-osint.py
+syncs deltas into ~/.config/tech-news-briefing/prefetch/vulns.db and builds
+the daily JSON from indexed queries:
+
+  - NVD: every CVE modified since the last sync, fetched by
+    lastModStartDate/lastModEndDate windows (<= 120 days each, NVD's cap)
+  - KEV: the streamed catalog, skipped entirely when dateReleased/count
+    match the last sync; changed entries get changed_at, new ones first_seen
+
+A pre-fetch day's KEV section is the delta since the previous day's run:
+kev_delta_start() keeps where each day's delta ends in sync_state, so an
+addition is reported on one day only and reruns of a day repeat it.
+
+Tables are indexed by cve_id, vendor/product, date and score, so 7- and
+30-day look-backs for the weekly and monthly cadences are millisecond
+queries that never re-download history. For a backfill (fetch-osint.py
+--from/--to), backfill_nvd() pages every CVE published in the whole range
+once, and each day's window is then a bounded query (`until`).
+
+The nvd table doubles as a per-CVE detail cache for enrichment: every KEV
+entry is joined with its NVD CVSS/CWE/CPE data. enrich_kev() looks up only
+KEV CVEs that are missing or older than the TTL — in bulk through NVD's
+hasKev filter when many are due, by cveId otherwise — and records misses
+too, so no CVE is looked up twice within the TTL.
+
+Usage: python3 vuln_store.py [--days 7] [--min-cvss 8.0] [--db PATH]
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from kev import CatalogStream, entry_digest, first_day
+from nvd import NVD_DATE_FORMAT, NVDClient
+
+DB_PATH = Path.home() / ".config" / "tech-news-briefing" / "prefetch" / "vulns.db"
+NVD_MAX_RANGE = timedelta(days=120)
+SYNC_OVERLAP = timedelta(hours=1)
+DETAIL_TTL_DAYS = 7
+BULK_THRESHOLD = 25     # more stale KEV CVEs than this -> one hasKev bulk query
+MAX_CPES = 10
+LIST_COLUMNS = ("cwes", "cpes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nvd (
+    cve_id        TEXT PRIMARY KEY,
+    description   TEXT,
+    cvss_score    REAL,
+    cvss_severity TEXT,
+    vendor        TEXT,
+    product       TEXT,
+    published     TEXT,
+    last_modified TEXT,
+    cwes          TEXT,
+    cpes          TEXT,
+    fetched_at    TEXT
+);
+CREATE INDEX IF NOT EXISTS nvd_published ON nvd (published);
+CREATE INDEX IF NOT EXISTS nvd_score ON nvd (cvss_score);
+CREATE INDEX IF NOT EXISTS nvd_vendor_product ON nvd (vendor, product);
+CREATE INDEX IF NOT EXISTS nvd_last_modified ON nvd (last_modified);
+
+CREATE TABLE IF NOT EXISTS kev (
+    cve_id           TEXT PRIMARY KEY,
+    vendor           TEXT,
+    product          TEXT,
+    name             TEXT,
+    description      TEXT,
+    date_added       TEXT,
+    due_date         TEXT,
+    known_ransomware TEXT,
+    digest           TEXT,
+    first_seen       TEXT,
+    changed_at       TEXT
+);
+CREATE INDEX IF NOT EXISTS kev_date_added ON kev (date_added);
+CREATE INDEX IF NOT EXISTS kev_vendor_product ON kev (vendor, product);
+CREATE INDEX IF NOT EXISTS kev_first_seen ON kev (first_seen);
+CREATE INDEX IF NOT EXISTS kev_changed_at ON kev (changed_at);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def ts(dt: datetime) -> str:
+    """Fixed-width UTC timestamp so stored values compare correctly as text."""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def nvd_row(item: dict, fetched_at: str = "") -> dict:
+    """Flatten one NVD API vulnerability item into an `nvd` table row."""
+    cve = item.get("cve", {})
+    descriptions = cve.get("descriptions", [])
+    desc_en = next((d["value"] for d in descriptions if d.get("lang") == "en"), "")
+
+    metrics = cve.get("metrics", {})
+    cvss_score = None
+    cvss_severity = None
+    for key in ["cvssMetricV31", "cvssMetricV30"]:
+        if key in metrics and metrics[key]:
+            cvss_data = metrics[key][0].get("cvssData", {})
+            cvss_score = cvss_data.get("baseScore")
+            cvss_severity = cvss_data.get("baseSeverity", "")
+            break
+
+    # cpe:2.3:<part>:<vendor>:<product>:... — vendor/product from the first
+    # vulnerable match
+    cpes = []
+    for config in cve.get("configurations", []):
+        for node in config.get("nodes", []):
+            for match in node.get("cpeMatch", []):
+                criteria = match.get("criteria", "")
+                if match.get("vulnerable") and criteria not in cpes:
+                    cpes.append(criteria)
+    vendor = product = ""
+    for cpe in cpes:
+        parts = cpe.split(":")
+        if len(parts) > 4:
+            vendor, product = parts[3], parts[4]
+            break
+
+    cwes = sorted({
+        d["value"]
+        for weakness in cve.get("weaknesses", [])
+        for d in weakness.get("description", [])
+        if d.get("value", "").startswith("CWE-")
+    })
+
+    return {
+        "cve_id": cve.get("id", ""),
+        "description": desc_en[:300],
+        "cvss_score": cvss_score,
+        "cvss_severity": cvss_severity,
+        "vendor": vendor,
+        "product": product,
+        "published": cve.get("published", ""),
+        "last_modified": cve.get("lastModified", ""),
+        "cwes": json.dumps(cwes),
+        "cpes": json.dumps(cpes[:MAX_CPES]),
+        "fetched_at": fetched_at,
+    }
+
+
+def _record(row: sqlite3.Row) -> dict:
+    """Row -> output dict, decoding JSON list columns."""
+    record = dict(row)
+    for key in LIST_COLUMNS:
+        if key in record:
+            record[key] = json.loads(record[key]) if record[key] else []
+    return record
+
+
+class VulnStore:
+    """SQLite-backed NVD + KEV store. One instance per thread."""
+
+    def __init__(self, path: Path = DB_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+
+    def __enter__(self) -> VulnStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _migrate(self) -> None:
+        """Add columns introduced after a store was first created."""
+        columns = {r["name"] for r in self.db.execute("PRAGMA table_info(nvd)")}
+        for column in ("cwes", "cpes", "fetched_at"):
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE nvd ADD COLUMN {column} TEXT")
+
+    # -- state -------------------------------------------------------------
+
+    def get_state(self, key: str) -> str | None:
+        row = self.db.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_state(self, key: str, value) -> None:
+        self.db.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    # -- sync --------------------------------------------------------------
+
+    def sync_kev(self, body_path: Path, now: datetime | None = None) -> int:
+        """Upsert the KEV catalog at body_path. Returns rows inserted or changed.
+
+        On the first sync (empty table) first_seen is the entry's dateAdded,
+        so the initial load does not look like a flood of new entries.
+        """
+        now_ts = ts(now or datetime.now(timezone.utc))
+        with open(body_path, encoding="utf-8") as fp:
+            stream = CatalogStream(fp)
+            header = stream.read_header()
+            released = str(header.get("dateReleased", ""))
+            count = str(header.get("count", ""))
+            if (self.get_state("kev_date_released") == released
+                    and self.get_state("kev_count") == count):
+                return 0
+
+            bootstrap = self.db.execute("SELECT 1 FROM kev LIMIT 1").fetchone() is None
+
+            def rows():
+                for vuln in stream:
+                    if not vuln.get("cveID"):
+                        continue
+                    added = vuln.get("dateAdded", "")
+                    yield {
+                        "cve_id": vuln["cveID"],
+                        "vendor": vuln.get("vendorProject", ""),
+                        "product": vuln.get("product", ""),
+                        "name": vuln.get("vulnerabilityName", ""),
+                        "description": vuln.get("shortDescription", ""),
+                        "date_added": added,
+                        "due_date": vuln.get("dueDate", ""),
+                        "known_ransomware": vuln.get("knownRansomwareCampaignUse", "Unknown"),
+                        "digest": entry_digest(vuln),
+                        "first_seen": f"{added}T00:00:00Z" if bootstrap and added else now_ts,
+                        "now": now_ts,
+                    }
+
+            before = self.db.total_changes
+            with self.db:
+                self.db.executemany(
+                    """
+                    INSERT INTO kev (cve_id, vendor, product, name, description, date_added,
+                                     due_date, known_ransomware, digest, first_seen)
+                    VALUES (:cve_id, :vendor, :product, :name, :description, :date_added,
+                            :due_date, :known_ransomware, :digest, :first_seen)
+                    ON CONFLICT(cve_id) DO UPDATE SET
+                        vendor = excluded.vendor, product = excluded.product,
+                        name = excluded.name, description = excluded.description,
+                        date_added = excluded.date_added, due_date = excluded.due_date,
+                        known_ransomware = excluded.known_ransomware,
+                        digest = excluded.digest, changed_at = :now
+                    WHERE kev.digest != excluded.digest
+                    """,
+                    rows(),
+                )
+                changed = self.db.total_changes - before
+                self._set_state("kev_date_released", released)
+                self._set_state("kev_count", count)
+        return changed
+
+    def sync_nvd(self, client: NVDClient, bootstrap_days: int = 30,
+                 now: datetime | None = None) -> int:
+        """Pull every CVE modified since the last sync. Returns rows upserted.
+
+        The first sync covers the last bootstrap_days. Windows are capped at
+        NVD's 120-day range limit and overlap by an hour so late-indexed
+        modifications are not missed; upserts make the overlap harmless.
+        """
+        now = now or datetime.now(timezone.utc)
+        synced = self.get_state("nvd_synced_through")
+        if synced:
+            start = datetime.strptime(synced, NVD_DATE_FORMAT).replace(tzinfo=timezone.utc)
+            start -= SYNC_OVERLAP
+        else:
+            start = now - timedelta(days=bootstrap_days)
+
+        total = 0
+        while start < now:
+            end = min(start + NVD_MAX_RANGE, now)
+            items = client.fetch_range(start, end, field="lastMod", job="store-lastmod")
+            rows = [row for row in (nvd_row(i, ts(now)) for i in items) if row["cve_id"]]
+            with self.db:
+                self._upsert_nvd(rows)
+                self._set_state("nvd_synced_through", end.strftime(NVD_DATE_FORMAT))
+            total += len(rows)
+            start = end
+        return total
+
+    def backfill_nvd(self, client: NVDClient, since: datetime, until: datetime,
+                     now: datetime | None = None) -> int:
+        """Pull every CVE published in [since, until]. Returns rows upserted.
+
+        Unlike sync_nvd() this leaves the lastMod high-water mark alone, so
+        the next incremental sync is unaffected.
+        """
+        now = now or datetime.now(timezone.utc)
+        total = 0
+        start = since
+        while start < until:
+            end = min(start + NVD_MAX_RANGE, until)
+            items = client.fetch_range(start, end, field="pub", job="store-backfill")
+            rows = [row for row in (nvd_row(i, ts(now)) for i in items) if row["cve_id"]]
+            with self.db:
+                self._upsert_nvd(rows)
+            total += len(rows)
+            start = end
+        return total
+
+    def _upsert_nvd(self, rows: list[dict]) -> None:
+        self.db.executemany(
+            """
+            INSERT INTO nvd (cve_id, description, cvss_score, cvss_severity, vendor, product,
+                             published, last_modified, cwes, cpes, fetched_at)
+            VALUES (:cve_id, :description, :cvss_score, :cvss_severity, :vendor, :product,
+                    :published, :last_modified, :cwes, :cpes, :fetched_at)
+            ON CONFLICT(cve_id) DO UPDATE SET
+                description = excluded.description,
+                cvss_score = excluded.cvss_score,
+                cvss_severity = excluded.cvss_severity,
+                vendor = excluded.vendor, product = excluded.product,
+                published = excluded.published,
+                last_modified = excluded.last_modified,
+                cwes = excluded.cwes, cpes = excluded.cpes,
+                fetched_at = excluded.fetched_at
+            """,
+            rows,
+        )
+
+    def enrich_kev(self, client: NVDClient, ttl_days: int = DETAIL_TTL_DAYS,
+                   bulk_threshold: int = BULK_THRESHOLD,
+                   now: datetime | None = None) -> int:
+        """Cache NVD details for KEV CVEs missing or older than the TTL.
+
+        Returns the number of CVEs that were due. When more than
+        bulk_threshold are due, one paged `hasKev` query refreshes the whole
+        KEV set (~1 request per 2000 CVEs); otherwise each is looked up by
+        cveId. CVEs NVD does not return are cached as empty rows so they are
+        not retried until the TTL expires.
+        """
+        now_ts = ts(now or datetime.now(timezone.utc))
+        stale_ts = ts((now or datetime.now(timezone.utc)) - timedelta(days=ttl_days))
+        due = [r["cve_id"] for r in self.db.execute(
+            """
+            SELECT kev.cve_id FROM kev LEFT JOIN nvd USING (cve_id)
+            WHERE nvd.fetched_at IS NULL OR nvd.fetched_at = '' OR nvd.fetched_at < ?
+            """,
+            (stale_ts,),
+        )]
+        if not due:
+            return 0
+
+        if len(due) > bulk_threshold:
+            items = client.fetch_all({"hasKev": None})
+        else:
+            items = client.lookup(due)
+        rows = [row for row in (nvd_row(i, now_ts) for i in items) if row["cve_id"]]
+
+        found = {row["cve_id"] for row in rows}
+        missing = [
+            {"cve_id": cve_id, "fetched_at": now_ts} for cve_id in due if cve_id not in found
+        ]
+        with self.db:
+            self._upsert_nvd(rows)
+            self.db.executemany(
+                "INSERT INTO nvd (cve_id, fetched_at) VALUES (:cve_id, :fetched_at) "
+                "ON CONFLICT(cve_id) DO UPDATE SET fetched_at = excluded.fetched_at",
+                missing,
+            )
+        return len(due)
+
+    def merge(self, kev_records: list[dict], nvd_records: list[dict]) -> None:
+        """Join output records in place: NVD details onto KEV, KEV status onto NVD."""
+        ids = sorted({r["cve_id"] for r in kev_records + nvd_records if r.get("cve_id")})
+        if not ids:
+            return
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS merge_ids (cve_id TEXT PRIMARY KEY)")
+        self.db.execute("DELETE FROM merge_ids")
+        self.db.executemany("INSERT INTO merge_ids VALUES (?)", [(i,) for i in ids])
+        rows = self.db.execute(
+            """
+            SELECT m.cve_id, nvd.cvss_score, nvd.cvss_severity, nvd.cwes, nvd.cpes,
+                   nvd.published, kev.cve_id IS NOT NULL AS in_kev, kev.known_ransomware,
+                   kev.date_added
+            FROM merge_ids m
+            LEFT JOIN nvd USING (cve_id)
+            LEFT JOIN kev USING (cve_id)
+            """
+        )
+        joined = {r["cve_id"]: _record(r) for r in rows}
+
+        for record in kev_records:
+            detail = joined.get(record.get("cve_id"), {})
+            record.update({
+                "cvss_score": detail.get("cvss_score"),
+                "cvss_severity": detail.get("cvss_severity"),
+                "cwes": detail.get("cwes", []),
+                "cpes": detail.get("cpes", []),
+                "published": detail.get("published") or "",
+            })
+        for record in nvd_records:
+            detail = joined.get(record.get("cve_id"), {})
+            record.update({
+                "in_kev": bool(detail.get("in_kev")),
+                "known_ransomware": detail.get("known_ransomware"),
+                "kev_date_added": detail.get("date_added"),
+                "cwes": detail.get("cwes", []),
+            })
+
+    def kev_delta_start(self, day: str, fallback: datetime,
+                        now: datetime | None = None) -> datetime:
+        """Where `day`'s KEV delta starts: the last sync of the previous run's day.
+
+        Every run for `day` moves the end mark to now; the first run for a
+        later day starts from it, so each addition is reported on one day
+        only, and reruns of a day keep its start. With no earlier run, or
+        for a day before the last one, the delta starts at `fallback`.
+        """
+        last_day = self.get_state("kev_delta_day")
+        if last_day and day < last_day:
+            return fallback
+        with self.db:
+            if last_day != day:
+                self._set_state("kev_delta_day", day)
+                self._set_state("kev_delta_start", self.get_state("kev_delta_end") or ts(fallback))
+            self._set_state("kev_delta_end", ts(now or datetime.now(timezone.utc)))
+        return datetime.fromisoformat(self.get_state("kev_delta_start").replace("Z", "+00:00"))
+
+    # -- queries -----------------------------------------------------------
+
+    def kev_delta(self, since: datetime) -> list[dict]:
+        """KEV entries first seen or changed since `since`, tagged new/updated."""
+        since_ts = ts(since)
+        rows = self.db.execute(
+            """
+            SELECT 'CISA KEV' AS source, cve_id, vendor, product, name, description,
+                   date_added, due_date, known_ransomware,
+                   CASE WHEN first_seen >= :since THEN 'new' ELSE 'updated' END AS change
+            FROM kev
+            WHERE first_seen >= :since OR changed_at >= :since
+            ORDER BY date_added DESC, cve_id DESC
+            """,
+            {"since": since_ts},
+        )
+        return [_record(r) for r in rows]
+
+    def kev_added_since(self, since: datetime, until: datetime | None = None) -> list[dict]:
+        """KEV entries whose dateAdded is on or after `since` (and before `until`)."""
+        rows = self.db.execute(
+            """
+            SELECT 'CISA KEV' AS source, cve_id, vendor, product, name, description,
+                   date_added, due_date, known_ransomware
+            FROM kev WHERE date_added >= ? AND date_added < ?
+            ORDER BY date_added DESC, cve_id DESC
+            """,
+            (first_day(since), first_day(until) if until else "9999-12-31"),
+        )
+        return [_record(r) for r in rows]
+
+    def nvd_since(self, since: datetime, min_cvss: float = 8.0,
+                  until: datetime | None = None) -> list[dict]:
+        """NVD CVEs published since `since` (and before `until`) with CVSS >= min_cvss."""
+        rows = self.db.execute(
+            """
+            SELECT 'NVD' AS source, cve_id, description, cvss_score, cvss_severity, published
+            FROM nvd
+            WHERE published >= ? AND published < ? AND cvss_score >= ?
+            ORDER BY cvss_score DESC, published DESC
+            """,
+            (since.astimezone(timezone.utc).strftime(NVD_DATE_FORMAT),
+             until.astimezone(timezone.utc).strftime(NVD_DATE_FORMAT) if until else "9999",
+             min_cvss),
+        )
+        return [_record(r) for r in rows]
+
+    def rollup(self, days: int, min_cvss: float = 8.0, now: datetime | None = None) -> dict:
+        """Look-back summary for the weekly/monthly cadences."""
+        now = now or datetime.now(timezone.utc)
+        since = now - timedelta(days=days)
+        kev = self.kev_added_since(since)
+        nvd = self.nvd_since(since, min_cvss)
+        vendors = self.db.execute(
+            """
+            SELECT vendor, COUNT(*) AS cves FROM (
+                SELECT vendor FROM kev WHERE date_added >= :day
+                UNION ALL
+                SELECT vendor FROM nvd WHERE published >= :pub AND cvss_score >= :min
+            ) WHERE vendor != '' GROUP BY vendor ORDER BY cves DESC LIMIT 10
+            """,
+            {"day": first_day(since), "pub": since.strftime(NVD_DATE_FORMAT), "min": min_cvss},
+        )
+        return {
+            "since": since.date().isoformat(),
+            "until": now.date().isoformat(),
+            "counts": {
+                "kev_added": len(kev),
+                "kev_ransomware": sum(1 for r in kev if r["known_ransomware"] == "Known"),
+                "nvd_high_severity": len(nvd),
+                "nvd_critical": sum(1 for r in nvd if (r["cvss_score"] or 0) >= 9.0),
+            },
+            "top_vendors": [dict(r) for r in vendors],
+            "cisa_kev": kev,
+            "nvd_cves": nvd,
+        }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the local vulnerability store")
+    parser.add_argument("--days", help="Look back N days", type=int, default=7)
+    parser.add_argument("--min-cvss", help="Minimum NVD CVSS score", type=float, default=8.0)
+    parser.add_argument("--db", help="Store path", type=Path, default=DB_PATH)
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"No vulnerability store at {args.db} — run fetch-osint.py first", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    with VulnStore(args.db) as store:
+        result = store.rollup(args.days, args.min_cvss)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"Queried {args.days}-day rollup in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()